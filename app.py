@@ -7,13 +7,17 @@
 import logging
 import atexit
 from flask import Flask, jsonify
-from config import PORT, EVENT_FINALIZATION_CHECK_INTERVAL
+from config import PORT, EVENT_FINALIZATION_CHECK_INTERVAL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_IDLE_TIMEOUT, EVENT_QUEUE_DRAIN_SECONDS
 from routes.commands import commands_bp
-from routes.events import events_bp
+from routes.events import events_bp, event_queue
 from routes.oauth import oauth_bp
 import os
 from database import db
+from database.repos import events
 from services.event_scheduler import start_scheduler, stop_scheduler
+from services.gemini_client import get_cache_stats as get_gemini_cache_stats
+from services import engagement_tracker, event_dedup, response_embedder
+from utils.slack_api import get_http_stats, get_dm_cache_stats, get_rate_limit_stats
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("slack-ask-bot")
@@ -27,17 +31,28 @@ app.register_blueprint(oauth_bp)  # mounts /slack/oauth/callback
 # DB access
 # initialize DB
 dsn = f"dbname={os.environ.get('DATABASE_NAME')} user={os.environ['DATABASE_USER']} password={os.environ['DATABASE_PASSWORD']} host={os.environ['DATABASE_HOST']} port={os.environ.get('DATABASE_PORT',5432)}"
-db.init_pool(dsn=dsn)
+db.init_pool(dsn=dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT, idle_timeout=DB_POOL_IDLE_TIMEOUT)
+
+# Invalidate the cached active event when another worker creates/finalizes one
+events.start_active_event_listener()
+
+# Rebuild in-memory thread engagement state from the DB
+try:
+    engagement_tracker.rebuild()
+except Exception:
+    log.exception("Failed to rebuild engagement tracker; threads will load on first activity")
 
 # Start the event auto-finalization scheduler
 # Only start in the main process (not in Flask's reloader process)
-# Check interval configured in .env (default: 5 minutes)
+# Events are finalized at their end time; safety-net interval configured in .env (default: 60 minutes)
 if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or os.environ.get('WERKZEUG_RUN_MAIN') is None:
-    start_scheduler(check_interval_minutes=EVENT_FINALIZATION_CHECK_INTERVAL)
+    start_scheduler(check_interval_minutes=EVENT_FINALIZATION_CHECK_INTERVAL, dsn=dsn)
 
-# Register cleanup functions
+# Register cleanup functions (atexit runs them last-registered first)
 atexit.register(db.close_pool)
 atexit.register(stop_scheduler)
+# Acked events only exist in memory; finish them while the pool is still open
+atexit.register(event_queue.drain, EVENT_QUEUE_DRAIN_SECONDS)
 
 
 @app.get("/")
@@ -45,10 +60,28 @@ def root():
     return jsonify({"ok": True, "service": "slack-ask-bot"}), 200
 
 
+@app.get("/metrics")
+def metrics():
+    """Per-worker runtime counters for the DB pool, Slack transport and caches."""
+    return jsonify({
+        "pid": os.getpid(),
+        "db_pool": db.get_pool_stats(),
+        "slack_http": get_http_stats(),
+        "slack_rate_limit": get_rate_limit_stats(),
+        "dm_channel_cache": get_dm_cache_stats(),
+        "engagement_tracker": engagement_tracker.get_tracker_stats(),
+        "event_queue": event_queue.get_stats(),
+        "embedding_queue": response_embedder.get_embedding_stats(),
+        "event_dedup": event_dedup.get_dedup_stats(),
+        "gemini_cache": get_gemini_cache_stats(),
+    }), 200
+
+
 if __name__ == "__main__":
     try:
         app.run(host="0.0.0.0", port=PORT, debug=True)
     finally:
         # Ensure DB pool is closed on exit
+        event_queue.drain(EVENT_QUEUE_DRAIN_SECONDS)
         db.close_pool()
         stop_scheduler()
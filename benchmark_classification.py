@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: benchmark_classification.py
+# Description: Wall-clock time of response classification vs. responder count,
+# comparing one big prompt against sharded map/reduce classification and the
+# local (Gemini-free) grouping engine.
+#
+# Usage:
+#   python benchmark_classification.py                 # real Gemini calls (needs GEMINI_API_KEY)
+#   python benchmark_classification.py --simulate      # offline, with a modelled Gemini latency
+#   python benchmark_classification.py --simulate --counts 100 500 2000 --time-scale 0.1
+# --------------------------------------------------
+
+import argparse
+import logging
+import os
+import random
+import re
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+# config.py requires a signing secret even though nothing here talks to Slack
+os.environ.setdefault("SLACK_SIGNING_SECRET", "benchmark")
+
+from services import response_classifier
+from services.response_classifier import classify_responses
+from services.local_grouping import group_responses
+
+TOPICS = ["hiking", "cooking", "chess", "jazz", "soccer", "painting", "gardening", "robotics", "poetry", "climbing"]
+TEMPLATES = [
+    "I've been really into {topic} lately and would love to meet people who are too",
+    "Honestly {topic} is the thing I look forward to every weekend",
+    "Looking for anyone who wants to talk about {topic}, I'm pretty new to it",
+    "{topic} has been my main hobby for years, happy to share tips",
+]
+
+
+def make_responses(count: int, seed: int = 598):
+    rng = random.Random(seed)
+    return [
+        (f"U{i:08d}", rng.choice(TEMPLATES).format(topic=rng.choice(TOPICS)))
+        for i in range(count)
+    ]
+
+
+def simulated_gemini(time_scale: float):
+    """
+    Stand-in for ask_gemini_structured: groups lines by topic keyword and sleeps
+    for a latency that grows superlinearly with prompt size, like a real model.
+    """
+    def ask(prompt, schema=None, mime_type="application/json", **kwargs):
+        time.sleep(time_scale * (0.8 + 2e-5 * len(prompt) ** 1.3))
+        by_topic = {}
+        for item_id, text in re.findall(r"^(?:User|Cluster) (\S+): (.*)$", prompt, re.MULTILINE):
+            topic = next((t for t in TOPICS if t in text.lower()), None)
+            if topic:
+                by_topic.setdefault(topic, []).append(item_id)
+        return [ids for ids in by_topic.values() if len(ids) >= 2]
+    return ask
+
+
+def run(counts, simulate: bool, time_scale: float):
+    if simulate:
+        response_classifier.ask_gemini_structured = simulated_gemini(time_scale)
+
+    print(f"{'responders':>10} | {'single prompt (s)':>17} | {'sharded (s)':>11} | {'groups':>6} | {'local (s)':>9} | {'groups':>6}")
+    print("-" * 77)
+    for count in counts:
+        responses = make_responses(count)
+
+        started = time.monotonic()
+        classify_responses(responses, shard_size=len(responses))
+        single = time.monotonic() - started
+
+        started = time.monotonic()
+        groups = classify_responses(responses) or []
+        sharded = time.monotonic() - started
+
+        started = time.monotonic()
+        local_groups = group_responses(responses) or []
+        local = time.monotonic() - started
+
+        print(f"{count:>10} | {single:>17.2f} | {sharded:>11.2f} | {len(groups):>6} | {local:>9.3f} | {len(local_groups):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[50, 150, 300, 600, 1200, 2400])
+    parser.add_argument("--simulate", action="store_true", help="use a modelled Gemini instead of the API")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply simulated latencies")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    run(args.counts, args.simulate, args.time_scale)
@@ -12,16 +12,98 @@ load_dotenv()
 
 PORT = int(os.environ.get("PORT", 8080))
 
+# Postgres connection pool (per gunicorn worker)
+# Sized for 8 request threads plus queue workers, broadcasts and the scheduler;
+# checkouts wait up to DB_POOL_TIMEOUT seconds for a free connection, and
+# connections idle longer than DB_POOL_IDLE_TIMEOUT seconds are closed down to DB_POOL_MIN
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 20))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300))
+# Rows per batch when paging through bulk reads (e.g. all users for a DM fan-out)
+DB_BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", 1000))
+
 # Slack
 SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]   # set in Render
 SLACK_BOT_TOKEN = os.environ.get(
     "SLACK_BOT_TOKEN")     # xoxb-..., required for /dm
 
+# Slack HTTP transport (per gunicorn worker)
+# Max pooled keep-alive connections per host, and whether to enable TCP keep-alive
+SLACK_HTTP_POOL_SIZE = int(os.environ.get("SLACK_HTTP_POOL_SIZE", 16))
+SLACK_HTTP_KEEPALIVE = os.environ.get("SLACK_HTTP_KEEPALIVE", "1") == "1"
+SLACK_HTTP_TIMEOUT = int(os.environ.get("SLACK_HTTP_TIMEOUT", 15))
+# Workspace-wide chat.postMessage budget (per minute) and how many times to retry after a 429
+SLACK_CHAT_POST_PER_MINUTE = int(os.environ.get("SLACK_CHAT_POST_PER_MINUTE", 300))
+SLACK_MAX_RATE_LIMIT_RETRIES = int(os.environ.get("SLACK_MAX_RATE_LIMIT_RETRIES", 3))
+# Number of user -> DM channel ids kept in memory (backed by the dm_channels table)
+DM_CHANNEL_CACHE_SIZE = int(os.environ.get("DM_CHANNEL_CACHE_SIZE", 10000))
+
+# Slack Events API ingestion
+# Worker threads draining /slack/events, and max queued events before we answer 503
+EVENT_QUEUE_WORKERS = int(os.environ.get("EVENT_QUEUE_WORKERS", 4))
+EVENT_QUEUE_MAX_BACKLOG = int(os.environ.get("EVENT_QUEUE_MAX_BACKLOG", 1000))
+# Seconds to wait at shutdown for queued events to finish; keep under gunicorn's graceful timeout (30s)
+EVENT_QUEUE_DRAIN_SECONDS = float(os.environ.get("EVENT_QUEUE_DRAIN_SECONDS", 20))
+# How long event_ids stay in the in-memory dedup set (seconds) and in processed_events (hours)
+EVENT_DEDUP_TTL_SECONDS = int(os.environ.get("EVENT_DEDUP_TTL_SECONDS", 3600))
+EVENT_DEDUP_RETENTION_HOURS = int(os.environ.get("EVENT_DEDUP_RETENTION_HOURS", 24))
+
+# DM fan-out (/start_event, /send_survey)
+# Concurrent sends per broadcast, and how often (in sends) to report progress
+DM_BROADCAST_WORKERS = int(os.environ.get("DM_BROADCAST_WORKERS", 8))
+DM_BROADCAST_PROGRESS_EVERY = int(os.environ.get("DM_BROADCAST_PROGRESS_EVERY", 250))
+
+# Thread engagement tracker
+# Max threads kept in memory per worker, and how far back to reload at startup
+ENGAGEMENT_TRACKER_MAX_THREADS = int(os.environ.get("ENGAGEMENT_TRACKER_MAX_THREADS", 5000))
+ENGAGEMENT_TRACKER_REBUILD_DAYS = int(os.environ.get("ENGAGEMENT_TRACKER_REBUILD_DAYS", 7))
+
 # Gemini
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 GEMINI_USE_REST = os.environ.get("GEMINI_USE_REST", "0") == "1"
+# Shared response cache (gemini_cache table): entry lifetime and max entries before LRU eviction
+GEMINI_CACHE_ENABLED = os.environ.get("GEMINI_CACHE_ENABLED", "1") == "1"
+GEMINI_CACHE_TTL_SECONDS = int(os.environ.get("GEMINI_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+GEMINI_CACHE_MAX_ENTRIES = int(os.environ.get("GEMINI_CACHE_MAX_ENTRIES", 5000))
+
+# Response classification
+# Max responses per Gemini classification prompt (larger events are sharded),
+# max clusters per merge prompt, and concurrent classification calls
+CLASSIFY_SHARD_SIZE = int(os.environ.get("CLASSIFY_SHARD_SIZE", 150))
+CLASSIFY_MERGE_LIMIT = int(os.environ.get("CLASSIFY_MERGE_LIMIT", 150))
+CLASSIFY_WORKERS = int(os.environ.get("CLASSIFY_WORKERS", 4))
+
+# Grouping engine: "gemini" (LLM classification, falls back to local on
+# failure or after GROUPING_GEMINI_TIMEOUT seconds) or "local" (in-process
+# hashing TF-IDF + k-means, no Gemini calls)
+GROUPING_ENGINE = os.environ.get("GROUPING_ENGINE", "gemini").lower()
+GROUPING_GEMINI_TIMEOUT = int(os.environ.get("GROUPING_GEMINI_TIMEOUT", 120))
+LOCAL_GROUPING_DIMENSIONS = int(os.environ.get("LOCAL_GROUPING_DIMENSIONS", 1024))
+LOCAL_GROUPING_TARGET_SIZE = int(os.environ.get("LOCAL_GROUPING_TARGET_SIZE", 5))
+LOCAL_GROUPING_MIN_SIMILARITY = float(os.environ.get("LOCAL_GROUPING_MIN_SIMILARITY", 0.1))
+# Background workers / max backlog for embedding responses as they arrive.
+# Only used with GROUPING_ENGINE=local: the gemini engine classifies raw text,
+# and its local fallback embeds whatever it needs at finalization time
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", 2))
+EMBEDDING_MAX_BACKLOG = int(os.environ.get("EMBEDDING_MAX_BACKLOG", 1000))
+
+# Event finalization
+# Concurrent Gemini metadata calls, groups per batched metadata call, and concurrent Slack channel setups
+FINALIZE_METADATA_WORKERS = int(os.environ.get("FINALIZE_METADATA_WORKERS", 4))
+FINALIZE_METADATA_BATCH_SIZE = int(os.environ.get("FINALIZE_METADATA_BATCH_SIZE", 20))
+FINALIZE_SLACK_WORKERS = int(os.environ.get("FINALIZE_SLACK_WORKERS", 4))
+# Attempts per checkpointed finalization step before it is given up on
+FINALIZE_MAX_STEP_ATTEMPTS = int(os.environ.get("FINALIZE_MAX_STEP_ATTEMPTS", 3))
 
 # Event Scheduler
-# How often to check for events to finalize (in minutes)
-EVENT_FINALIZATION_CHECK_INTERVAL = int(os.environ.get("EVENT_FINALIZATION_CHECK_INTERVAL", 5))
+# Events are finalized by a one-shot job at their end time; this is how often
+# the safety-net check for missed events runs (in minutes)
+EVENT_FINALIZATION_CHECK_INTERVAL = int(os.environ.get("EVENT_FINALIZATION_CHECK_INTERVAL", 60))
+# An incomplete finalization is retried by its own job rather than waiting for
+# the safety-net check: first after FINALIZE_RETRY_SECONDS, doubling up to
+# FINALIZE_RETRY_MAX_SECONDS, for at most FINALIZE_MAX_RETRIES retries
+FINALIZE_RETRY_SECONDS = int(os.environ.get("FINALIZE_RETRY_SECONDS", 60))
+FINALIZE_RETRY_MAX_SECONDS = int(os.environ.get("FINALIZE_RETRY_MAX_SECONDS", 600))
+FINALIZE_MAX_RETRIES = int(os.environ.get("FINALIZE_MAX_RETRIES", 8))
@@ -0,0 +1,9 @@
+-- Cache of Slack DM (IM) channel ids per user.
+-- A user's IM channel with the bot never changes, so conversations.open only
+-- needs to be called once per user; both gunicorn workers read from here.
+
+CREATE TABLE IF NOT EXISTS dm_channels (
+    slack_id    TEXT PRIMARY KEY,
+    channel_id  TEXT NOT NULL,
+    created_at  TIMESTAMPTZ DEFAULT NOW()
+);
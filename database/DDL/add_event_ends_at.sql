@@ -0,0 +1,13 @@
+-- Stored end time for events, so deadline queries (active event, ended
+-- unfinalized events) can use an index instead of computing
+-- time_start + duration_days for every row.
+-- The day arithmetic is done in UTC because a generated column needs an
+-- immutable expression (timestamptz + interval depends on the session TimeZone).
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS ends_at TIMESTAMPTZ
+    GENERATED ALWAYS AS (
+        (time_start AT TIME ZONE 'UTC' + INTERVAL '1 day' * duration_days) AT TIME ZONE 'UTC'
+    ) STORED;
+
+-- Only unfinalized events are ever searched by deadline
+CREATE INDEX IF NOT EXISTS idx_events_unfinalized_ends_at ON events(ends_at) WHERE is_finalized = 0;
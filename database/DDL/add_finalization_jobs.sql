@@ -0,0 +1,30 @@
+-- Durable, resumable event finalization.
+-- finalization_jobs stores the classified groups once, so a rerun never
+-- re-classifies; finalization_steps checkpoints every per-group step
+-- (metadata, create, invite, welcome) plus the event-level announcement
+-- (group_index = -1), so a rerun only redoes unfinished work.
+
+CREATE TABLE IF NOT EXISTS finalization_jobs (
+    event_id    INTEGER PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    groups      JSONB,                      -- [[slack_id, ...], ...]; NULL until classification succeeds
+    status      TEXT NOT NULL DEFAULT 'running'
+                CHECK (status IN ('running', 'done')),
+    classify_attempts  INTEGER NOT NULL DEFAULT 0,  -- failed classification attempts
+    last_error  TEXT,
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS finalization_steps (
+    event_id     INTEGER NOT NULL REFERENCES finalization_jobs(event_id) ON DELETE CASCADE,
+    group_index  INTEGER NOT NULL,          -- 0-based group, -1 for the announcement
+    step         TEXT NOT NULL
+                 CHECK (step IN ('metadata', 'create', 'invite', 'welcome', 'announce')),
+    status       TEXT NOT NULL
+                 CHECK (status IN ('started', 'done', 'failed', 'skipped')),
+    payload      JSONB,                     -- step output, e.g. metadata or {"id": channel_id}
+    attempts     INTEGER NOT NULL DEFAULT 1, -- finished attempts ('started' doesn't count)
+    last_error   TEXT,
+    updated_at   TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (event_id, group_index, step)
+);
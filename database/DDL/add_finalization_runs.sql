@@ -0,0 +1,22 @@
+-- Execution history of the finalization scheduler: one row per
+-- check_and_finalize_events run by the leader worker, to track finalization
+-- latency across deployments.
+-- (APScheduler's own job table, apscheduler_jobs, is created automatically
+-- by its SQLAlchemy job store on first start.)
+
+CREATE TABLE IF NOT EXISTS finalization_runs (
+    id                SERIAL PRIMARY KEY,
+    trigger           TEXT NOT NULL,          -- interval | startup | event_end:<id> | manual
+    worker_pid        INTEGER,
+    status            TEXT NOT NULL DEFAULT 'running'
+                      CHECK (status IN ('running', 'ok', 'error')),
+    started_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at       TIMESTAMPTZ,
+    events_processed  INTEGER NOT NULL DEFAULT 0,
+    groups_created    INTEGER NOT NULL DEFAULT 0,
+    channels_created  INTEGER NOT NULL DEFAULT 0,
+    errors            JSONB NOT NULL DEFAULT '[]',
+    stage_timings     JSONB NOT NULL DEFAULT '{}'  -- {event_id: {stage: seconds}}
+);
+
+CREATE INDEX IF NOT EXISTS idx_finalization_runs_started_at ON finalization_runs(started_at);
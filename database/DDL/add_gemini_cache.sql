@@ -0,0 +1,15 @@
+-- Content-addressed cache of Gemini responses, shared by all gunicorn workers.
+-- cache_key is a sha256 of (model, prompt, response schema, mime type).
+-- Rows expire at expires_at; beyond the size limit the least recently used
+-- rows (oldest last_used_at) are evicted.
+
+CREATE TABLE IF NOT EXISTS gemini_cache (
+    cache_key     TEXT PRIMARY KEY,
+    model         TEXT NOT NULL,
+    response      JSONB NOT NULL,
+    created_at    TIMESTAMPTZ DEFAULT NOW(),
+    last_used_at  TIMESTAMPTZ DEFAULT NOW(),
+    expires_at    TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_gemini_cache_last_used_at ON gemini_cache(last_used_at);
@@ -0,0 +1,10 @@
+-- Slack Events API envelope ids we've already processed.
+-- Slack retries deliveries it thinks timed out; the unique key lets every
+-- gunicorn worker drop a retry before it touches message/engagement counters.
+
+CREATE TABLE IF NOT EXISTS processed_events (
+    event_id     TEXT PRIMARY KEY,
+    received_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_processed_events_received_at ON processed_events(received_at);
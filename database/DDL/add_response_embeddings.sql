@@ -0,0 +1,6 @@
+-- Per-response vector computed in the background when a response is
+-- submitted or edited (float32 array, see services/response_embedder.py),
+-- so finalization only has to cluster precomputed vectors.
+-- NULL means "not computed yet"; finalization backfills those.
+
+ALTER TABLE responses ADD COLUMN IF NOT EXISTS embedding BYTEA;
@@ -0,0 +1,15 @@
+-- One response per user per event, so add_response can be a single
+-- INSERT ... ON CONFLICT (user_id, event_id) DO UPDATE.
+
+-- Remove duplicates created by the old select-then-insert race,
+-- keeping each user's most recent row
+DELETE FROM responses r
+USING responses newer
+WHERE r.user_id = newer.user_id
+  AND r.event_id = newer.event_id
+  AND r.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_responses_user_event ON responses(user_id, event_id);
+
+-- The unique index covers lookups by user_id
+DROP INDEX IF EXISTS idx_responses_user_id;
@@ -0,0 +1,6 @@
+-- Per-thread counter bumped by every recorded message or reaction.
+-- Each gunicorn worker's engagement tracker remembers the version it has
+-- seen, so a jump of more than one means the other worker wrote to the
+-- thread in between and the in-memory participants need reloading.
+
+ALTER TABLE monitored_threads ADD COLUMN IF NOT EXISTS activity_version BIGINT NOT NULL DEFAULT 0;
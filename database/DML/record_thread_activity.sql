@@ -0,0 +1,35 @@
+-- Record one message or reaction in a monitored thread in a single round trip:
+-- resolve/create the user, upsert the thread and the participant, and return
+-- the thread's intervention state and activity version with the participant's new totals.
+WITH existing_user AS (
+    SELECT id FROM users WHERE slack_id = %(slack_id)s ORDER BY id LIMIT 1
+), new_user AS (
+    INSERT INTO users (slack_id)
+    SELECT %(slack_id)s
+    WHERE NOT EXISTS (SELECT 1 FROM existing_user)
+    RETURNING id
+), active_user AS (
+    SELECT id FROM existing_user
+    UNION ALL
+    SELECT id FROM new_user
+), thread AS (
+    INSERT INTO monitored_threads (thread_ts, channel_id, last_activity, message_count, original_message, activity_version)
+    VALUES (%(thread_ts)s, %(channel_id)s, NOW(), %(messages)s, %(original_message)s, 1)
+    ON CONFLICT (thread_ts) DO UPDATE
+    SET last_activity = NOW(),
+        message_count = monitored_threads.message_count + EXCLUDED.message_count,
+        activity_version = monitored_threads.activity_version + 1
+    RETURNING bot_intervened, intervention_type, activity_version
+), participant AS (
+    INSERT INTO thread_participants (thread_ts, user_id, slack_id, message_count, reaction_count, last_engaged, engagement_score)
+    SELECT %(thread_ts)s, id, %(slack_id)s, %(messages)s, %(reactions)s, NOW(), %(score)s
+    FROM active_user
+    ON CONFLICT (thread_ts, user_id) DO UPDATE
+    SET message_count = thread_participants.message_count + EXCLUDED.message_count,
+        reaction_count = thread_participants.reaction_count + EXCLUDED.reaction_count,
+        last_engaged = NOW(),
+        engagement_score = thread_participants.engagement_score + EXCLUDED.engagement_score
+    RETURNING user_id, slack_id, engagement_score
+)
+SELECT t.bot_intervened, t.intervention_type, t.activity_version, p.user_id, p.slack_id, p.engagement_score
+FROM thread t, participant p
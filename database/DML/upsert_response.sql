@@ -0,0 +1,38 @@
+-- Store (or replace) a user's response to the currently active event in one
+-- round trip, creating the user if this is their first message. Returns the
+-- active event id and the upserted event id; a NULL active event id means
+-- there is no event to respond to.
+WITH active_event AS (
+    SELECT id FROM events
+    WHERE is_finalized = 0
+      AND ends_at >= NOW()
+    ORDER BY time_start ASC
+    LIMIT 1
+),
+existing_user AS (
+    -- slack_id isn't unique; pick one row if an earlier get-then-create race duplicated the user
+    SELECT id FROM users WHERE slack_id = %(slack_id)s ORDER BY id LIMIT 1
+),
+new_user AS (
+    INSERT INTO users (slack_id)
+    SELECT %(slack_id)s
+    WHERE NOT EXISTS (SELECT 1 FROM existing_user)
+    RETURNING id
+),
+responder AS (
+    SELECT id FROM existing_user
+    UNION ALL
+    SELECT id FROM new_user
+),
+upserted AS (
+    INSERT INTO responses (entry, user_id, event_id, submitted_at)
+    SELECT %(entry)s, responder.id, active_event.id, NOW()
+    FROM active_event CROSS JOIN responder
+    ON CONFLICT (user_id, event_id) DO UPDATE
+        SET entry = EXCLUDED.entry,
+            embedding = NULL
+    RETURNING event_id
+)
+SELECT
+    (SELECT id FROM active_event),
+    (SELECT event_id FROM upserted)
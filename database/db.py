@@ -1,31 +1,231 @@
+import contextvars
+import logging
+import select
+import threading
+import time
 import psycopg2
 from psycopg2 import pool
 from contextlib import contextmanager
-from typing import Generator
+from typing import Callable, Generator, Optional, Sequence, Tuple
 _db_pool = None
+_dsn = None
+# Caps concurrent checkouts at maxconn so callers wait instead of getting PoolError
+_slots = None
+_checkout_timeout = None
 
+log = logging.getLogger("db")
 
-def init_pool(dsn=None):
-    """Call once, after app starts."""
-    global _db_pool
+# Connections idle longer than this (seconds) are pinged before being handed out
+VALIDATE_AFTER_SECONDS = 30
+# Rows per batch for keyset-paginated bulk reads (e.g. users.iter_users)
+DEFAULT_BATCH_SIZE = 1000
+
+_stats_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "discarded": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+}
+
+
+class PoolTimeout(pool.PoolError):
+    """No connection became free within the checkout timeout."""
+
+
+class IdleConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that keeps returned connections open up to maxconn.
+
+    psycopg2's pool closes every connection returned beyond minconn, so a
+    burst reconnects on nearly every checkout. Here connections stay idle
+    until they've been unused for idle_timeout seconds (None = forever);
+    then they're closed, oldest first, down to minconn.
+    """
+
+    def __init__(self, minconn, maxconn, *args, idle_timeout: Optional[float] = None, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.idle_timeout = idle_timeout
+        # id(conn) -> monotonic time it was last returned; _pool is oldest first
+        self._idle_since = {}
+
+    def returned_at(self, conn) -> Optional[float]:
+        """When conn was last returned to the pool (None if never)."""
+        return self._idle_since.get(id(conn))
+
+    def _putconn(self, conn, key=None, close=False):
+        if self.closed:
+            raise pool.PoolError("connection pool is closed")
+        if key is None:
+            key = self._rused.get(id(conn))
+            if key is None:
+                raise pool.PoolError("trying to put unkeyed connection")
+
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                # Server connection lost
+                close = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        if close or conn.closed:
+            conn.close()
+            self._idle_since.pop(id(conn), None)
+        else:
+            self._pool.append(conn)
+            self._idle_since[id(conn)] = time.monotonic()
+
+        del self._used[key]
+        del self._rused[id(conn)]
+        self._reap()
+
+    def _reap(self):
+        if self.idle_timeout is None:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while len(self._pool) > self.minconn and self._idle_since.get(id(self._pool[0]), cutoff) <= cutoff:
+            conn = self._pool.pop(0)
+            self._idle_since.pop(id(conn), None)
+            conn.close()
+
+    def gauges(self) -> Tuple[int, int]:
+        """(in use, idle) connection counts."""
+        with self._lock:
+            return len(self._used), len(self._pool)
+
+
+class UnitOfWorkConnection(psycopg2.extensions.connection):
+    """Pooled connection whose commit() is deferred while a unit_of_work() is open on it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deferred_commits = 0
+
+    def commit(self):
+        if self.deferred_commits:
+            return
+        super().commit()
+
+
+# Connection checked out by the enclosing get_db_connection/get_db_cursor in
+# this thread (or task), so nested repo calls share it instead of taking another
+_current_conn = contextvars.ContextVar("db_current_conn", default=None)
+
+# Seconds between LISTEN reconnect attempts, and how often the listener wakes up with no traffic
+LISTEN_RETRY_SECONDS = 5
+LISTEN_POLL_SECONDS = 30
+# How often a leader checks its lock connection, and a follower retries for the lock
+LEADER_CHECK_SECONDS = 30
+
+
+def init_pool(
+    dsn=None,
+    minconn: int = 1,
+    maxconn: int = 10,
+    timeout: Optional[float] = None,
+    idle_timeout: Optional[float] = None,
+):
+    """
+    Call once, after app starts.
+
+    The pool is thread-safe; when all maxconn connections are checked out,
+    get_conn() waits up to timeout seconds (None = forever) for one to free up.
+    Returned connections stay open for reuse until they've been idle for
+    idle_timeout seconds (None = forever), never dropping below minconn.
+    """
+    global _db_pool, _dsn, _slots, _checkout_timeout
     if _db_pool is None:
-        _db_pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
-            dsn=dsn
+        _dsn = dsn
+        _slots = threading.BoundedSemaphore(maxconn)
+        _checkout_timeout = timeout
+        _db_pool = IdleConnectionPool(
+            minconn=minconn,
+            maxconn=maxconn,
+            dsn=dsn,
+            connection_factory=UnitOfWorkConnection,
+            idle_timeout=idle_timeout,
         )
 
 
-def get_conn():
-    """Get a connection from the pool."""
+def _is_alive(conn) -> bool:
+    if conn.closed:
+        return False
+    returned = _db_pool.returned_at(conn)
+    if returned is not None and time.monotonic() - returned < VALIDATE_AFTER_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def get_conn(timeout: Optional[float] = None):
+    """
+    Get a connection from the pool, waiting if all are in use.
+
+    Raises PoolTimeout if none frees up within timeout (defaults to the
+    pool's checkout timeout). Stale connections are replaced transparently.
+    """
     if _db_pool is None:
         raise RuntimeError("DB pool not initialized!")
-    return _db_pool.getconn()
+    timeout = _checkout_timeout if timeout is None else timeout
+
+    started = time.monotonic()
+    if not _slots.acquire(timeout=timeout):
+        with _stats_lock:
+            _stats["timeouts"] += 1
+        raise PoolTimeout(f"No DB connection available after {timeout}s")
+    waited = time.monotonic() - started
+
+    try:
+        conn = _db_pool.getconn()
+        while not _is_alive(conn):
+            with _stats_lock:
+                _stats["discarded"] += 1
+            _db_pool.putconn(conn, close=True)
+            conn = _db_pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+
+    with _stats_lock:
+        _stats["checkouts"] += 1
+        _stats["wait_total"] += waited
+        _stats["wait_max"] = max(_stats["wait_max"], waited)
+    return conn
 
 
-def put_conn(conn):
-    """Return a connection to the pool."""
-    _db_pool.putconn(conn)
+def put_conn(conn, close: bool = False):
+    """Return a connection to the pool (close=True discards it)."""
+    try:
+        _db_pool.putconn(conn, close=close)
+    finally:
+        _slots.release()
+
+
+def get_pool_stats() -> dict:
+    """Gauges (in use / idle / max) and checkout wait counters for this process."""
+    if _db_pool is None:
+        return {"initialized": False}
+    with _stats_lock:
+        stats = dict(_stats)
+    checkouts = stats["checkouts"]
+    in_use, idle = _db_pool.gauges()
+    return {
+        "initialized": True,
+        "max": _db_pool.maxconn,
+        "in_use": in_use,
+        "idle": idle,
+        "checkouts": checkouts,
+        "timeouts": stats["timeouts"],
+        "discarded": stats["discarded"],
+        "avg_wait_seconds": round(stats["wait_total"] / checkouts, 4) if checkouts else 0.0,
+        "max_wait_seconds": round(stats["wait_max"], 4),
+    }
 
 
 @contextmanager
@@ -33,6 +233,10 @@ def get_db_connection() -> Generator[psycopg2.extensions.connection, None, None]
     """
     Context manager for database connections.
     Automatically handles connection acquisition and release.
+
+    Nested calls (e.g. a repo function called while another holds a cursor)
+    reuse the outer connection and transaction; only the outermost call
+    rolls back on error and returns the connection to the pool.
     
     Usage:
         with get_db_connection() as conn:
@@ -40,15 +244,24 @@ def get_db_connection() -> Generator[psycopg2.extensions.connection, None, None]
                 cur.execute("SELECT * FROM users")
                 result = cur.fetchall()
     """
+    shared = _current_conn.get()
+    if shared is not None:
+        yield shared
+        return
+
     conn = None
+    token = None
     try:
         conn = get_conn()
+        token = _current_conn.set(conn)
         yield conn
     except Exception:
         if conn:
             conn.rollback()
         raise
     finally:
+        if token is not None:
+            _current_conn.reset(token)
         if conn:
             put_conn(conn)
 
@@ -64,18 +277,236 @@ def get_db_cursor() -> Generator[psycopg2.extensions.cursor, None, None]:
             cur.execute("SELECT * FROM users")
             result = cur.fetchall()
     """
-    conn = None
-    try:
-        conn = get_conn()
+    with get_db_connection() as conn:
         with conn.cursor() as cur:
             yield cur
-    except Exception:
-        if conn:
-            conn.rollback()
-        raise
+
+
+@contextmanager
+def unit_of_work() -> Generator[psycopg2.extensions.connection, None, None]:
+    """
+    Run several repo calls atomically on one connection.
+
+    Repo functions called inside the block share its connection, and their
+    own commit() calls are deferred; everything commits once when the
+    outermost unit_of_work exits, or rolls back if it raises.
+
+    Usage:
+        with unit_of_work():
+            events.create_event(...)
+            evt = events.get_active_event()
+            events.add_message_to_event(evt.id, msg.id)
+    """
+    with get_db_connection() as conn:
+        conn.deferred_commits += 1
+        try:
+            yield conn
+        except Exception:
+            conn.deferred_commits -= 1
+            if not conn.deferred_commits:
+                conn.rollback()
+            raise
+        conn.deferred_commits -= 1
+        if not conn.deferred_commits:
+            conn.commit()
+
+
+def in_unit_of_work() -> bool:
+    """True if the current thread is inside unit_of_work() (commits are deferred)."""
+    conn = _current_conn.get()
+    return conn is not None and conn.deferred_commits > 0
+
+
+@contextmanager
+def advisory_lock(*keys: int) -> Generator[bool, None, None]:
+    """
+    Try to take a session-level Postgres advisory lock without waiting.
+
+    Yields True if this process now holds the lock, False if someone else
+    does. The lock lives on a dedicated pool connection for the duration of
+    the block, so if the process dies Postgres releases it when the
+    connection drops and another worker can take over.
+
+    Usage:
+        with advisory_lock(5980, event_id) as acquired:
+            if not acquired:
+                return
+            ...
+    """
+    placeholders = ", ".join(["%s"] * len(keys))
+    conn = get_conn()
+    acquired = False
+    discard = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT pg_try_advisory_lock({placeholders})", keys)
+            acquired = cur.fetchone()[0]
+        # The session lock outlives the transaction; don't sit idle in one
+        conn.commit()
+        yield acquired
     finally:
-        if conn:
-            put_conn(conn)
+        try:
+            if acquired:
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT pg_advisory_unlock({placeholders})", keys)
+                conn.commit()
+        except psycopg2.Error as e:
+            # Closing the session is the only other way to release the lock
+            log.warning(f"Failed to release advisory lock {keys}: {e}; discarding connection")
+            discard = True
+        finally:
+            put_conn(conn, close=discard)
+
+
+class LeaderElection:
+    """Handle for a run_leader_election() thread."""
+
+    def __init__(self, keys: Sequence[int]):
+        self.keys = tuple(keys)
+        self.thread = None
+        self._conn = None
+        self._leading = False
+        # The election thread and is_leader() callers share the lock connection
+        self._lock = threading.Lock()
+
+    def is_leader(self) -> bool:
+        """
+        Confirm on the lock connection that this process still holds the lock.
+
+        The election thread only notices a lost lock every
+        LEADER_CHECK_SECONDS; call this before doing leader-only work to
+        narrow the window where two processes both act as leader.
+        """
+        with self._lock:
+            if not self._leading or self._conn is None:
+                return False
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT EXISTS (
+                            SELECT 1 FROM pg_locks
+                            WHERE locktype = 'advisory' AND granted AND pid = pg_backend_pid()
+                              AND classid = %s AND objid = %s AND objsubid = 2
+                        )
+                    """, self.keys)
+                    return cur.fetchone()[0]
+            except Exception as e:
+                log.warning(f"Leader lock {self.keys} check failed: {e}")
+                return False
+
+
+def run_leader_election(
+    keys: Sequence[int],
+    on_elected: Callable[[], None],
+    on_lost: Callable[[], None],
+) -> LeaderElection:
+    """
+    Compete for a long-lived (two-key) advisory lock from a daemon thread.
+
+    The process that gets the lock is the leader until its dedicated
+    connection drops (crash, restart, network), at which point Postgres
+    frees the lock and another process takes it within LEADER_CHECK_SECONDS.
+    on_elected / on_lost are called from the election thread. The returned
+    handle's is_leader() re-checks the lock on demand.
+    """
+    if _db_pool is None:
+        raise RuntimeError("DB pool not initialized!")
+    election = LeaderElection(keys)
+
+    def run():
+        while True:
+            leading = False
+            try:
+                conn = psycopg2.connect(_dsn)
+                conn.autocommit = True
+                with election._lock:
+                    election._conn = conn
+                while True:
+                    elected = False
+                    with election._lock, conn.cursor() as cur:
+                        if leading:
+                            # Losing this connection is losing the lock
+                            cur.execute("SELECT 1")
+                        else:
+                            cur.execute("SELECT pg_try_advisory_lock(%s, %s)", election.keys)
+                            elected = leading = election._leading = cur.fetchone()[0]
+                    if elected:
+                        log.info(f"Elected leader for lock {election.keys}")
+                        on_elected()
+                    time.sleep(LEADER_CHECK_SECONDS)
+            except Exception as e:
+                log.warning(f"Leader election for lock {election.keys} interrupted: {e}")
+            finally:
+                with election._lock:
+                    election._leading = False
+                    conn, election._conn = election._conn, None
+                if leading:
+                    try:
+                        on_lost()
+                    except Exception:
+                        log.exception("Error stepping down as leader")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(LEADER_CHECK_SECONDS)
+
+    election.thread = threading.Thread(target=run, name=f"leader-{'-'.join(map(str, keys))}", daemon=True)
+    election.thread.start()
+    return election
+
+
+def notify(channel: str, payload: str = "") -> None:
+    """Send a Postgres NOTIFY (delivered to listeners once committed)."""
+    with get_db_cursor() as cur:
+        cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+        cur.connection.commit()
+
+
+def listen(channel: str, callback: Callable[[Optional[str]], None]) -> threading.Thread:
+    """
+    Call callback(payload) for every NOTIFY on channel, from a daemon thread.
+
+    Uses its own autocommit connection (not a pool slot). After a dropped
+    connection it reconnects and calls callback(None), since notifications
+    sent in between were missed.
+    """
+    if _db_pool is None:
+        raise RuntimeError("DB pool not initialized!")
+
+    def run():
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(_dsn)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {channel}")
+                if reconnecting:
+                    callback(None)
+                log.info(f"Listening for notifications on {channel}")
+                while True:
+                    if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        callback(conn.notifies.pop(0).payload or None)
+            except Exception as e:
+                log.warning(f"LISTEN {channel} connection lost: {e}; retrying in {LISTEN_RETRY_SECONDS}s")
+                reconnecting = True
+                time.sleep(LISTEN_RETRY_SECONDS)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    thread = threading.Thread(target=run, name=f"listen-{channel}", daemon=True)
+    thread.start()
+    return thread
 
 
 def close_pool():
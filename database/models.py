@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime
 import enum
@@ -22,6 +22,7 @@ class Event:
     time_start: Optional[datetime]
     duration_days: Optional[int]  # Changed from day_duration to duration_days
     is_finalized: Optional[int] = 0  # 0 = not finalized, 1 = finalized
+    ends_at: Optional[datetime] = None  # generated: time_start + duration_days
 
 
 @dataclass
@@ -51,4 +52,24 @@ class SlackEnterprise:
     enterprise_name: str
     description: Optional[str]
     created_at: Optional[datetime]
-    updated_at: Optional[datetime]
\ No newline at end of file
+    updated_at: Optional[datetime]
+
+
+@dataclass
+class ThreadEngagement:
+    thread_ts: str
+    bot_intervened: bool
+    intervention_type: Optional[str]
+    participants: List[Tuple[int, str, int]]  # (user_id, slack_id, engagement_score), most engaged first
+    version: int = 0  # monitored_threads.activity_version the participants reflect
+
+
+@dataclass
+class FinalizationStep:
+    event_id: int
+    group_index: int  # -1 for the event-level announcement
+    step: str  # metadata | create | invite | welcome | announce
+    status: str  # started | done | failed | skipped
+    payload: Optional[dict]
+    attempts: int
+    last_error: Optional[str]
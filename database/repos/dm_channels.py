@@ -0,0 +1,24 @@
+from database.db import get_db_cursor
+from typing import Optional
+
+
+def get_dm_channel(slack_id: str) -> Optional[str]:
+    """Return the cached DM channel id for a Slack user, if we have one."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            "SELECT channel_id FROM dm_channels WHERE slack_id = %s",
+            (slack_id,)
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def save_dm_channel(slack_id: str, channel_id: str) -> None:
+    """Remember the DM channel id for a Slack user."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """INSERT INTO dm_channels (slack_id, channel_id) VALUES (%s, %s)
+               ON CONFLICT (slack_id) DO UPDATE SET channel_id = EXCLUDED.channel_id""",
+            (slack_id, channel_id)
+        )
+        cur.connection.commit()
@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from database import db
 from database.db import get_db_cursor
 from database.models import Event
 from pathlib import Path
@@ -9,6 +12,22 @@ from datetime import datetime, timedelta
 SQL_PATH = os.path.join(
     Path(__file__).resolve().parents[1], "DML", "get_event_responses.sql")
 
+# Postgres NOTIFY channel used to tell every worker the active event changed
+ACTIVE_EVENT_CHANNEL = "active_event_changed"
+# Upper bound on how long a cached active-event lookup is trusted (seconds),
+# in case a notification is missed; entries also expire at the event's end
+ACTIVE_EVENT_CACHE_MAX_AGE = 60
+
+_active_lock = threading.Lock()
+_active_cache = {"event": None, "expires_at": 0.0}
+# Bumped on every invalidation so a lookup that raced with one isn't cached
+_active_generation = 0
+
+
+def _to_event(row) -> Event:
+    """Build an Event from (id, time_start, duration_days, is_finalized, ends_at, ...)."""
+    return Event(id=row[0], time_start=row[1], duration_days=row[2], is_finalized=row[3], ends_at=row[4])
+
 
 def get_event_responses(event_id: int) -> List[str]:
     with get_db_cursor() as cur:
@@ -58,8 +77,8 @@ def create_event(time_start: Optional[datetime] = None, duration_days: int = 3)
             # Use current time if no start time provided
             if time_start is None:
                 time_start = datetime.now()
-            # Check if an event is already active
-            if get_active_event():
+            # Check if an event is already active (uncached: another worker may have just created one)
+            if _load_active_event()[0]:
                 return "event_already_active"
             # Store the provided number of days in the existing `duration_days` column
             cur.execute(
@@ -67,7 +86,9 @@ def create_event(time_start: Optional[datetime] = None, duration_days: int = 3)
                 (time_start, duration_days)
             )
             event_id = cur.fetchone()[0]
+            _notify_active_event_changed(cur)
             cur.connection.commit()
+            invalidate_active_event_cache()
 
             print(f"Event created successfully with ID: {event_id}")
             print(f"Start time: {time_start}")
@@ -104,7 +125,9 @@ def delete_event(event_id: int) -> Literal["success", "event_not_found", "databa
             cur.execute(
                 "DELETE FROM events WHERE id = %s CASCADE", (event_id,))
             rows_deleted = cur.rowcount
+            _notify_active_event_changed(cur)
             cur.connection.commit()
+            invalidate_active_event_cache()
 
             if rows_deleted > 0:
                 print(f"Event {event_id} deleted successfully")
@@ -118,43 +141,111 @@ def delete_event(event_id: int) -> Literal["success", "event_not_found", "databa
 
 
 def get_active_event() -> Optional[Event]:
+    """
+    The earliest non-finalized event that hasn't ended, or None.
+
+    Served from a process-local cache that expires at the event's end time
+    (or after ACTIVE_EVENT_CACHE_MAX_AGE) and is invalidated by
+    create_event / mark_event_finalized / delete_event, locally and in other
+    workers via NOTIFY (see start_active_event_listener). Inside a
+    unit_of_work the cache is bypassed so uncommitted changes are visible.
+    """
+    if db.in_unit_of_work():
+        return _load_active_event()[0]
+
+    now = time.monotonic()
+    with _active_lock:
+        if now < _active_cache["expires_at"]:
+            return _active_cache["event"]
+        generation = _active_generation
+
+    event, seconds_left = _load_active_event()
+    ttl = ACTIVE_EVENT_CACHE_MAX_AGE if seconds_left is None else min(ACTIVE_EVENT_CACHE_MAX_AGE, seconds_left)
+    with _active_lock:
+        if generation == _active_generation:
+            _active_cache["event"] = event
+            _active_cache["expires_at"] = now + max(ttl, 0.0)
+    return event
+
+
+def _load_active_event():
+    """Query the active event and the seconds until it ends."""
     with get_db_cursor() as cur:
         cur.execute("""
-            WITH non_finalized_events AS(
-                SELECT * FROM events WHERE is_finalized = 0
-            )
-
             SELECT 
-                id, time_start, duration_days, is_finalized FROM non_finalized_events 
+                id, time_start, duration_days, is_finalized, ends_at,
+                EXTRACT(EPOCH FROM (ends_at - NOW()))
+            FROM events 
             WHERE 
-                time_start + INTERVAL '1 day' * duration_days >= NOW() 
+                is_finalized = 0
+                AND ends_at >= NOW() 
             ORDER BY time_start 
             ASC LIMIT 1
         """)
         row = cur.fetchone()
         if row:
-            return Event(id=row[0], time_start=row[1], duration_days=row[2], is_finalized=row[3])
-        return None
+            return _to_event(row), float(row[5])
+        return None, None
+
+
+def invalidate_active_event_cache(payload: Optional[str] = None) -> None:
+    """Drop this process's cached active event (payload is the ignored NOTIFY payload)."""
+    global _active_generation
+    with _active_lock:
+        _active_generation += 1
+        _active_cache["event"] = None
+        _active_cache["expires_at"] = 0.0
+
+
+def _notify_active_event_changed(cur) -> None:
+    """Queue a NOTIFY; Postgres delivers it when the caller's transaction commits."""
+    cur.execute("SELECT pg_notify(%s, '')", (ACTIVE_EVENT_CHANNEL,))
 
 
-def get_unfinalized_ended_events() -> List[Event]:
+def start_active_event_listener() -> None:
+    """Keep this worker's active-event cache coherent with changes made by other workers."""
+    db.listen(ACTIVE_EVENT_CHANNEL, invalidate_active_event_cache)
+
+
+def get_unfinalized_ended_events(event_id: Optional[int] = None) -> List[Event]:
     """
     Get all events that have ended but haven't been finalized yet.
     This is used by the scheduler to find events ready for auto-finalization.
     
+    Args:
+        event_id: Only check this event
+        
     Returns:
         List of Event objects that are ended but not finalized
     """
     with get_db_cursor() as cur:
         cur.execute("""
-            SELECT id, time_start, duration_days, is_finalized 
+            SELECT id, time_start, duration_days, is_finalized, ends_at 
+            FROM events 
+            WHERE is_finalized = 0
+            AND ends_at < NOW()
+            AND (%s::INTEGER IS NULL OR id = %s)
+            ORDER BY time_start ASC
+        """, (event_id, event_id))
+        rows = cur.fetchall()
+        return [_to_event(row) for row in rows]
+
+
+def get_pending_events() -> List[Event]:
+    """
+    Get all non-finalized events that haven't ended yet, so the scheduler can
+    (re)register a finalization job at each one's end time.
+    """
+    with get_db_cursor() as cur:
+        cur.execute("""
+            SELECT id, time_start, duration_days, is_finalized, ends_at 
             FROM events 
             WHERE is_finalized = 0
-            AND time_start + INTERVAL '1 day' * duration_days < NOW()
+            AND ends_at >= NOW()
             ORDER BY time_start ASC
         """)
         rows = cur.fetchall()
-        return [Event(id=row[0], time_start=row[1], duration_days=row[2], is_finalized=row[3]) for row in rows]
+        return [_to_event(row) for row in rows]
 
 
 def mark_event_finalized(event_id: int) -> Literal["success", "event_not_found", "database_error"]:
@@ -176,7 +267,9 @@ def mark_event_finalized(event_id: int) -> Literal["success", "event_not_found",
                 (event_id,)
             )
             rows_updated = cur.rowcount
+            _notify_active_event_changed(cur)
             cur.connection.commit()
+            invalidate_active_event_cache()
             
             if rows_updated > 0:
                 print(f"Event {event_id} marked as finalized")
@@ -189,9 +282,9 @@ def mark_event_finalized(event_id: int) -> Literal["success", "event_not_found",
         return "database_error"
 
 
-def get_most_recent_event():
+def get_most_recent_event() -> Optional[Event]:
     with get_db_cursor() as cur:
-        query = """SELECT *
+        query = """SELECT id, time_start, duration_days, is_finalized, ends_at
                     FROM events
                     WHERE time_start = (
                         SELECT MAX(time_start)
@@ -199,9 +292,8 @@ def get_most_recent_event():
                     );"""
         cur.execute(query)
         row = cur.fetchone()
-        print(row)
         if row:
-            return Event(id=row[0], time_start=row[1], day_duration=row[2])
+            return _to_event(row)
         return None
 
 
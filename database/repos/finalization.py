@@ -0,0 +1,155 @@
+from database.db import get_db_cursor
+from database.models import FinalizationStep
+from psycopg2.extras import Json
+from typing import Dict, List, Optional, Tuple
+
+# Per-group steps, in the order they run
+GROUP_STEPS = ("metadata", "create", "invite", "welcome")
+ANNOUNCE_STEP = "announce"
+# group_index used for event-level steps
+EVENT_LEVEL = -1
+
+_STEP_COLUMNS = "event_id, group_index, step, status, payload, attempts, last_error"
+
+
+def _to_step(row) -> FinalizationStep:
+    return FinalizationStep(
+        event_id=row[0],
+        group_index=row[1],
+        step=row[2],
+        status=row[3],
+        payload=row[4],
+        attempts=row[5],
+        last_error=row[6],
+    )
+
+
+def get_job_groups(event_id: int) -> Optional[List[List[str]]]:
+    """The groups stored for an event's finalization job, or None if it hasn't been classified yet."""
+    with get_db_cursor() as cur:
+        cur.execute("SELECT groups FROM finalization_jobs WHERE event_id = %s", (event_id,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def create_job(event_id: int, groups: List[List[str]]) -> List[List[str]]:
+    """
+    Persist the classified groups for an event.
+
+    If the job already has groups (a concurrent run got there first), those
+    are returned instead, so every run works on the same grouping.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            WITH inserted AS (
+                INSERT INTO finalization_jobs (event_id, groups)
+                VALUES (%s, %s)
+                ON CONFLICT (event_id) DO UPDATE
+                SET groups = EXCLUDED.groups,
+                    updated_at = NOW()
+                WHERE finalization_jobs.groups IS NULL
+                RETURNING groups
+            )
+            SELECT groups FROM inserted
+            UNION ALL
+            SELECT groups FROM finalization_jobs WHERE event_id = %s AND groups IS NOT NULL
+            LIMIT 1
+            """,
+            (event_id, Json(groups), event_id)
+        )
+        row = cur.fetchone()
+        cur.connection.commit()
+        return row[0]
+
+
+def record_classify_failure(event_id: int, error: str) -> int:
+    """Count a failed classification attempt for an event; returns the attempts so far."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO finalization_jobs (event_id, classify_attempts, last_error)
+            VALUES (%s, 1, %s)
+            ON CONFLICT (event_id) DO UPDATE
+            SET classify_attempts = finalization_jobs.classify_attempts + 1,
+                last_error = EXCLUDED.last_error,
+                updated_at = NOW()
+            RETURNING classify_attempts
+            """,
+            (event_id, error)
+        )
+        attempts = cur.fetchone()[0]
+        cur.connection.commit()
+        return attempts
+
+
+def set_job_status(event_id: int, status: str) -> None:
+    with get_db_cursor() as cur:
+        cur.execute(
+            "UPDATE finalization_jobs SET status = %s, updated_at = NOW() WHERE event_id = %s",
+            (status, event_id)
+        )
+        cur.connection.commit()
+
+
+def get_steps(event_id: int) -> Dict[Tuple[int, str], FinalizationStep]:
+    """All recorded steps for an event, keyed by (group_index, step). Missing keys haven't run yet."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            f"SELECT {_STEP_COLUMNS} FROM finalization_steps WHERE event_id = %s",
+            (event_id,)
+        )
+        return {(row[1], row[2]): _to_step(row) for row in cur.fetchall()}
+
+
+def start_step(event_id: int, group_index: int, step: str, payload: dict) -> FinalizationStep:
+    """
+    Checkpoint what a step is about to do before it calls out, so a rerun
+    after a crash can recognise its own side effects. Not counted as an attempt.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO finalization_steps (event_id, group_index, step, status, payload, attempts)
+            VALUES (%s, %s, %s, 'started', %s, 0)
+            ON CONFLICT (event_id, group_index, step) DO UPDATE
+            SET status = 'started',
+                payload = EXCLUDED.payload,
+                updated_at = NOW()
+            RETURNING {_STEP_COLUMNS}
+            """,
+            (event_id, group_index, step, Json(payload))
+        )
+        row = cur.fetchone()
+        cur.connection.commit()
+        return _to_step(row)
+
+
+def record_step(
+    event_id: int,
+    group_index: int,
+    step: str,
+    status: str,
+    payload: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> FinalizationStep:
+    """Record the outcome of one attempt at a step (attempts counts every attempt)."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO finalization_steps (event_id, group_index, step, status, payload, last_error)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (event_id, group_index, step) DO UPDATE
+            SET status = EXCLUDED.status,
+                payload = COALESCE(EXCLUDED.payload, finalization_steps.payload),
+                last_error = EXCLUDED.last_error,
+                attempts = finalization_steps.attempts + 1,
+                updated_at = NOW()
+            RETURNING {_STEP_COLUMNS}
+            """,
+            (event_id, group_index, step, status,
+             Json(payload) if payload is not None else None, error)
+        )
+        row = cur.fetchone()
+        cur.connection.commit()
+        return _to_step(row)
@@ -0,0 +1,42 @@
+from database.db import get_db_cursor
+from psycopg2.extras import Json
+from typing import Dict, List
+
+
+def start_run(trigger: str, worker_pid: int) -> int:
+    """Record the start of a finalization run and return its id."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO finalization_runs (trigger, worker_pid) VALUES (%s, %s) RETURNING id",
+            (trigger, worker_pid)
+        )
+        run_id = cur.fetchone()[0]
+        cur.connection.commit()
+        return run_id
+
+
+def finish_run(
+    run_id: int,
+    status: str,
+    events_processed: int,
+    groups_created: int,
+    channels_created: int,
+    errors: List[str],
+    stage_timings: Dict[str, Dict[str, float]],
+) -> None:
+    """Record the outcome of a finalization run (stage_timings is keyed by event id)."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """UPDATE finalization_runs
+               SET status = %s,
+                   finished_at = NOW(),
+                   events_processed = %s,
+                   groups_created = %s,
+                   channels_created = %s,
+                   errors = %s,
+                   stage_timings = %s
+               WHERE id = %s""",
+            (status, events_processed, groups_created, channels_created,
+             Json(errors), Json(stage_timings), run_id)
+        )
+        cur.connection.commit()
@@ -0,0 +1,55 @@
+from database.db import get_db_cursor
+from psycopg2.extras import Json
+from typing import Optional, Tuple
+
+
+def get_cached_response(cache_key: str) -> Tuple[bool, Optional[object]]:
+    """
+    Look up an unexpired cached response and bump its last_used_at.
+
+    Returns:
+        (found, response)
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """UPDATE gemini_cache SET last_used_at = NOW()
+               WHERE cache_key = %s AND expires_at > NOW()
+               RETURNING response""",
+            (cache_key,)
+        )
+        row = cur.fetchone()
+        cur.connection.commit()
+        if row:
+            return True, row[0]["value"]
+        return False, None
+
+
+def save_response(cache_key: str, model: str, response: object, ttl_seconds: int) -> None:
+    with get_db_cursor() as cur:
+        cur.execute(
+            """INSERT INTO gemini_cache (cache_key, model, response, expires_at)
+               VALUES (%s, %s, %s, NOW() + INTERVAL '1 second' * %s)
+               ON CONFLICT (cache_key) DO UPDATE
+               SET response = EXCLUDED.response,
+                   last_used_at = NOW(),
+                   expires_at = EXCLUDED.expires_at""",
+            (cache_key, model, Json({"value": response}), ttl_seconds)
+        )
+        cur.connection.commit()
+
+
+def evict_responses(max_entries: int) -> int:
+    """Delete expired rows and the least recently used rows beyond max_entries. Returns rows deleted."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """DELETE FROM gemini_cache
+               WHERE expires_at <= NOW()
+               OR cache_key IN (
+                   SELECT cache_key FROM gemini_cache
+                   ORDER BY last_used_at DESC
+                   OFFSET %s
+               )""",
+            (max_entries,)
+        )
+        cur.connection.commit()
+        return cur.rowcount
@@ -1,6 +1,6 @@
-from database.db import get_db_cursor
+from database.db import get_db_cursor, DEFAULT_BATCH_SIZE
 from database.models import SysMessage, SysMessageType
-from typing import Optional, List
+from typing import Iterator, Optional, List
 
 def create_private_message(content: str) -> SysMessage:
     """Create a new private message (potential prompt) for starting events."""
@@ -54,6 +54,28 @@ def get_all_private_messages(limit: Optional[int] = None) -> List[SysMessage]:
             for row in rows
         ]
 
+def iter_private_messages(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[SysMessage]:
+    """Yield all private messages (newest first), batch_size rows per short-lived query (keyset pagination)."""
+    last_id = None
+    while True:
+        with get_db_cursor() as cur:
+            cur.execute(
+                """SELECT id, type, content FROM sys_messages
+                   WHERE type = %s AND (%s IS NULL OR id < %s)
+                   ORDER BY id DESC LIMIT %s""",
+                (SysMessageType.private, last_id, last_id, batch_size)
+            )
+            rows = cur.fetchall()
+        for row in rows:
+            yield SysMessage(
+                id=row[0],
+                type=SysMessageType(row[1]),
+                content=row[2]
+            )
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
 def get_random_private_message() -> Optional[SysMessage]:
     """Get a random private message for use in starting an event."""
     with get_db_cursor() as cur:
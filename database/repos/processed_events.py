@@ -0,0 +1,24 @@
+from database.db import get_db_cursor
+
+
+def claim_event(event_id: str) -> bool:
+    """Record a Slack event_id. Returns False if it was already recorded (a duplicate)."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO processed_events (event_id) VALUES (%s) ON CONFLICT DO NOTHING RETURNING event_id",
+            (event_id,)
+        )
+        row = cur.fetchone()
+        cur.connection.commit()
+        return row is not None
+
+
+def purge_processed_events(older_than_hours: int) -> int:
+    """Delete recorded event ids older than the retention window. Returns rows deleted."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            "DELETE FROM processed_events WHERE received_at < NOW() - INTERVAL '1 hour' * %s",
+            (older_than_hours,)
+        )
+        cur.connection.commit()
+        return cur.rowcount
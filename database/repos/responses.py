@@ -1,7 +1,5 @@
 import os
 from database.db import get_db_cursor
-from database.repos import events
-from database.repos import users
 from pathlib import Path
 from typing import Optional, List, Literal, Tuple
 
@@ -12,6 +10,12 @@ SQL_PATH = os.path.join(
 SQL_PATH_WITH_USERS = os.path.join(
     Path(__file__).resolve().parents[1], "DML", "get_responses_with_users.sql")
 
+SQL_PATH_EMBEDDINGS = os.path.join(
+    Path(__file__).resolve().parents[1], "DML", "get_response_embeddings.sql")
+
+SQL_PATH_UPSERT = os.path.join(
+    Path(__file__).resolve().parents[1], "DML", "upsert_response.sql")
+
 
 def get_event_responses(event_id: int) -> List[str]:
     with get_db_cursor() as cur:
@@ -30,6 +34,20 @@ def get_event_user_ids(event_id: int) -> List[int]:
         rows = cur.fetchall()
         return [row[0] for row in rows]
 
+def get_event_responder_slack_ids(event_id: int) -> List[str]:
+    """Slack ids of the distinct users who responded to an event, in one query."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT u.slack_id
+            FROM responses r
+            JOIN users u ON r.user_id = u.id
+            WHERE r.event_id = %s AND u.slack_id IS NOT NULL
+            """,
+            (event_id,)
+        )
+        return [row[0] for row in cur.fetchall()]
+
 def get_responses_with_users(event_id: int) -> List[Tuple[str, str]]:
     """
     Get all responses for an event with user slack_ids.
@@ -48,31 +66,71 @@ def get_responses_with_users(event_id: int) -> List[Tuple[str, str]]:
         return rows
 
 
-def add_response(user_slack_id: str, response: str) -> Literal["success", "event_over", "database_error", "no_active_event"]:
+def get_response_embeddings(event_id: int) -> List[Tuple[str, str, Optional[bytes]]]:
+    """
+    Get all responses for an event with their stored embeddings.
+
+    Returns:
+        List of tuples: [(slack_id, response_text, embedding_bytes_or_None), ...]
+    """
+    with get_db_cursor() as cur:
+        with open(SQL_PATH_EMBEDDINGS, 'r', encoding='utf-8') as f:
+            sql_script = f.read()
+        cur.execute(sql_script, (event_id,))
+        return [(slack_id, entry, bytes(embedding) if embedding is not None else None)
+                for slack_id, entry, embedding in cur.fetchall()]
+
+
+def save_response_embedding(user_slack_id: str, event_id: int, entry: str, embedding: bytes) -> bool:
+    """
+    Store the embedding for a user's response to an event.
+
+    Only applies if the stored entry still matches the text that was embedded,
+    so a vector computed for an older edit never overwrites a newer one.
+    Returns True if a row was updated.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            UPDATE responses r
+            SET embedding = %s
+            FROM users u
+            WHERE r.user_id = u.id AND u.slack_id = %s AND r.event_id = %s AND r.entry = %s
+            """,
+            (embedding, user_slack_id, event_id, entry)
+        )
+        updated = cur.rowcount > 0
+        cur.connection.commit()
+        return updated
+
+
+def add_response(
+    user_slack_id: str, response: str
+) -> Tuple[Literal["success", "event_over", "database_error", "no_active_event"], Optional[int]]:
+    """
+    Save or replace a user's response to the active event.
+
+    Resolves the active event, resolves or creates the user and upserts the
+    row in a single statement (see DML/upsert_response.sql), relying on the
+    unique (user_id, event_id) index instead of a select-then-insert.
+
+    Returns:
+        (status, event_id) where event_id is the event the response was
+        written to (None unless status is "success")
+    """
     try:
         with get_db_cursor() as cur:
-            active_event = events.get_active_event()
-            if not active_event:
-                return "no_active_event"
-            event_id = active_event.id
-            user_id = users.get_user_by_slack_id(user_slack_id).id
-            cur.execute(
-                "SELECT id from responses WHERE user_id=%s AND event_id=%s",
-                (user_id, event_id,)
-            )
-            if cur.fetchone():
-                cur.execute(
-                    "UPDATE responses SET entry=%s WHERE user_id=%s AND event_id=%s",
-                    (response, user_id, event_id)
-                )
-            else:
-                cur.execute(
-                    "INSERT INTO responses (entry, user_id, event_id, submitted_at) VALUES (%s, %s, %s, NOW())",
-                    (response, user_id, event_id)
-                )
+            with open(SQL_PATH_UPSERT, 'r', encoding='utf-8') as f:
+                sql_script = f.read()
+            cur.execute(sql_script, {"slack_id": user_slack_id, "entry": response})
+            event_id, upserted_event_id = cur.fetchone()
             cur.connection.commit()
-            return "success"
+            if event_id is None:
+                return "no_active_event", None
+            if upserted_event_id is None:
+                return "database_error", None
+            return "success", upserted_event_id
     except Exception as e:
         # Log the error (you might want to use proper logging)
         print(f"Database error in add_response: {e}")
-        return "database_error"
+        return "database_error", None
@@ -0,0 +1,172 @@
+import os
+from database.db import get_db_cursor
+from database.models import ThreadEngagement
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+
+SQL_PATH_RECORD_ACTIVITY = os.path.join(
+    Path(__file__).resolve().parents[1], "DML", "record_thread_activity.sql")
+
+with open(SQL_PATH_RECORD_ACTIVITY, 'r', encoding='utf-8') as f:
+    _RECORD_ACTIVITY_SQL = f.read()
+
+
+def record_thread_activity(
+    thread_ts: str,
+    channel_id: str,
+    slack_id: str,
+    original_message: Optional[str] = None,
+    messages: int = 0,
+    reactions: int = 0,
+    score: int = 0,
+) -> Tuple[bool, Optional[str], int, Tuple[int, str, int]]:
+    """
+    Record a message or reaction in a thread in one statement.
+
+    Creates the user if needed and upserts monitored_threads and thread_participants.
+
+    Args:
+        thread_ts: Parent message ts of the thread
+        channel_id: Channel the thread lives in
+        slack_id: Slack user who engaged
+        original_message: Text of the parent message, if this event is the parent
+        messages: Messages to add to the thread and participant counters
+        reactions: Reactions to add to the participant counter
+        score: Engagement score to add to the participant
+
+    Returns:
+        (bot_intervened, intervention_type, activity_version, (user_id, slack_id, engagement_score))
+        with the thread's version and the participant's totals after the update
+    """
+    with get_db_cursor() as cur:
+        cur.execute(_RECORD_ACTIVITY_SQL, {
+            "thread_ts": thread_ts,
+            "channel_id": channel_id,
+            "slack_id": slack_id,
+            "original_message": original_message,
+            "messages": messages,
+            "reactions": reactions,
+            "score": score,
+        })
+        row = cur.fetchone()
+        cur.connection.commit()
+        return bool(row[0]), row[1], row[2], (row[3], row[4], row[5])
+
+
+def load_thread_engagement(thread_ts: Optional[str] = None, active_within_days: Optional[int] = None) -> List[ThreadEngagement]:
+    """
+    Load monitored threads with all of their participants.
+
+    Args:
+        thread_ts: Only load this thread
+        active_within_days: Only load threads with activity in the last N days
+
+    Returns:
+        List of ThreadEngagement, participants ordered by engagement score (highest first)
+    """
+    query = """
+        SELECT mt.thread_ts, mt.bot_intervened, mt.intervention_type,
+               tp.user_id, tp.slack_id, tp.engagement_score, mt.activity_version
+        FROM monitored_threads mt
+        LEFT JOIN thread_participants tp ON tp.thread_ts = mt.thread_ts
+        WHERE TRUE
+    """
+    params = []
+    if thread_ts is not None:
+        query += " AND mt.thread_ts = %s"
+        params.append(thread_ts)
+    if active_within_days is not None:
+        query += " AND mt.last_activity >= NOW() - INTERVAL '1 day' * %s"
+        params.append(active_within_days)
+    query += " ORDER BY mt.thread_ts, tp.engagement_score DESC NULLS LAST"
+
+    with get_db_cursor() as cur:
+        cur.execute(query, params)
+        threads = {}
+        for row in cur.fetchall():
+            engagement = threads.get(row[0])
+            if engagement is None:
+                engagement = threads[row[0]] = ThreadEngagement(
+                    thread_ts=row[0],
+                    bot_intervened=bool(row[1]),
+                    intervention_type=row[2],
+                    participants=[],
+                    version=row[6],
+                )
+            if row[3] is not None:
+                engagement.participants.append((row[3], row[4], row[5]))
+        return list(threads.values())
+
+
+def claim_thread_intervention(thread_ts: str, intervention_type: str, levels: List[str]) -> bool:
+    """
+    Raise a thread to intervention_type if it is currently at a lower level.
+
+    The check and the update are one conditional UPDATE, so when several
+    workers race on the same thread exactly one of them gets the claim.
+
+    Args:
+        thread_ts: Parent message ts of the thread
+        intervention_type: Level to claim
+        levels: Intervention types in escalation order
+
+    Returns:
+        True if this call raised the level (the caller should intervene)
+    """
+    with get_db_cursor() as cur:
+        cur.execute("""
+            UPDATE monitored_threads
+            SET intervention_type = %(type)s, bot_intervened = TRUE
+            WHERE thread_ts = %(thread_ts)s
+              AND COALESCE(array_position(%(levels)s::text[], intervention_type::text), 0)
+                  < array_position(%(levels)s::text[], %(type)s::text)
+            RETURNING 1
+        """, {"thread_ts": thread_ts, "type": intervention_type, "levels": levels})
+        claimed = cur.fetchone() is not None
+        cur.connection.commit()
+        return claimed
+
+
+def release_thread_intervention(thread_ts: str, intervention_type: str, levels: List[str]) -> Optional[str]:
+    """
+    Undo a claim whose Slack action failed.
+
+    Drops the thread back to the highest intervention actually logged in
+    bot_interventions, unless another claim has moved it on since.
+
+    Returns:
+        The thread's intervention type after the release
+    """
+    with get_db_cursor() as cur:
+        cur.execute("""
+            WITH logged AS (
+                SELECT intervention_type FROM bot_interventions
+                WHERE source_thread_ts = %(thread_ts)s AND successful
+                ORDER BY array_position(%(levels)s::text[], intervention_type::text) DESC NULLS LAST
+                LIMIT 1
+            )
+            UPDATE monitored_threads
+            SET intervention_type = (SELECT intervention_type FROM logged),
+                bot_intervened = EXISTS (SELECT 1 FROM logged)
+            WHERE thread_ts = %(thread_ts)s AND intervention_type = %(type)s
+            RETURNING intervention_type
+        """, {"thread_ts": thread_ts, "type": intervention_type, "levels": levels})
+        row = cur.fetchone()
+        cur.connection.commit()
+        return row[0] if row else intervention_type
+
+
+def record_intervention(
+    thread_ts: str,
+    intervention_type: str,
+    target_slack_ids: List[str],
+    channel_id: Optional[str] = None,
+) -> None:
+    """Log a successful bot intervention; the thread was marked by claim_thread_intervention."""
+    with get_db_cursor() as cur:
+        cur.execute("""
+            INSERT INTO bot_interventions (source_thread_ts, intervention_type, target_slack_ids, channel_id, successful)
+            VALUES (%s, %s, %s, %s, TRUE)
+        """, (thread_ts, intervention_type, target_slack_ids, channel_id))
+        cur.connection.commit()
@@ -1,6 +1,6 @@
-from database.db import get_db_cursor
+from database.db import get_db_cursor, DEFAULT_BATCH_SIZE
 from database.models import User
-from typing import Optional, List
+from typing import Iterator, Optional, List
 import uuid
 
 
@@ -73,6 +73,28 @@ def list_users(limit: int = 100) -> List[User]:
         return [User(id=row[0], slack_id=row[1]) for row in rows]
 
 
+def iter_users(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[User]:
+    """
+    Yield every user (ordered by id), reading batch_size rows at a time with
+    keyset pagination. Each batch uses a short-lived pool connection that is
+    returned before any row is yielded, so slow consumers (DM fan-out) never
+    pin a connection or an open transaction.
+    """
+    last_id = None
+    while True:
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT id, slack_id FROM users WHERE %s IS NULL OR id > %s ORDER BY id LIMIT %s",
+                (last_id, last_id, batch_size)
+            )
+            rows = cur.fetchall()
+        for row in rows:
+            yield User(id=row[0], slack_id=row[1])
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
 def is_user_admin(slack_id: str) -> bool:
     with get_db_cursor() as cur:
         cur.execute(
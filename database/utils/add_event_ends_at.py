@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Migration script to add a generated ends_at column to the events table.
+Lets get_active_event / get_unfinalized_ended_events use an index instead of
+scanning every event to compute time_start + duration_days.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def run_migration():
+    """Add generated ends_at column and partial index to events table"""
+    
+    print("=" * 60)
+    print("MIGRATION: Add generated ends_at column to events")
+    print("=" * 60)
+    
+    # Connect to database
+    conn = psycopg2.connect(
+        host=os.environ.get("DATABASE_HOST"),
+        user=os.environ.get("DATABASE_USER"),
+        password=os.environ.get("DATABASE_PASSWORD"),
+        port=os.environ.get("DATABASE_PORT"),
+        database=os.environ.get("DATABASE_NAME"),
+        connect_timeout=10
+    )
+    
+    try:
+        cursor = conn.cursor()
+        
+        # Check if ends_at column already exists
+        cursor.execute("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'events' AND column_name = 'ends_at'
+        """)
+        
+        if cursor.fetchone():
+            print("✅ Migration already complete! ends_at column exists.")
+            print("\nChecking current indexes...")
+            cursor.execute("""
+                SELECT indexname, indexdef
+                FROM pg_indexes
+                WHERE tablename = 'events'
+                ORDER BY indexname
+            """)
+            indexes = cursor.fetchall()
+            print("\nCurrent events table indexes:")
+            for index in indexes:
+                print(f"  • {index[0]}: {index[1]}")
+            return
+        
+        print("\n📋 Steps:")
+        print("1. Add ends_at TIMESTAMPTZ column generated from time_start + duration_days (UTC)")
+        print("2. Create partial index on ends_at for unfinalized events")
+        
+        input("\nPress Enter to continue or Ctrl+C to cancel...")
+        
+        # Step 1: Add generated column (rewrites the table to fill existing rows)
+        print("\n➡️  Adding ends_at column...")
+        cursor.execute("""
+            ALTER TABLE events ADD COLUMN ends_at TIMESTAMPTZ
+                GENERATED ALWAYS AS (
+                    (time_start AT TIME ZONE 'UTC' + INTERVAL '1 day' * duration_days) AT TIME ZONE 'UTC'
+                ) STORED
+        """)
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM events WHERE ends_at IS NOT NULL")
+        rows_filled = cursor.fetchone()[0]
+        print(f"✅ Column added ({rows_filled} existing events have an end time)")
+        
+        # Step 2: Create partial index
+        print("\n➡️  Creating index...")
+        cursor.execute("CREATE INDEX idx_events_unfinalized_ends_at ON events(ends_at) WHERE is_finalized = 0")
+        conn.commit()
+        print("✅ Index created")
+        
+        print("\n" + "=" * 60)
+        print("✅ MIGRATION COMPLETE!")
+        print("=" * 60)
+        print("\nSummary:")
+        print("  • Added generated ends_at column to events table")
+        print(f"  • Computed end times for {rows_filled} existing events")
+        print("  • Created partial index idx_events_unfinalized_ends_at (is_finalized = 0)")
+        print("\nDeadline queries can now use the index instead of scanning events!")
+        
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Apply a single DDL script from database/DDL to the configured database.
+
+Usage:
+    python -m database.utils.apply_ddl add_dm_channels.sql
+"""
+
+import psycopg2
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+load_dotenv()
+
+
+DDL_DIR = os.path.join(Path(__file__).resolve().parents[1], "DDL")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    sql_path = os.path.join(DDL_DIR, sys.argv[1])
+
+    # connection establishment
+    conn = psycopg2.connect(
+        host=os.environ.get("DATABASE_HOST"),
+        user=os.environ.get("DATABASE_USER"),
+        password=os.environ.get("DATABASE_PASSWORD"),
+        port=os.environ.get("DATABASE_PORT"),
+        database=os.environ.get("DATABASE_NAME"),
+        connect_timeout=10
+    )
+    conn.autocommit = True
+
+    with open(sql_path, 'r', encoding='utf-8') as f:
+        sql_script = f.read()
+    cursor = conn.cursor()
+    cursor.execute(sql_script)
+    print(f"✅ Applied {sys.argv[1]}")
+
+    # Closing the connection
+    conn.close()
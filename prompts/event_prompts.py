@@ -38,6 +38,40 @@ Only include groups with 2 or more users. Do not include single-user groups.
     return prompt
 
 
+def get_cluster_merge_prompt(clusters: List[Tuple[str, List[str]]]) -> str:
+    """
+    Generate prompt for merging clusters that were classified on separate shards.
+    
+    Args:
+        clusters: List of (cluster_id, sample_responses) tuples
+        
+    Returns:
+        Formatted prompt string for Gemini
+    """
+    formatted_clusters = "\n".join([
+        f"Cluster {cluster_id}: " + " | ".join(samples)
+        for cluster_id, samples in clusters
+    ])
+    
+    prompt = f"""These clusters of user responses were grouped separately, so some of them may be about the same theme. Each line shows a cluster id and sample responses from its members.
+
+Clusters:
+{formatted_clusters}
+
+Requirements:
+- Merge clusters that share the same theme, interests, or sentiment
+- Do not merge clusters just to make groups bigger; leave distinct clusters on their own
+- Every cluster id may appear in at most one merged group
+
+Return ONLY a JSON array of merged groups, where each group is an array of cluster ids.
+Example format: [["C1", "C7"], ["C2", "C3", "C9"]]
+
+Only include groups with 2 or more cluster ids. Clusters you don't mention stay unchanged.
+"""
+    
+    return prompt
+
+
 def get_channel_metadata_prompt(user_responses: List[Tuple[str, str]]) -> str:
     """
     Generate prompt for creating channel metadata based on grouped user responses.
@@ -71,3 +105,34 @@ Return as JSON with exactly these keys: channel_name, initial_message, call_to_a
 """
     
     return prompt
+
+
+def get_batch_channel_metadata_prompt(groups: List[List[Tuple[str, str]]]) -> str:
+    """
+    Generate prompt for creating channel metadata for several groups in one call.
+    
+    Args:
+        groups: One list of (slack_id, response_text) tuples per group
+        
+    Returns:
+        Formatted prompt string for Gemini
+    """
+    formatted_groups = "\n\n".join([
+        f"Group {number}:\n" + "\n".join([f"- {entry}" for _, entry in user_responses])
+        for number, user_responses in enumerate(groups, 1)
+    ])
+    
+    prompt = f"""Each group below contains users with similar interests. For every group, create metadata for a Slack channel to connect its users:
+
+{formatted_groups}
+
+For each group generate:
+1. group_number: The group's number exactly as shown above
+2. channel_name: A short, descriptive Slack channel name (lowercase, use hyphens instead of spaces, max 80 characters, no special characters except hyphens). Every group must get a different name.
+3. initial_message: A warm welcome message explaining why these users were grouped together (2-3 sentences, be specific about their shared interests)
+4. call_to_action: An engaging question or prompt to help them start the conversation (1 sentence)
+
+Return a JSON array with exactly one object per group ({len(groups)} objects), each with exactly these keys: group_number, channel_name, initial_message, call_to_action
+"""
+    
+    return prompt
@@ -18,8 +18,12 @@ from services.gemini_client import ask_gemini_structured
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 
+from database import db
 from database.repos import users, enterprises, messages, events, responses, events
 from services.event_finalizer import finalize_event
+from services.dm_broadcaster import broadcast_dm
+from services.event_scheduler import schedule_event_finalization
+from config import DB_BATCH_SIZE
 log = logging.getLogger("slack-ask-bot")
 commands_bp = Blueprint("commands_bp", __name__, url_prefix="/slack")
 
@@ -223,11 +227,12 @@ def slash():
 
         def worker():
             log.info("Generating prompt with Gemini Structured...")
+            # Each run should produce a fresh question, so skip the response cache
             answer = ask_gemini_structured(
-                prompt, prompt_schema) or "(no answer)"
+                prompt, prompt_schema, use_cache=False) or "(no answer)"
 
             answer = ask_gemini_structured(
-                prompt, prompt_schema) or "(no answer)"
+                prompt, prompt_schema, use_cache=False) or "(no answer)"
 
             # Format the response message
             if additional_description:
@@ -346,29 +351,34 @@ def slash():
                         "text": "⚠️ Invalid duration. Usage: `/start_event [duration_in_days]`\nExample: `/start_event 3` for 3 days"
                     }), 200
 
-            # create new event
-            time_start = datetime.now(tz=ZoneInfo(
-                "America/New_York")).replace(microsecond=0)
-            result = events.create_event(
-                time_start=time_start, duration_days=duration_days)
-
-            if result == "event_already_active":
-                return jsonify({"response_type": "ephemeral", "text": "⚠️ There is already an active event."}), 200
-            if result != "success":
-                return jsonify({"response_type": "ephemeral", "text": "❌ Couldn't create event."}), 200
-
-            # Fetch the event we just created
-            evt = events.get_active_event()
-
-            # Get an unused prompt (not used in any unfinalized events)
+            # Get an unused prompt (not used in any unfinalized events) before
+            # creating anything, so a missing prompt doesn't leave an empty event
             unused_msgs = messages.get_unused_private_messages()
             if not unused_msgs:
                 return jsonify({"response_type": "ephemeral", "text": "⚠️ No unused prompts found. All prompts are currently in use, or add more with `/create_message <text>`."}), 200
             # Get first unused prompt (already randomized in query)
             msg = unused_msgs[0]
 
-            # Attach prompt to event
-            events.add_message_to_event(evt.id, msg.id)
+            # Create the event and attach its prompt atomically, on one connection
+            time_start = datetime.now(tz=ZoneInfo(
+                "America/New_York")).replace(microsecond=0)
+            with db.unit_of_work():
+                result = events.create_event(
+                    time_start=time_start, duration_days=duration_days)
+
+                if result == "event_already_active":
+                    return jsonify({"response_type": "ephemeral", "text": "⚠️ There is already an active event."}), 200
+                if result != "success":
+                    return jsonify({"response_type": "ephemeral", "text": "❌ Couldn't create event."}), 200
+
+                # Fetch the event we just created (visible before commit inside the unit of work)
+                evt = events.get_active_event()
+
+                # Attach prompt to event
+                events.add_message_to_event(evt.id, msg.id)
+
+            # Finalize exactly when the event ends
+            schedule_event_finalization(evt)
 
             # Calculate end time for DM message
             end_time = time_start + timedelta(days=duration_days)
@@ -381,32 +391,33 @@ def slash():
                 f"⏰ *Time to respond:* {time_remaining}\n" \
                 f"📅 *Response deadline:* {end_time.strftime('%I:%M %p %Z, %b %d')}"
 
-            # DM all opted-in users
-            delivered = failed = 0
-            for u in users.list_users(limit=100000):
-                print()
-                print(u)
-                slack_id = getattr(u, "slack_id", None)
-                if not slack_id:
-                    continue
-                try:
-                    dm = open_im(slack_id)
-                    if isinstance(dm, dict) and "channel" in dm:
-                        dm = dm["channel"]["id"]
-                    chat_post_message(dm, dm_message)
-                    delivered += 1
-                except Exception as e:
-                    log.error(f"Failed to DM {slack_id}: {e}")
-                    failed += 1
-
             # Format duration for admin confirmation display
             duration_display = f"{duration_days} day(s)"
 
+            # DM all opted-in users in the background; a large workspace takes
+            # far longer than Slack's 3s / gunicorn's 30s request budget.
+            def worker():
+                try:
+                    result = broadcast_dm(
+                        (u.slack_id for u in users.iter_users(batch_size=DB_BATCH_SIZE)),
+                        dm_message,
+                        response_url=response_url,
+                    )
+                    post_to_response_url(
+                        response_url,
+                        f"📨 Event {evt.id} DMs finished: {result.delivered} delivered, "
+                        f"{result.failed} failed ({result.elapsed_seconds}s)",
+                        response_type="ephemeral",
+                    )
+                except Exception:
+                    log.exception("start_event DM broadcast failed")
+            threading.Thread(target=worker, daemon=True).start()
+
             return jsonify({"response_type": "ephemeral",
                             "text": f"✅ Started event {evt.id} with prompt {msg.id}\n"
                             f"⏱️ Duration: {duration_display}\n"
                             f"📅 Ends at: {end_time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n"
-                            f"📨 DMs sent: {delivered}, failed: {failed}"}), 200
+                            f"📨 Sending DMs now, delivery counts will follow here."}), 200
 
         except Exception:
             log.exception("start_event failed")
@@ -419,42 +430,33 @@ def slash():
         '''
         survey_url = request.form.get("text")
 
-        # get current event and list of responders
+        # get current event and its responders' Slack ids (one joined query)
         most_recent_event = events.get_most_recent_event()
-        print("Current event:", most_recent_event)
-        responder_user_ids = responses.get_event_user_ids(most_recent_event.id)
-        print(f"Responses for event {most_recent_event.id}:", responder_user_ids)
+        if not most_recent_event:
+            return jsonify({"text": "No events found."}), 200
+        responder_slack_ids = responses.get_event_responder_slack_ids(most_recent_event.id)
 
-        if not responder_user_ids:
+        if not responder_slack_ids:
             return jsonify({"text": f"No one responded."}), 200
 
         msg = f"Thanks for responding to our last question! Please fill out this quick survey so we can hear your thoughts: {survey_url}"
 
-        success, failed = [], []
-
-        for r in responder_user_ids:
+        # Send concurrently in the background and report through response_url,
+        # so large surveys never run into the request timeout
+        def worker():
             try:
-                # get Slack ID for the user
-                user = users.get_user_by_id(r)
-                slack_id = user.slack_id if hasattr(user, "slack_id") else user
-                print("slack id:", slack_id)
-
-                print(f"Opening DM with user {slack_id}")
-                dm_channel = open_im(slack_id)
-                print(f"DM channel opened: {dm_channel}")
-
-                print(f"Sending message to channel {dm_channel}: '{msg}'")
-                chat_post_message(dm_channel, msg)
-                print(f"Message sent successfully to <@{slack_id}>")
-
-                success.append(slack_id)
-
-            except Exception as e:
-                log.error(f"Error sending DM to {slack_id}: {e}")
-                failed.append(slack_id)
+                result = broadcast_dm(responder_slack_ids, msg, response_url=response_url)
+                post_to_response_url(
+                    response_url,
+                    f"Sent survey to {result.delivered} users, failed for {result.failed} ({result.elapsed_seconds}s)",
+                    response_type="ephemeral",
+                )
+            except Exception:
+                log.exception("send_survey DM broadcast failed")
+        threading.Thread(target=worker, daemon=True).start()
 
-        print(f"DMs sent to {len(success)} users, failed for {len(failed)}")
-        return jsonify({"text": f"Sent survey to {len(success)} users, failed for {len(failed)}"}), 200
+        return jsonify({"response_type": "ephemeral",
+                        "text": f"📨 Sending survey to {len(responder_slack_ids)} responders of event {most_recent_event.id}, results will follow here."}), 200
 
    # ---------- /finalize_event ----------
     if command == "/finalize_event":
@@ -504,8 +506,8 @@ def slash():
 
                     if result['channels_created']:
                         message += f"\n📢 *Channels:*\n"
-                        for channel_id in result['channels_created']:
-                            message += f"• <#{channel_id}>\n"
+                        for channel in result['channels_created']:
+                            message += f"• <#{channel['id']}>\n"
 
                     if result['errors']:
                         message += f"\n⚠️ *Warnings ({len(result['errors'])}):*\n"
@@ -1,9 +1,11 @@
 import logging
 from flask import Blueprint, request, jsonify
 from utils.verify import verify_slack
+from config import EVENT_QUEUE_WORKERS, EVENT_QUEUE_MAX_BACKLOG
+from services.event_queue import EventQueue
+from services import event_dedup, response_embedder
 from services.thread_monitor import process_message_event, process_reaction_event
 from database.repos import users, responses
-from database.repos.events import get_active_event
 
 from database.repos.responses import add_response
 
@@ -21,35 +23,68 @@ def process_dm_message(event):
         channel = event.get("channel")
         if not user_id or not text:
             return
-             # Get or create user
-        user = users.get_user_by_slack_id(user_id)
-        if not user:
-            print(f"user not present, creating...")
-            user = users.create_user(user_id)
 
-
-        # Check if there's an active event
-        active_event = get_active_event()
-        if not active_event:
+        # Resolve the active event and the user (creating it if needed) and
+        # save the response, all in one round trip
+        print("adding response...")
+        result, event_id = add_response(user_slack_id=user_id, response=text)
+        if result == "no_active_event":
             log.info(f"No active event, ignoring DM from {user_id}")
             return
-
-        # Save the response to the database
-        print("adding response...")
-        result = add_response(user_slack_id=user_id, response=text)
+        if result != "success":
+            log.warning(f"Could not save DM response from {user_id}: {result}")
+            return
+        # Vectorize off the hot path so finalization only has to cluster
+        response_embedder.submit(user_id, event_id, text)
        
         log.info(
-            f"Saved DM response from {user_id} for event {active_event.id}: {text[:50]}...")
+            f"Saved DM response from {user_id} for event {event_id}: {text[:50]}...")
 
     except Exception as e:
         log.error(f"Error processing DM message: {e}")
         ##TODO: System notification to let user know their response is recorded
-    return jsonify({"text": f"🎉 Message recorded"})
+
+
+def handle_event(payload):
+    """Route one Events API payload to its handler. Runs on an event queue worker."""
+    # Another worker (or an earlier delivery) may already have handled this event
+    if not event_dedup.claim(payload.get("event_id")):
+        log.info(f"Dropping duplicate event {payload.get('event_id')}")
+        return
+
+    event = payload.get("event", {})
+    event_type = event.get("type")
+
+    # Handle different event types
+    if event_type == "message":
+        channel = event.get("channel", "")
+        channel_type = event.get("channel_type")
+        
+        # DMs have channel_type="im" OR channel starting with "D"
+        is_dm = channel_type == "im" or (channel and channel.startswith("D"))
+        
+        print(f"Message event - channel: {channel}, channel_type: {channel_type}, is_dm: {is_dm}")
+        
+        if is_dm:
+            print("Processing as DM")
+            process_dm_message(event)
+        # Check if it's in a thread
+        elif event.get("thread_ts"):
+            print("Processing as thread message")
+            process_message_event(event)
+
+    elif event_type == "reaction_added":
+        # Track reactions as engagement signals
+        if event.get("item", {}).get("type") == "message":
+            process_reaction_event(event)
+
+
+event_queue = EventQueue(handle_event, workers=EVENT_QUEUE_WORKERS, max_backlog=EVENT_QUEUE_MAX_BACKLOG)
 
 
 @events_bp.post("/events")
 def slack_events():
-    """Handle Slack Events API webhooks"""
+    """Handle Slack Events API webhooks: verify, enqueue, and ack immediately"""
 
     print("Received Slack event")
 
@@ -76,35 +111,24 @@ def slack_events():
         print("Ignoring bot message")
         return "", 200
 
-    # Handle different event types
-    if event_type == "message":
-        # Ignore message_changed, message_deleted, etc.
-        if event.get("subtype"):
-            print(f"Ignoring message subtype: {event.get('subtype')}")
-            return "", 200
-            
-        channel = event.get("channel", "")
-        channel_type = event.get("channel_type")
-        
-        # DMs have channel_type="im" OR channel starting with "D"
-        is_dm = channel_type == "im" or (channel and channel.startswith("D"))
-        
-        print(f"Message event - channel: {channel}, channel_type: {channel_type}, is_dm: {is_dm}")
-        
-        if is_dm:
-            print("Processing as DM")
-            process_dm_message(event)
-        # Check if it's in a thread
-        elif event.get("thread_ts"):
-            print("Processing as thread message")
-            process_message_event(event)
+    # Ignore message_changed, message_deleted, etc.
+    if event_type == "message" and event.get("subtype"):
+        print(f"Ignoring message subtype: {event.get('subtype')}")
+        return "", 200
 
-    elif event_type == "reaction_added":
-        # Track reactions as engagement signals
-        if event.get("item", {}).get("type") == "message":
-            process_reaction_event(event)
+    if event_type not in ("message", "reaction_added"):
+        return "", 200
 
-    # Acknowledge receipt immediately
-    return "", 200
+    # Slack retries deliveries it thinks timed out; drop ones this worker already accepted
+    event_id = payload.get("event_id")
+    if event_dedup.seen_recently(event_id, request.headers.get("X-Slack-Retry-Num")):
+        print(f"Ignoring duplicate event {event_id}")
+        return "", 200
 
+    # Slack retries non-2xx responses, so a full or draining queue just pushes the event back to Slack
+    if not event_queue.submit(payload):
+        event_dedup.forget(event_id)
+        return "event backlog full", 503
 
+    # Acknowledge receipt immediately
+    return "", 200
@@ -12,6 +12,15 @@ CLASSIFICATION_SCHEMA = {
     "description": "Array of user groups, each group is an array of user slack_ids"
 }
 
+CLUSTER_MERGE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "array",
+        "items": {"type": "string"}
+    },
+    "description": "Array of merged clusters, each is an array of cluster ids that share a theme"
+}
+
 CHANNEL_METADATA_SCHEMA = {
     "type": "object",
     "properties": {
@@ -30,3 +39,19 @@ CHANNEL_METADATA_SCHEMA = {
     },
     "required": ["channel_name", "initial_message", "call_to_action"]
 }
+
+CHANNEL_METADATA_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "group_number": {
+                "type": "integer",
+                "description": "Number of the group this metadata is for, as numbered in the prompt"
+            },
+            **CHANNEL_METADATA_SCHEMA["properties"]
+        },
+        "required": ["group_number", "channel_name", "initial_message", "call_to_action"]
+    },
+    "description": "One channel metadata object per group"
+}
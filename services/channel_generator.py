@@ -4,13 +4,45 @@
 # --------------------------------------------------
 
 import logging
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Optional
 from services.gemini_client import ask_gemini_structured
-from prompts.event_prompts import get_channel_metadata_prompt
-from schemas.gemini_schemas import CHANNEL_METADATA_SCHEMA
+from prompts.event_prompts import get_channel_metadata_prompt, get_batch_channel_metadata_prompt
+from schemas.gemini_schemas import CHANNEL_METADATA_SCHEMA, CHANNEL_METADATA_BATCH_SCHEMA
 
 log = logging.getLogger("channel-generator")
 
+METADATA_FIELDS = ("channel_name", "initial_message", "call_to_action")
+
+
+def _sanitize_metadata(metadata: object) -> Optional[Dict[str, str]]:
+    """
+    Check a metadata object has every field and make its channel name Slack-safe.
+    
+    Returns:
+        The cleaned metadata dict, or None if it's unusable
+    """
+    if not isinstance(metadata, dict):
+        return None
+    if not all(isinstance(metadata.get(key), str) and metadata.get(key).strip() for key in METADATA_FIELDS):
+        return None
+
+    # Validate and sanitize channel name
+    channel_name = metadata.get("channel_name", "").lower()
+    # Replace any non-alphanumeric (except hyphen) with hyphen
+    channel_name = "".join(c if c.isalnum() or c == '-' else '-' for c in channel_name)
+    # Remove consecutive hyphens
+    while '--' in channel_name:
+        channel_name = channel_name.replace('--', '-')
+    # Trim and limit to 80 chars
+    channel_name = channel_name.strip('-')[:80]
+    
+    if not channel_name:
+        log.warning("Generated channel name is empty after sanitization")
+        return None
+    
+    return {key: metadata[key] for key in METADATA_FIELDS} | {"channel_name": channel_name}
+
 
 def generate_channel_metadata(user_responses: List[Tuple[str, str]]) -> Optional[Dict[str, str]]:
     """
@@ -44,25 +76,100 @@ def generate_channel_metadata(user_responses: List[Tuple[str, str]]) -> Optional
             log.warning("Gemini returned empty metadata")
             return None
         
-        # Validate and sanitize channel name
-        channel_name = metadata.get("channel_name", "").lower()
-        # Replace any non-alphanumeric (except hyphen) with hyphen
-        channel_name = "".join(c if c.isalnum() or c == '-' else '-' for c in channel_name)
-        # Remove consecutive hyphens
-        while '--' in channel_name:
-            channel_name = channel_name.replace('--', '-')
-        # Trim and limit to 80 chars
-        channel_name = channel_name.strip('-')[:80]
-        
-        if not channel_name:
-            log.warning("Generated channel name is empty after sanitization")
+        metadata = _sanitize_metadata(metadata)
+        if not metadata:
+            log.warning("Gemini returned incomplete metadata")
             return None
         
-        metadata["channel_name"] = channel_name
-        
-        log.info(f"Generated metadata for channel: {channel_name}")
+        log.info(f"Generated metadata for channel: {metadata['channel_name']}")
         return metadata
     
     except Exception as e:
         log.error(f"Failed to generate channel metadata: {e}")
         return None
+
+
+def _generate_batch(groups: List[List[Tuple[str, str]]]) -> List[Optional[Dict[str, str]]]:
+    """One structured call for several groups. Entries that fail validation come back as None."""
+    results: List[Optional[Dict[str, str]]] = [None] * len(groups)
+    try:
+        batch = ask_gemini_structured(
+            get_batch_channel_metadata_prompt(groups),
+            schema=CHANNEL_METADATA_BATCH_SCHEMA,
+            mime_type="application/json"
+        )
+    except Exception as e:
+        log.error(f"Batched channel metadata call failed: {e}")
+        return results
+
+    if not isinstance(batch, list):
+        log.warning("Batched channel metadata was not a JSON array")
+        return results
+
+    for item in batch:
+        if not isinstance(item, dict):
+            continue
+        number = item.get("group_number")
+        if not isinstance(number, int) or not 1 <= number <= len(groups) or results[number - 1]:
+            continue
+        results[number - 1] = _sanitize_metadata(item)
+    return results
+
+
+def _unique_name(name: str, used_names: set) -> str:
+    """Return name, or name-2, name-3, ... (within Slack's 80 chars) if it's taken, and mark it used."""
+    candidate, n = name, 1
+    while candidate in used_names:
+        n += 1
+        suffix = f"-{n}"
+        candidate = name[:80 - len(suffix)].rstrip('-') + suffix
+    used_names.add(candidate)
+    return candidate
+
+
+def generate_channel_metadata_batch(
+    groups: List[List[Tuple[str, str]]],
+    batch_size: int = 20,
+    max_workers: int = 4,
+    reserved_names: Iterable[str] = (),
+) -> List[Optional[Dict[str, str]]]:
+    """
+    Generate channel metadata for many groups with as few Gemini calls as possible.
+    
+    Groups are sent batch_size at a time in a single structured call per batch.
+    Any group whose batched output is missing or fails validation falls back to
+    its own generate_channel_metadata call. Channel names are then made
+    unique across all groups (and reserved_names) with a -2, -3, ... suffix.
+    
+    Args:
+        groups: One list of (slack_id, response_text) tuples per group
+        batch_size: Max groups per batched call
+        max_workers: Concurrent Gemini calls
+        reserved_names: Channel names already used by the event's other groups
+        
+    Returns:
+        List aligned with groups; each entry is a metadata dict or None if generation failed
+    """
+    if not groups:
+        return []
+
+    chunks = [groups[i:i + batch_size] for i in range(0, len(groups), batch_size)]
+    log.info(f"Generating channel metadata for {len(groups)} groups in {len(chunks)} batched call(s)")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata-batch") as pool:
+        results = [metadata for chunk_results in pool.map(_generate_batch, chunks)
+                   for metadata in chunk_results]
+
+        missing = [i for i, metadata in enumerate(results) if metadata is None]
+        if missing:
+            log.info(f"Falling back to per-group metadata for {len(missing)} group(s)")
+            for i, metadata in zip(missing, pool.map(lambda i: generate_channel_metadata(groups[i]), missing)):
+                results[i] = metadata
+
+    # Two groups with the same name would end up sharing one Slack channel
+    used_names = set(reserved_names)
+    for metadata in results:
+        if metadata:
+            metadata["channel_name"] = _unique_name(metadata["channel_name"], used_names)
+
+    return results
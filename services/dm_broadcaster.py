@@ -0,0 +1,105 @@
+# --------------------------------------------------
+# File: services/dm_broadcaster.py
+# Description: Send the same DM to many users with bounded concurrency,
+# reporting progress back through a slash command's response_url. Slack
+# rate limits are enforced by utils.slack_api.
+# --------------------------------------------------
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+from config import DM_BROADCAST_WORKERS, DM_BROADCAST_PROGRESS_EVERY
+from utils.slack_api import open_im, chat_post_message, post_to_response_url
+
+log = logging.getLogger("dm-broadcaster")
+
+# Slack only accepts 5 posts to a response_url within 30 minutes; keep one for the final summary
+MAX_PROGRESS_POSTS = 3
+
+
+@dataclass
+class BroadcastResult:
+    delivered: int = 0
+    failed: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+
+def send_dm(slack_id: str, text: str) -> None:
+    """Open (or reuse) the DM channel with a user and post text to it."""
+    chat_post_message(open_im(slack_id), text)
+
+
+def broadcast_dm(
+    slack_ids: Iterable[str],
+    text: str,
+    response_url: Optional[str] = None,
+    max_workers: int = DM_BROADCAST_WORKERS,
+    progress_every: int = DM_BROADCAST_PROGRESS_EVERY,
+) -> BroadcastResult:
+    """
+    DM every user in slack_ids, running up to max_workers sends at a time.
+
+    slack_ids is consumed lazily, so callers can pass a generator and the first
+    DMs go out before the whole recipient list has been read. Blocks until every
+    send has finished; run it from a background thread, not a request handler.
+
+    Args:
+        slack_ids: Slack user ids to message (falsy ids are skipped)
+        text: Message body
+        response_url: If given, progress updates are posted here as ephemeral messages
+        max_workers: Number of concurrent sends
+        progress_every: Post a progress update after this many completed sends
+
+    Returns:
+        BroadcastResult with delivered/failed counts
+    """
+    result = BroadcastResult()
+    started = time.monotonic()
+    progress_posts = 0
+
+    def collect(future, slack_id):
+        nonlocal progress_posts
+        try:
+            future.result()
+            result.delivered += 1
+        except Exception as e:
+            log.error(f"Failed to DM {slack_id}: {e}")
+            result.failed += 1
+            result.failed_ids.append(slack_id)
+
+        done = result.delivered + result.failed
+        if response_url and progress_every and done % progress_every == 0 \
+                and progress_posts < MAX_PROGRESS_POSTS:
+            progress_posts += 1
+            try:
+                post_to_response_url(
+                    response_url,
+                    f"📨 Sending DMs… {result.delivered} delivered, {result.failed} failed so far",
+                    response_type="ephemeral",
+                )
+            except Exception:
+                log.exception("Failed to post broadcast progress")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dm-broadcast") as pool:
+        in_flight = {}
+        for slack_id in slack_ids:
+            if not slack_id:
+                continue
+            # Keep a bounded window of pending sends so a huge recipient list
+            # doesn't turn into a huge queue of futures.
+            while len(in_flight) >= max_workers * 2:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future, in_flight.pop(future))
+            in_flight[pool.submit(send_dm, slack_id, text)] = slack_id
+
+        for future in wait(in_flight).done:
+            collect(future, in_flight[future])
+
+    result.elapsed_seconds = round(time.monotonic() - started, 2)
+    log.info(f"Broadcast finished: {result.delivered} delivered, {result.failed} failed "
+             f"in {result.elapsed_seconds}s")
+    return result
@@ -0,0 +1,194 @@
+# --------------------------------------------------
+# File: services/engagement_tracker.py
+# Description: In-process engagement state for monitored threads, keyed by
+# thread_ts. Keeps participant scores and the current intervention level in
+# memory, writes every change through to Postgres, and is rebuilt from the
+# DB at startup.
+#
+# Each gunicorn worker has its own tracker. Every write-through returns the
+# touched participant's committed totals and the thread's activity version;
+# if the version jumped by more than one, the other worker wrote to the
+# thread in between and it is reloaded from the DB.
+# --------------------------------------------------
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from config import ENGAGEMENT_TRACKER_MAX_THREADS, ENGAGEMENT_TRACKER_REBUILD_DAYS
+from database.models import ThreadEngagement
+from database.repos.threads import (
+    record_thread_activity, load_thread_engagement, claim_thread_intervention, release_thread_intervention,
+)
+
+log = logging.getLogger("engagement-tracker")
+
+# Intervention levels in escalation order
+INTERVENTION_LEVELS = [None, "dm_pair", "ephemeral", "create_channel"]
+
+
+class _ThreadState:
+    __slots__ = ("bot_intervened", "intervention_type", "participants", "version")
+
+    def __init__(self, bot_intervened: bool, intervention_type: Optional[str]):
+        self.bot_intervened = bot_intervened
+        self.intervention_type = intervention_type
+        self.participants: Dict[int, Tuple[str, int]] = {}  # user_id -> (slack_id, engagement_score)
+        self.version = 0  # activity_version the participants reflect
+
+
+_threads: "OrderedDict[str, _ThreadState]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "loads": 0, "reloads": 0, "evictions": 0}
+
+
+def _level(intervention_type: Optional[str]) -> int:
+    return INTERVENTION_LEVELS.index(intervention_type) if intervention_type in INTERVENTION_LEVELS else 0
+
+
+def _store(engagement: ThreadEngagement) -> _ThreadState:
+    """Insert a thread loaded from the DB. Caller holds _lock."""
+    state = _ThreadState(engagement.bot_intervened, engagement.intervention_type)
+    _refresh(state, engagement)
+    _threads[engagement.thread_ts] = state
+    _threads.move_to_end(engagement.thread_ts)
+    while len(_threads) > ENGAGEMENT_TRACKER_MAX_THREADS:
+        _threads.popitem(last=False)
+        _stats["evictions"] += 1
+    return state
+
+
+def _refresh(state: _ThreadState, engagement: ThreadEngagement) -> None:
+    """Replace a thread's participants with a newer DB load. Caller holds _lock."""
+    state.participants = {user_id: (slack_id, score) for user_id, slack_id, score in engagement.participants}
+    state.version = engagement.version
+    # Never step back below a level this worker has already claimed
+    if _level(engagement.intervention_type) > _level(state.intervention_type):
+        state.intervention_type = engagement.intervention_type
+    state.bot_intervened = state.bot_intervened or engagement.bot_intervened
+
+
+def _snapshot(thread_ts: str, state: _ThreadState, min_score: int) -> ThreadEngagement:
+    engaged = sorted(
+        ((user_id, slack_id, score) for user_id, (slack_id, score) in state.participants.items()
+         if score >= min_score),
+        key=lambda p: p[2],
+        reverse=True,
+    )
+    return ThreadEngagement(
+        thread_ts=thread_ts,
+        bot_intervened=state.bot_intervened,
+        intervention_type=state.intervention_type,
+        participants=engaged,
+    )
+
+
+def record_activity(
+    thread_ts: str,
+    channel_id: str,
+    slack_id: str,
+    original_message: Optional[str] = None,
+    messages: int = 0,
+    reactions: int = 0,
+    score: int = 0,
+    min_score: int = 10,
+) -> ThreadEngagement:
+    """
+    Write a message/reaction through to Postgres and return the thread's engagement from memory.
+
+    Costs one round trip when the thread is already tracked and this worker
+    saw its previous write; a thread this worker hasn't seen yet, or one the
+    other worker has written to since, is (re)loaded from the DB.
+
+    Returns:
+        ThreadEngagement with participants scoring >= min_score, most engaged first
+    """
+    bot_intervened, intervention_type, version, (user_id, user_slack_id, total) = record_thread_activity(
+        thread_ts, channel_id, slack_id,
+        original_message=original_message,
+        messages=messages,
+        reactions=reactions,
+        score=score,
+    )
+
+    with _lock:
+        state = _threads.get(thread_ts)
+        # Versions between ours and the last one seen here were written elsewhere
+        behind = state is not None and version > state.version + 1
+        if state is not None:
+            _threads.move_to_end(thread_ts)
+            _stats["reloads" if behind else "hits"] += 1
+
+    if state is None or behind:
+        loaded = load_thread_engagement(thread_ts=thread_ts)
+        with _lock:
+            if state is None:
+                _stats["loads"] += 1
+            engagement = loaded[0] if loaded else ThreadEngagement(
+                thread_ts, bot_intervened, intervention_type, [(user_id, user_slack_id, total)], version)
+            state = _threads.get(thread_ts)
+            if state is None:
+                state = _store(engagement)
+            elif engagement.version > state.version:
+                _refresh(state, engagement)
+
+    with _lock:
+        # A write already covered by a newer version (or load) mustn't overwrite it
+        if version > state.version:
+            state.participants[user_id] = (user_slack_id, total)
+            state.version = version
+        # Never step back below a level this worker has already claimed
+        if _level(intervention_type) > _level(state.intervention_type):
+            state.intervention_type = intervention_type
+        state.bot_intervened = state.bot_intervened or bot_intervened
+        return _snapshot(thread_ts, state, min_score)
+
+
+def claim_intervention(thread_ts: str, intervention_type: str) -> bool:
+    """
+    Raise a thread to intervention_type, returning True if the caller should intervene.
+
+    The claim is a conditional write in Postgres, so only one event across
+    all workers wins it; the in-memory level is just a fast reject for
+    threads this worker already knows are at that level or beyond.
+    """
+    with _lock:
+        state = _threads.get(thread_ts)
+        if state is not None and _level(state.intervention_type) >= _level(intervention_type):
+            return False
+
+    claimed = claim_thread_intervention(thread_ts, intervention_type, INTERVENTION_LEVELS[1:])
+
+    with _lock:
+        state = _threads.get(thread_ts)
+        # Won or lost, the thread is now at least at this level in the DB
+        if state is not None and _level(intervention_type) > _level(state.intervention_type):
+            state.intervention_type = intervention_type
+            state.bot_intervened = True
+    return claimed
+
+
+def release_intervention(thread_ts: str, intervention_type: str) -> None:
+    """Undo a claim whose Slack action failed, so the next event can try again."""
+    current = release_thread_intervention(thread_ts, intervention_type, INTERVENTION_LEVELS[1:])
+    with _lock:
+        state = _threads.get(thread_ts)
+        if state is not None and state.intervention_type == intervention_type:
+            state.intervention_type = current
+            state.bot_intervened = current is not None
+
+
+def rebuild(active_within_days: int = ENGAGEMENT_TRACKER_REBUILD_DAYS) -> int:
+    """Reload tracked threads from Postgres. Returns the number of threads loaded."""
+    threads = load_thread_engagement(active_within_days=active_within_days)
+    with _lock:
+        _threads.clear()
+        for engagement in threads[-ENGAGEMENT_TRACKER_MAX_THREADS:]:
+            _store(engagement)
+    log.info(f"Engagement tracker rebuilt with {len(threads)} threads")
+    return len(threads)
+
+
+def get_tracker_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "threads": len(_threads)}
@@ -0,0 +1,104 @@
+# --------------------------------------------------
+# File: services/event_dedup.py
+# Description: Drop duplicate Slack Events API deliveries (Slack retries)
+# before they reach any DB writes. A TTL'd in-memory set catches retries
+# landing on the same worker; the processed_events table catches the rest.
+# --------------------------------------------------
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from config import EVENT_DEDUP_TTL_SECONDS, EVENT_DEDUP_RETENTION_HOURS
+from database.repos.processed_events import claim_event, purge_processed_events
+
+log = logging.getLogger("event-dedup")
+
+# How often the processed_events table is purged (seconds)
+PURGE_INTERVAL = 3600
+
+_seen: Dict[str, float] = {}  # event_id -> expiry (monotonic)
+_lock = threading.Lock()
+_next_sweep = 0.0
+_next_purge = 0.0
+_stats = {"checked": 0, "memory_hits": 0, "db_hits": 0, "retries_received": 0, "db_errors": 0}
+
+
+def _sweep(now: float) -> None:
+    """Forget expired ids. Caller holds _lock."""
+    global _next_sweep
+    if now < _next_sweep:
+        return
+    for event_id in [k for k, expiry in _seen.items() if expiry <= now]:
+        del _seen[event_id]
+    _next_sweep = now + 60
+
+
+def seen_recently(event_id: Optional[str], retry_num: Optional[str] = None) -> bool:
+    """
+    Check-and-mark an event_id in memory. Cheap enough for the ack path.
+
+    Returns True if this worker has already accepted the event within the TTL.
+    """
+    with _lock:
+        _stats["checked"] += 1
+        if retry_num:
+            _stats["retries_received"] += 1
+        if not event_id:
+            return False
+        now = time.monotonic()
+        _sweep(now)
+        if _seen.get(event_id, 0) > now:
+            _stats["memory_hits"] += 1
+            return True
+        _seen[event_id] = now + EVENT_DEDUP_TTL_SECONDS
+        return False
+
+
+def forget(event_id: Optional[str]) -> None:
+    """Unmark an event we accepted but couldn't queue, so Slack's retry is processed."""
+    if event_id:
+        with _lock:
+            _seen.pop(event_id, None)
+
+
+def claim(event_id: Optional[str]) -> bool:
+    """
+    Claim an event_id in Postgres. Returns False if another delivery already claimed it.
+
+    Fails open: if the DB is unavailable the event is processed.
+    """
+    global _next_purge
+    if not event_id:
+        return True
+    try:
+        claimed = claim_event(event_id)
+    except Exception as e:
+        log.warning(f"Event dedup claim failed for {event_id}: {e}")
+        with _lock:
+            _stats["db_errors"] += 1
+        return True
+
+    with _lock:
+        if not claimed:
+            _stats["db_hits"] += 1
+        now = time.monotonic()
+        purge_due = now >= _next_purge
+        if purge_due:
+            _next_purge = now + PURGE_INTERVAL
+    if purge_due:
+        try:
+            deleted = purge_processed_events(EVENT_DEDUP_RETENTION_HOURS)
+            log.info(f"Purged {deleted} processed event ids")
+        except Exception as e:
+            log.warning(f"Failed to purge processed events: {e}")
+    return claimed
+
+
+def get_dedup_stats() -> Dict[str, float]:
+    with _lock:
+        stats = {**_stats, "tracked_in_memory": len(_seen)}
+    duplicates = stats["memory_hits"] + stats["db_hits"]
+    stats["duplicates_dropped"] = duplicates
+    stats["hit_rate"] = round(duplicates / stats["checked"], 4) if stats["checked"] else 0.0
+    return stats
@@ -4,145 +4,333 @@
 # --------------------------------------------------
 
 import logging
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (FINALIZE_METADATA_WORKERS, FINALIZE_METADATA_BATCH_SIZE, FINALIZE_SLACK_WORKERS,
+                    FINALIZE_MAX_STEP_ATTEMPTS)
+from database import db
+from database.models import FinalizationStep
+from database.repos import finalization
+from database.repos.finalization import GROUP_STEPS, ANNOUNCE_STEP, EVENT_LEVEL
 from database.repos.responses import get_responses_with_users
 from services.response_classifier import classify_user_responses
-from services.channel_generator import generate_channel_metadata
-from utils.slack_api import create_channel, invite_users_to_channel, chat_post_message
+from services.channel_generator import generate_channel_metadata_batch
+from utils.slack_api import create_channel, find_channel_by_name, invite_users_to_channel, chat_post_message
 
 log = logging.getLogger("event-finalizer")
 
+# Advisory lock namespace for per-event finalization (second key is the event id)
+FINALIZE_LOCK_NAMESPACE = 5981
+
+Steps = Dict[Tuple[int, str], FinalizationStep]
+
+
+def _settled(state: Optional[FinalizationStep]) -> bool:
+    """True if a step needs no more work: done, skipped, or out of retries."""
+    if state is None:
+        return False
+    if state.status in ("done", "skipped"):
+        return True
+    return state.attempts >= FINALIZE_MAX_STEP_ATTEMPTS
+
+
+def _group_settled(steps: Steps, group_index: int) -> bool:
+    """True once a group's steps are all done, or the first unfinished one can't be retried."""
+    for step in GROUP_STEPS:
+        state = steps.get((group_index, step))
+        if state is None or state.status != "done":
+            return _settled(state)
+    return True
+
+
+def _run_step(event_id: int, group_index: int, step: str, steps: Steps,
+              action: Callable[[], Optional[dict]]) -> FinalizationStep:
+    """
+    Run a step unless it is already settled, checkpointing the outcome (and action's payload).
+
+    Only errors raised by action count as failed attempts; an error writing
+    the checkpoint propagates so the run ends incomplete and is resumed.
+    """
+    state = steps.get((group_index, step))
+    if _settled(state):
+        return state
+    try:
+        payload = action()
+    except Exception as e:
+        log.error(f"Event {event_id} group {group_index + 1}: {step} failed - {e}")
+        state = finalization.record_step(event_id, group_index, step, "failed", error=str(e))
+    else:
+        # A failed checkpoint write propagates instead of being counted as a
+        # failed attempt; the next run redoes the (idempotent) step
+        state = finalization.record_step(event_id, group_index, step, "done", payload=payload)
+    steps[(group_index, step)] = state
+    return state
+
 
 def finalize_event(event_id: int) -> Dict:
     """
     Complete an event by grouping users, creating channels, and inviting participants.
 
+    Runs as a persisted job (see database/repos/finalization.py): the groups
+    from classification and every per-group step (metadata, create, invite,
+    welcome) plus the announcement are checkpointed, so calling this again
+    after a crash or partial failure only redoes unfinished steps. Failed
+    steps are retried on later calls up to FINALIZE_MAX_STEP_ATTEMPTS times.
+
+    Within a run: channel metadata for all pending groups comes from batched
+    Gemini calls, then groups' Slack setup runs concurrently (Slack rate
+    limits are enforced in utils.slack_api), then the public announcement once
+    every group is settled.
+
     Args:
         event_id: The event to finalize
 
     Returns:
         Dict with summary: {
             "success": bool,
+            "complete": bool,  # nothing left to retry; safe to mark the event finalized
             "groups_created": int,
-            "channels_created": List[str],
-            "errors": List[str]
+            "channels_created": List[Dict],
+            "errors": List[str],
+            "timings": Dict[str, float]  # seconds per stage
         }
     """
     summary = {
         "success": False,
+        "complete": False,
         "groups_created": 0,
         "channels_created": [],
-        "errors": []
+        "errors": [],
+        "timings": {}
     }
+    started = time.monotonic()
 
     try:
-        log.info(f"Starting finalization for event {event_id}")
+        # Only one run per event at a time, across workers (scheduler and /finalize_event)
+        with db.advisory_lock(FINALIZE_LOCK_NAMESPACE, event_id) as acquired:
+            if not acquired:
+                summary["errors"].append(f"Event {event_id} is already being finalized")
+                log.info(f"Event {event_id} is already being finalized elsewhere; skipping")
+                return summary
+            return _run_finalization(event_id, summary, started)
+    except Exception as e:
+        error_msg = f"Critical error finalizing event {event_id}: {str(e)}"
+        summary["errors"].append(error_msg)
+        summary["timings"]["total"] = round(time.monotonic() - started, 3)
+        log.error(error_msg)
+        return summary
+
 
-        # Step 1: Classify users into groups
-        groups = classify_user_responses(event_id)
+def _run_finalization(event_id: int, summary: Dict, started: float) -> Dict:
+    """Body of finalize_event; the caller holds the event's advisory lock."""
+    try:
+        log.info(f"Starting finalization for event {event_id}")
 
-        if not groups:
-            summary["errors"].append(
-                "No valid groups found from classification")
-            log.warning(f"Event {event_id}: No valid groups to process")
-            return summary
+        # Step 1: Classify users into groups (once; reruns reuse the stored groups)
+        stage_start = time.monotonic()
+        groups = finalization.get_job_groups(event_id)
+        if groups is None:
+            groups = classify_user_responses(event_id)
+            if groups is None:
+                # A DB or grouping error, not "no groups": leave the event for the next check
+                attempts = finalization.record_classify_failure(event_id, "Classification failed")
+                summary["errors"].append(
+                    f"Classification failed (attempt {attempts} of {FINALIZE_MAX_STEP_ATTEMPTS})")
+                log.warning(f"Event {event_id}: Classification failed on attempt {attempts}")
+                summary["complete"] = attempts >= FINALIZE_MAX_STEP_ATTEMPTS
+                if summary["complete"]:
+                    finalization.set_job_status(event_id, "done")
+                summary["timings"]["classify"] = round(time.monotonic() - stage_start, 3)
+                return summary
+            if not groups:
+                summary["errors"].append(
+                    "No valid groups found from classification")
+                log.warning(f"Event {event_id}: No valid groups to process")
+                # Nothing to resume later
+                summary["complete"] = True
+                return summary
+            groups = finalization.create_job(event_id, groups)
+        else:
+            log.info(f"Event {event_id}: Resuming finalization job")
+        summary["timings"]["classify"] = round(time.monotonic() - stage_start, 3)
 
         summary["groups_created"] = len(groups)
         log.info(f"Event {event_id}: Processing {len(groups)} groups")
-
-        # Get all responses for this event
-        all_responses = get_responses_with_users(event_id)
-        responses_dict = {slack_id: entry for slack_id, entry in all_responses}
-
-        # Step 2 & 3: For each group, generate metadata and create channel
-        for i, group_slack_ids in enumerate(groups, 1):
-            try:
-                log.info(
-                    f"Processing group {i}/{len(groups)} with {len(group_slack_ids)} users")
-
+        steps = finalization.get_steps(event_id)
+
+        # Step 2: Generate channel metadata for groups that still need it (batched Gemini calls)
+        stage_start = time.monotonic()
+        need_metadata = [i for i in range(len(groups)) if not _settled(steps.get((i, "metadata")))]
+        if need_metadata:
+            # Get all responses for this event
+            all_responses = get_responses_with_users(event_id)
+            responses_dict = {slack_id: entry for slack_id, entry in all_responses}
+
+            pending = []  # (group index, user_responses)
+            for i in need_metadata:
                 # Get responses for this specific group
                 user_responses = [
-                    (slack_id, responses_dict.get(slack_id, ""))
-                    for slack_id in group_slack_ids
+                    (slack_id, responses_dict[slack_id])
+                    for slack_id in groups[i]
                     if slack_id in responses_dict
                 ]
-
                 if not user_responses:
-                    summary["errors"].append(
-                        f"Group {i}: No responses found for users")
+                    steps[(i, "metadata")] = finalization.record_step(
+                        event_id, i, "metadata", "skipped", error="No responses found for users")
                     continue
-
-                # Generate channel metadata
-                metadata = generate_channel_metadata(user_responses)
-                if not metadata:
-                    summary["errors"].append(
-                        f"Group {i}: Failed to generate metadata")
-                    continue
-
-                # Create unique channel name with event ID
-                channel_name = f"{metadata['channel_name']}-event{event_id}"
-
-                # Create Slack channel
-                try:
-                    channel_info = create_channel(
-                        channel_name, is_private=False)
-                    channel_id = channel_info["id"]
-                    log.info(f"Created channel {channel_id} ({channel_name})")
-
-                    # Invite users to channel
-                    invite_users_to_channel(channel_id, group_slack_ids)
-                    log.info(
-                        f"Invited {len(group_slack_ids)} users to {channel_id}")
-
-                    # Post welcome message
-                    mentions = " ".join(
-                        [f"<@{sid}>" for sid in group_slack_ids])
-                    full_message = (
-                        f"👋 {mentions}\n\n"
-                        f"{metadata['initial_message']}\n\n"
-                        f"💬 {metadata['call_to_action']}"
-                    )
-                    chat_post_message(channel_id, full_message)
-                    log.info(f"Posted welcome message to {channel_id}")
-
-                    summary["channels_created"].append({
-                        "id": channel_id,
-                        "summary": metadata.get("initial_message", "")
-                    })
-
-                except Exception as e:
-                    error_msg = f"Group {i}: Failed to create/setup channel - {str(e)}"
-                    summary["errors"].append(error_msg)
-                    log.error(error_msg)
-
-            except Exception as e:
-                error_msg = f"Group {i}: Unexpected error - {str(e)}"
-                summary["errors"].append(error_msg)
-                log.error(error_msg)
+                pending.append((i, user_responses))
+
+            metadata_list = generate_channel_metadata_batch(
+                [user_responses for _, user_responses in pending],
+                batch_size=FINALIZE_METADATA_BATCH_SIZE,
+                max_workers=FINALIZE_METADATA_WORKERS,
+                # Names stored by an earlier run stay taken
+                reserved_names=[
+                    state.payload["channel_name"] for (i, step), state in steps.items()
+                    if step == "metadata" and state.status == "done"
+                ],
+            )
+            for (i, _), metadata in zip(pending, metadata_list):
+                if metadata:
+                    steps[(i, "metadata")] = finalization.record_step(
+                        event_id, i, "metadata", "done", payload=metadata)
+                else:
+                    steps[(i, "metadata")] = finalization.record_step(
+                        event_id, i, "metadata", "failed", error="Failed to generate metadata")
+        summary["timings"]["metadata"] = round(time.monotonic() - stage_start, 3)
+
+        # Step 3: Create, populate and welcome every unfinished channel concurrently
+        stage_start = time.monotonic()
+        ready = [
+            i for i in range(len(groups))
+            if steps.get((i, "metadata")) and steps[(i, "metadata")].status == "done"
+            and not _group_settled(steps, i)
+        ]
+        with ThreadPoolExecutor(max_workers=FINALIZE_SLACK_WORKERS,
+                                thread_name_prefix="finalize-slack") as pool:
+            list(pool.map(
+                lambda i: _setup_group_channel(event_id, i, groups[i], steps), ready))
+        summary["timings"]["slack_setup"] = round(time.monotonic() - stage_start, 3)
+
+        for i in range(len(groups)):
+            welcome = steps.get((i, "welcome"))
+            if welcome and welcome.status == "done":
+                summary["channels_created"].append({
+                    "id": steps[(i, "create")].payload["id"],
+                    "summary": steps[(i, "metadata")].payload.get("initial_message", "")
+                })
+        for (i, step), state in sorted(steps.items()):
+            if state.status != "done" and i != EVENT_LEVEL:
+                summary["errors"].append(f"Group {i + 1}: {step} {state.status} - {state.last_error}")
 
         # Mark as successful if at least one channel was created
         summary["success"] = len(summary["channels_created"]) > 0
 
-        # Step 4: Send public announcement
-        if summary["channels_created"]:
-            public_channel_id = "C09HC5S2NNM"  # 598-test-channel
-            announcement_result = announce_to_public(public_channel_id, summary["channels_created"])
-            if not announcement_result["success"]:
-                summary["errors"].append(announcement_result["error"])  
-
-        log.info(f"Event {event_id} finalization complete: "
+        # Step 4: Send public announcement once every group is settled
+        groups_settled = all(_group_settled(steps, i) for i in range(len(groups)))
+        announce = steps.get((EVENT_LEVEL, ANNOUNCE_STEP))
+        if groups_settled and not _settled(announce):
+            stage_start = time.monotonic()
+            if summary["channels_created"]:
+                public_channel_id = "C09HC5S2NNM"  # 598-test-channel
+                announcement_result = announce_to_public(public_channel_id, summary["channels_created"])
+                announce = finalization.record_step(
+                    event_id, EVENT_LEVEL, ANNOUNCE_STEP,
+                    "done" if announcement_result["success"] else "failed",
+                    error=announcement_result["error"])
+            else:
+                announce = finalization.record_step(
+                    event_id, EVENT_LEVEL, ANNOUNCE_STEP, "skipped", error="No channels to announce")
+            summary["timings"]["announce"] = round(time.monotonic() - stage_start, 3)
+        if announce and announce.status == "failed":
+            summary["errors"].append(announce.last_error)
+
+        summary["complete"] = groups_settled and _settled(announce)
+        if summary["complete"]:
+            finalization.set_job_status(event_id, "done")
+
+        summary["timings"]["total"] = round(time.monotonic() - started, 3)
+        log.info(f"Event {event_id} finalization {'complete' if summary['complete'] else 'incomplete'}: "
                  f"{len(summary['channels_created'])} channels created, "
-                 f"{len(summary['errors'])} errors")
+                 f"{len(summary['errors'])} errors, timings {summary['timings']}")
 
         return summary
 
     except Exception as e:
         error_msg = f"Critical error finalizing event {event_id}: {str(e)}"
         summary["errors"].append(error_msg)
+        summary["timings"]["total"] = round(time.monotonic() - started, 3)
         log.error(error_msg)
         return summary
 
 
+def _setup_group_channel(event_id: int, group_index: int, group_slack_ids: List[str], steps: Steps) -> None:
+    """
+    Create one group's channel, invite its members and post the welcome message,
+    skipping whichever of those steps already succeeded in an earlier run.
+    Outcomes are recorded in steps (each group only touches its own keys).
+    """
+    metadata = steps[(group_index, "metadata")].payload
+    # Create unique channel name with event ID
+    channel_name = f"{metadata['channel_name']}-event{event_id}"
+
+    # An earlier attempt by this group at this name may have created the
+    # channel before failing or crashing (unless Slack said the name was taken)
+    prior = steps.get((group_index, "create"))
+    may_own_channel = (
+        prior is not None
+        and (prior.payload or {}).get("name") == channel_name
+        and "name_taken" not in (prior.last_error or "")
+    )
+    if not _settled(prior):
+        # Checkpoint the name before calling Slack, so a rerun can tell the channel is ours
+        steps[(group_index, "create")] = finalization.start_step(
+            event_id, group_index, "create", {"name": channel_name})
+
+    def create():
+        try:
+            channel_info = create_channel(
+                channel_name, is_private=False)
+            log.info(f"Created channel {channel_info['id']} ({channel_name})")
+        except RuntimeError as e:
+            # Anyone else's channel with this name fails the step rather than
+            # merging this group into it
+            if "name_taken" not in str(e) or not may_own_channel:
+                raise
+            channel_info = find_channel_by_name(channel_name, is_private=False)
+            if not channel_info:
+                raise
+            log.info(f"Reusing channel {channel_info['id']} ({channel_name}) from an earlier attempt")
+        return {"id": channel_info["id"], "name": channel_name}
+
+    created = _run_step(event_id, group_index, "create", steps, create)
+    if created.status != "done":
+        return
+    channel_id = created.payload["id"]
+
+    def invite():
+        invite_users_to_channel(channel_id, group_slack_ids)
+        log.info(
+            f"Invited {len(group_slack_ids)} users to {channel_id}")
+
+    if _run_step(event_id, group_index, "invite", steps, invite).status != "done":
+        return
+
+    def welcome():
+        mentions = " ".join(
+            [f"<@{sid}>" for sid in group_slack_ids])
+        full_message = (
+            f"👋 {mentions}\n\n"
+            f"{metadata['initial_message']}\n\n"
+            f"💬 {metadata['call_to_action']}"
+        )
+        chat_post_message(channel_id, full_message)
+        log.info(f"Posted welcome message to {channel_id}")
+
+    _run_step(event_id, group_index, "welcome", steps, welcome)
+
+
 def announce_to_public(public_channel: str, created_channels: List[Dict]):
     '''
     Sends message to public_channel, inviting users to join channels in created_channels
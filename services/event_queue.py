@@ -0,0 +1,132 @@
+# --------------------------------------------------
+# File: services/event_queue.py
+# Description: Bounded in-process queue + worker pool for Slack Events API
+# payloads, so /slack/events can ack inside Slack's 3 second deadline and
+# do the DB / Gemini / Slack work afterwards. The queue lives in memory
+# only: drain() it on shutdown, since anything still queued when the
+# process dies was already acked and Slack won't resend it.
+# --------------------------------------------------
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict
+
+log = logging.getLogger("event-queue")
+
+
+class EventQueue:
+    """
+    Hands payloads to a fixed pool of daemon worker threads.
+
+    Workers start on the first submit, so each gunicorn worker process gets
+    its own pool after forking. submit() never blocks; when the backlog is
+    full, or once drain() has started, it returns False and the caller
+    should answer non-2xx so Slack retries later.
+    """
+
+    def __init__(self, handler: Callable[[Dict], None], workers: int, max_backlog: int, name: str = "events"):
+        self.handler = handler
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_backlog)
+        self._started = False
+        self._accepting = True
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "queue_latency_total": 0.0,
+            "queue_latency_max": 0.0,
+            "handle_time_total": 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f"{self.name}-worker-{i}", daemon=True).start()
+            self._started = True
+            log.info(f"Started {self.workers} {self.name} queue workers")
+
+    def submit(self, payload: Dict) -> bool:
+        """Queue a payload for processing. Returns False if the backlog is full or draining."""
+        if not self._accepting:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((time.monotonic(), payload))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            log.warning(f"{self.name} queue full ({self._queue.maxsize}); rejecting event")
+            return False
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def _run(self) -> None:
+        while True:
+            enqueued_at, payload = self._queue.get()
+            started = time.monotonic()
+            ok = True
+            try:
+                self.handler(payload)
+            except Exception:
+                ok = False
+                log.exception(f"Error handling queued {self.name} payload")
+            finally:
+                finished = time.monotonic()
+                waited = started - enqueued_at
+                with self._stats_lock:
+                    self._stats["processed" if ok else "failed"] += 1
+                    self._stats["queue_latency_total"] += waited
+                    self._stats["queue_latency_max"] = max(self._stats["queue_latency_max"], waited)
+                    self._stats["handle_time_total"] += finished - started
+                self._queue.task_done()
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Stop accepting payloads and wait up to timeout seconds for the
+        workers to finish what's queued. Call before the DB pool closes.
+
+        Returns False if payloads were still pending when time ran out.
+        """
+        self._accepting = False
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    log.warning(f"{self.name} queue drain timed out with {self._queue.unfinished_tasks} event(s) unhandled")
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        log.info(f"{self.name} queue drained")
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        """Counters plus current depth and average/max queue latency in seconds."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        handled = stats["processed"] + stats["failed"]
+        return {
+            "accepting": self._accepting,
+            "depth": self._queue.qsize(),
+            "max_backlog": self._queue.maxsize,
+            "enqueued": stats["enqueued"],
+            "processed": stats["processed"],
+            "failed": stats["failed"],
+            "rejected": stats["rejected"],
+            "avg_queue_latency_seconds": round(stats["queue_latency_total"] / handled, 4) if handled else 0.0,
+            "max_queue_latency_seconds": round(stats["queue_latency_max"], 4),
+            "avg_handle_seconds": round(stats["handle_time_total"] / handled, 4) if handled else 0.0,
+        }
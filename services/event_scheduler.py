@@ -4,109 +4,430 @@
 # --------------------------------------------------
 
 import logging
-from datetime import datetime
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import psycopg2
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
-from database.repos.events import get_unfinalized_ended_events, mark_event_finalized
+from sqlalchemy import create_engine
+from config import FINALIZE_RETRY_SECONDS, FINALIZE_RETRY_MAX_SECONDS, FINALIZE_MAX_RETRIES
+from database import db
+from database.models import Event
+from database.repos import finalization_runs
+from database.repos.events import get_unfinalized_ended_events, get_pending_events, mark_event_finalized
 from database.repos.responses import get_responses_with_users
 from services.event_finalizer import finalize_event
 
 log = logging.getLogger("event-scheduler")
 
 scheduler = None
+# True when jobs live in the Postgres job store shared by all workers
+_shared_store = False
+_dsn = None
+# Serializes swapping the scheduler out (election thread vs. request threads)
+_scheduler_lock = threading.Lock()
+# Handle for the scheduler leader election (None when this process runs jobs unconditionally)
+_election = None
 
+# Advisory lock held by whichever gunicorn worker is running a finalization check
+LEADER_LOCK_KEY = (5980, 0)
+# Long-lived advisory lock held by the worker whose scheduler executes jobs.
+# Every worker shares the Postgres job store and can add jobs to it, but
+# APScheduler can't have two schedulers executing the same store.
+SCHEDULER_LEADER_KEY = (5980, 1)
+# NOTIFY channel that wakes the leader when another worker adds a job
+JOBS_CHANNEL = "scheduler_jobs_changed"
+# Seconds after an event's end time to fire its job, so the DB's NOW() is past it too
+END_TIME_GRACE_SECONDS = 5
 
-def check_and_finalize_events():
+
+def check_and_finalize_events(trigger: str = "manual"):
     """
     Check if any events have ended and need auto-finalization.
-    This runs periodically in the background.
+    This is the low-frequency safety net behind the end-time jobs.
+
+    Only the scheduler leader runs it (see start_scheduler), and it skips if
+    that worker has lost the leader lock since. The LEADER_LOCK_KEY advisory
+    lock additionally keeps a run from overlapping one started by a previous
+    leader. Each run is recorded in finalization_runs.
+
+    Args:
+        trigger: What started the run (interval | startup | manual)
+    """
+    if not _still_leader():
+        log.warning("No longer the scheduler leader; skipping finalization check")
+        return
+    try:
+        with db.advisory_lock(*LEADER_LOCK_KEY) as leader:
+            if not leader:
+                log.info("Another worker is running the finalization check; skipping")
+                return
+            _record_run(trigger, get_unfinalized_ended_events)
+    except Exception as e:
+        log.error(f"Error in auto-finalization check: {e}", exc_info=True)
+
+
+def finalize_ended_event(event_id: int, retry: int = 0):
     """
+    Finalize one event; the job scheduled at its end time, and its retries.
+
+    Unlike check_and_finalize_events this doesn't take the leader lock, so a
+    sweep that's busy elsewhere can't make it skip (and APScheduler would then
+    drop the one-shot job). finalize_event's per-event lock still keeps it
+    from overlapping a sweep or /finalize_event working on the same event.
+    """
+    if not _still_leader():
+        # The new leader has the job store now; the safety-net check covers this event
+        log.warning(f"No longer the scheduler leader; skipping end-time finalization of event {event_id}")
+        return
+    trigger = f"event_retry:{event_id}" if retry else f"event_end:{event_id}"
+    try:
+        _record_run(trigger, lambda: get_unfinalized_ended_events(event_id), retry=retry)
+    except Exception as e:
+        log.error(f"Error finalizing event {event_id} at its end time: {e}", exc_info=True)
+
+
+def _still_leader() -> bool:
+    """
+    Confirm this process still holds the scheduler leader lock.
+
+    The election thread only notices a lost lock every LEADER_CHECK_SECONDS,
+    so jobs check for themselves before touching the shared store's events.
+    """
+    return _election is None or _election.is_leader()
+
+
+def _record_run(trigger: str, load_events: Callable[[], List[Event]], retry: int = 0):
+    """
+    Finalize the events load_events returns, recording the run in finalization_runs.
+
+    retry is how many retries of these events have already run (see _schedule_retry).
+    """
+    run = {
+        "events_processed": 0,
+        "groups_created": 0,
+        "channels_created": 0,
+        "errors": [],
+        "stage_timings": {},
+    }
+    run_id = _start_run(trigger)
+    status = "error"
     try:
         log.info("Checking for events to finalize...")
+        _finalize_ended_events(load_events(), run, retry=retry)
+        status = "ok"
+    except Exception as e:
+        run["errors"].append(f"Run failed: {e}")
+        raise
+    finally:
+        _finish_run(run_id, status, run)
+
+
+def _start_run(trigger: str) -> Optional[int]:
+    # History is best effort; never block finalization on it
+    try:
+        return finalization_runs.start_run(trigger, os.getpid())
+    except Exception as e:
+        log.warning(f"Could not record finalization run start: {e}")
+        return None
+
+
+def _finish_run(run_id: Optional[int], status: str, run: Dict) -> None:
+    if run_id is None:
+        return
+    try:
+        finalization_runs.finish_run(run_id, status, **run)
+    except Exception as e:
+        log.warning(f"Could not record finalization run {run_id}: {e}")
+
+
+def _finalize_ended_events(ended_events: List[Event], run: Dict, retry: int = 0):
+    """
+    Finalize each of the given ended, unfinalized events, accumulating counts,
+    errors and per-event stage timings into run. Events left incomplete get
+    a retry job.
+    """
+    if not ended_events:
+        log.info("No unfinalized ended events found")
+        return
+    
+    log.info(f"Found {len(ended_events)} ended event(s) to process")
+    
+    # Process each ended event
+    for event in ended_events:
+        event_id = event.id
+        log.info(f"Processing event {event_id}")
+        run["events_processed"] += 1
         
-        # Get all events that have ended but haven't been finalized yet
-        ended_events = get_unfinalized_ended_events()
+        # Check if there are enough responses
+        responses = get_responses_with_users(event_id)
+        if not responses or len(responses) < 2:
+            log.info(f"Event {event_id} has {len(responses) if responses else 0} responses (need at least 2), skipping finalization")
+            # Mark as finalized anyway so we don't keep checking it
+            mark_event_finalized(event_id)
+            continue
         
-        if not ended_events:
-            log.info("No unfinalized ended events found")
-            return
+        log.info(f"Auto-finalizing event {event_id} with {len(responses)} responses...")
         
-        log.info(f"Found {len(ended_events)} ended event(s) to process")
+        # Run finalization
+        result = finalize_event(event_id)
+        run["groups_created"] += result["groups_created"]
+        run["channels_created"] += len(result["channels_created"])
+        run["errors"].extend(f"Event {event_id}: {error}" for error in result["errors"])
+        run["stage_timings"][str(event_id)] = result["timings"]
         
-        # Process each ended event
-        for event in ended_events:
-            event_id = event.id
-            log.info(f"Processing event {event_id}")
-            
-            # Check if there are enough responses
-            responses = get_responses_with_users(event_id)
-            if not responses or len(responses) < 2:
-                log.info(f"Event {event_id} has {len(responses) if responses else 0} responses (need at least 2), skipping finalization")
-                # Mark as finalized anyway so we don't keep checking it
-                mark_event_finalized(event_id)
-                continue
-            
-            log.info(f"Auto-finalizing event {event_id} with {len(responses)} responses...")
-            
-            # Run finalization
-            result = finalize_event(event_id)
-            
-            if result["success"]:
-                log.info(f"✅ Event {event_id} auto-finalized successfully! "
-                        f"Created {len(result['channels_created'])} channels")
-                # Mark event as finalized
-                mark_event_finalized(event_id)
-            else:
-                log.warning(f"⚠️ Event {event_id} finalization completed with errors: {result['errors']}")
-                # Still mark as finalized to prevent retrying
-                mark_event_finalized(event_id)
-    
+        if result["complete"]:
+            log.info(f"✅ Event {event_id} auto-finalized! "
+                    f"Created {len(result['channels_created'])} channels, {len(result['errors'])} errors")
+            # Every step is done or out of retries
+            mark_event_finalized(event_id)
+        else:
+            # Leave unfinalized; the retry job resumes the unfinished steps
+            log.warning(f"⚠️ Event {event_id} finalization incomplete, will resume: {result['errors']}")
+            _schedule_retry(event_id, retry + 1)
+
+
+def _retry_delay(retry: int) -> int:
+    """Seconds before the given retry (1-based): exponential, capped at FINALIZE_RETRY_MAX_SECONDS."""
+    return min(FINALIZE_RETRY_SECONDS * 2 ** (retry - 1), FINALIZE_RETRY_MAX_SECONDS)
+
+
+def _schedule_retry(event_id: int, retry: int) -> None:
+    """
+    Register a one-shot job that resumes an incomplete finalization with backoff.
+
+    Failed steps only get FINALIZE_MAX_STEP_ATTEMPTS tries, so a few retries
+    settle the event; after FINALIZE_MAX_RETRIES (e.g. the event's lock is
+    stuck) it is left to the safety-net check.
+
+    Each retry gets its own job id: the job that's running now may still be
+    in the store until the scheduler removes it, and replacing it would get
+    the retry removed along with it.
+    """
+    if retry > FINALIZE_MAX_RETRIES:
+        log.warning(f"Event {event_id} still incomplete after {FINALIZE_MAX_RETRIES} retries; "
+                    f"leaving it to the safety-net check")
+        return
+    if scheduler is None:
+        log.warning(f"Scheduler not running; event {event_id} will be resumed by the safety-net check")
+        return
+    run_date = datetime.now() + timedelta(seconds=_retry_delay(retry))
+    try:
+        scheduler.add_job(
+            finalize_ended_event,
+            'date',
+            run_date=run_date,
+            kwargs={'event_id': event_id, 'retry': retry},
+            id=f'finalize_event_{event_id}_retry{retry}',
+            replace_existing=True,
+            misfire_grace_time=None
+        )
+        log.info(f"Scheduled finalization retry {retry} of event {event_id} at {run_date}")
     except Exception as e:
-        log.error(f"Error in auto-finalization check: {e}", exc_info=True)
+        log.error(f"Failed to schedule finalization retry of event {event_id}: {e}", exc_info=True)
 
 
-def start_scheduler(check_interval_minutes=5):
+def schedule_event_finalization(event: Event) -> None:
     """
-    Start the background scheduler to check for events to finalize.
+    Register a one-shot job that finalizes an event right when it ends.
+
+    The job is stored in the shared Postgres job store, so it survives
+    restarts and any worker can add it; the leader is woken via NOTIFY.
+    It finalizes just that event (see finalize_ended_event).
+    """
+    if scheduler is None and _shared_store:
+        # A failed rebuild after an election change; try again
+        _replace_scheduler()
+    if scheduler is None:
+        log.warning(f"Scheduler not running; event {event.id} will be finalized by the safety-net check")
+        return
+    ends_at = event.ends_at or event.time_start + timedelta(days=event.duration_days)
+    run_date = ends_at + timedelta(seconds=END_TIME_GRACE_SECONDS)
+    try:
+        scheduler.add_job(
+            finalize_ended_event,
+            'date',
+            run_date=run_date,
+            kwargs={'event_id': event.id},
+            id=f'finalize_event_{event.id}',
+            replace_existing=True,
+            misfire_grace_time=None  # Still run if the process was busy/asleep at run_date
+        )
+        log.info(f"Scheduled finalization of event {event.id} at {run_date}")
+    except Exception as e:
+        log.error(f"Failed to schedule finalization of event {event.id}: {e}", exc_info=True)
+        return
+
+    if _shared_store:
+        # The leader may be another worker; wake it so it picks the job up
+        try:
+            db.notify(JOBS_CHANNEL)
+        except Exception as e:
+            log.warning(f"Could not notify the scheduler leader about event {event.id}: {e}")
+
+
+def _schedule_pending_events() -> None:
+    """Recreate the end-time jobs for every event that hasn't ended yet."""
+    try:
+        pending = get_pending_events()
+    except Exception as e:
+        log.error(f"Failed to load pending events: {e}", exc_info=True)
+        return
+    for event in pending:
+        schedule_event_finalization(event)
+
+
+def start_scheduler(check_interval_minutes=60, dsn=None):
+    """
+    Start the background scheduler.
+
+    Each event is finalized by a one-shot job at its end time (registered by
+    /start_event and rebuilt from the DB when a worker becomes leader); the
+    interval check is only a low-frequency safety net for anything those
+    jobs missed.
+
+    With a dsn, jobs live in a Postgres job store shared by all workers.
+    Every worker starts its scheduler paused (so it can add jobs), and only
+    the elected leader executes them, on a freshly built scheduler. Losing
+    leadership shuts that scheduler down and goes back to a paused one, and
+    each job re-checks the leader lock before it runs. Without a dsn (scripts),
+    jobs are kept in memory and this process executes them.
     
     Args:
-        check_interval_minutes: How often to check (default: 5 minutes)
+        check_interval_minutes: How often the safety-net check runs (default: 60 minutes)
+        dsn: Postgres connection string for the persistent job store
     """
-    global scheduler
+    global scheduler, _shared_store, _dsn, _election
     
     if scheduler is not None:
         log.warning("Scheduler already running")
         return
     
-    scheduler = BackgroundScheduler()
-    
-    # Schedule the check to run every X minutes
+    if dsn is None:
+        scheduler = BackgroundScheduler()
+        scheduler.start(paused=True)
+        _become_leader(check_interval_minutes)
+        return
+
+    _dsn = dsn
+    _shared_store = True
+    scheduler = _new_shared_scheduler()
+
+    db.listen(JOBS_CHANNEL, _wake_scheduler)
+    _election = db.run_leader_election(
+        SCHEDULER_LEADER_KEY,
+        on_elected=lambda: _become_leader(check_interval_minutes),
+        on_lost=_step_down,
+    )
+    log.info("Event scheduler started (paused until elected leader)")
+
+
+def _new_shared_scheduler() -> BackgroundScheduler:
+    """A paused scheduler on the shared Postgres job store: it can add jobs but won't run them."""
+    engine = create_engine("postgresql+psycopg2://", creator=lambda: psycopg2.connect(_dsn), pool_pre_ping=True)
+    new_scheduler = BackgroundScheduler(jobstores={"default": SQLAlchemyJobStore(engine=engine)})
+    new_scheduler.start(paused=True)
+    return new_scheduler
+
+
+def _shutdown(old_scheduler: BackgroundScheduler) -> None:
+    """
+    Shut a scheduler down without letting it touch the shared job store.
+
+    APScheduler's main loop makes one more pass over due jobs after
+    shutdown(), even if the scheduler was paused; on the shared store that
+    pass would pull jobs the leader is about to run. Detaching the store
+    first (which leaves its jobs in place) makes that pass a no-op.
+    """
+    if _shared_store:
+        old_scheduler.remove_jobstore("default")
+    old_scheduler.shutdown(wait=False)
+
+
+def _replace_scheduler() -> None:
+    """
+    Shut the current scheduler down and swap in a fresh paused one.
+
+    A scheduler that ran while another worker also executed the store can
+    have its thread killed by a job vanishing under it (remove_job raises),
+    and pause()/resume() wouldn't bring that thread back. If the new one
+    can't be built (e.g. the DB is down) scheduler stays None until the next
+    schedule_event_finalization or election retries.
+    """
+    global scheduler
+    with _scheduler_lock:
+        if not _shared_store:
+            # stop_scheduler() already ran
+            return
+        old, scheduler = scheduler, None
+        if old is not None:
+            try:
+                _shutdown(old)
+            except Exception as e:
+                log.warning(f"Error shutting down the previous scheduler: {e}")
+        try:
+            scheduler = _new_shared_scheduler()
+        except Exception as e:
+            log.error(f"Could not start a new scheduler: {e}", exc_info=True)
+
+
+def _become_leader(check_interval_minutes):
+    """Register the recurring jobs and start executing jobs from the store."""
+    if _shared_store:
+        # Start from a scheduler whose thread is known to be alive
+        _replace_scheduler()
+    if scheduler is None:
+        return
+
+    # Safety-net check every X minutes
     scheduler.add_job(
         check_and_finalize_events,
         'interval',
         minutes=check_interval_minutes,
+        kwargs={'trigger': 'interval'},
         id='auto_finalize_events',
         replace_existing=True,
         max_instances=1  # Prevent overlapping runs
     )
     
-    # Also run once at startup (after a short delay)
+    # Also run once now
     scheduler.add_job(
         check_and_finalize_events,
         'date',
         run_date=datetime.now(),
+        kwargs={'trigger': 'startup'},
         id='startup_check',
+        replace_existing=True,
         misfire_grace_time=60
     )
     
-    scheduler.start()
-    log.info(f"✅ Event scheduler started! Checking every {check_interval_minutes} minutes")
+    scheduler.resume()
+    _schedule_pending_events()
+    log.info(f"✅ Event scheduler running as leader! Safety-net check every {check_interval_minutes} minutes")
+
+
+def _step_down():
+    # Stop executing now; keep a paused scheduler so this worker can still add jobs
+    _replace_scheduler()
+    log.warning("Lost scheduler leadership; stopped job execution")
+
+
+def _wake_scheduler(payload=None):
+    # Re-read the job store for jobs other workers added (no-op while paused)
+    if scheduler is not None:
+        scheduler.wakeup()
 
 
 def stop_scheduler():
     """Stop the background scheduler"""
-    global scheduler
+    global scheduler, _shared_store
     
-    if scheduler is not None:
-        scheduler.shutdown(wait=False)
-        scheduler = None
-        log.info("Event scheduler stopped")
+    with _scheduler_lock:
+        if scheduler is not None:
+            _shutdown(scheduler)
+            scheduler = None
+            log.info("Event scheduler stopped")
+        # Keep a step-down from building a new one behind us
+        _shared_store = False
@@ -1,12 +1,15 @@
 # --------------------------------------------------
 # File: services/gemini_client.py
 # Description: Provides an interface to the Gemini API for text generation,
-# supporting both the official SDK and REST fallback modes.
+# supporting both the official SDK and REST fallback modes, with a
+# Postgres-backed response cache shared by all workers.
 # --------------------------------------------------
 
 
-import json, logging, requests
-from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_USE_REST
+import hashlib, json, logging, requests, threading, time
+from config import (GEMINI_API_KEY, GEMINI_MODEL, GEMINI_USE_REST,
+                    GEMINI_CACHE_ENABLED, GEMINI_CACHE_TTL_SECONDS, GEMINI_CACHE_MAX_ENTRIES)
+from database.repos import gemini_cache
 
 log = logging.getLogger("slack-ask-bot")
 
@@ -43,22 +46,96 @@ def _rest_call(prompt: str, timeout: int = 20) -> str:
         return ""
 
 
-def ask_gemini(prompt: str) -> str:
+# ---------- Response cache ----------
+# Identical (model, prompt, schema, mime type) requests are answered from the
+# gemini_cache table, which both gunicorn workers share.
+_EVICT_INTERVAL = 600  # seconds between LRU/TTL eviction passes per worker
+_cache_lock = threading.Lock()
+_next_evict = 0.0
+_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+
+def _cache_key(prompt: str, schema: dict | None, mime_type: str | None) -> str:
+    material = json.dumps(
+        {"model": GEMINI_MODEL, "prompt": prompt, "schema": schema, "mime_type": mime_type},
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _cache_get(cache_key: str) -> tuple[bool, object]:
+    try:
+        found, response = gemini_cache.get_cached_response(cache_key)
+    except Exception as e:
+        log.warning(f"Gemini cache lookup failed: {e}")
+        with _cache_lock:
+            _cache_stats["errors"] += 1
+        return False, None
+    with _cache_lock:
+        _cache_stats["hits" if found else "misses"] += 1
+    return found, response
+
+
+def _cache_put(cache_key: str, response: object) -> None:
+    global _next_evict
+    try:
+        gemini_cache.save_response(cache_key, GEMINI_MODEL, response, GEMINI_CACHE_TTL_SECONDS)
+        with _cache_lock:
+            _cache_stats["stores"] += 1
+            now = time.monotonic()
+            evict_due = now >= _next_evict
+            if evict_due:
+                _next_evict = now + _EVICT_INTERVAL
+        if evict_due:
+            evicted = gemini_cache.evict_responses(GEMINI_CACHE_MAX_ENTRIES)
+            if evicted:
+                log.info(f"Evicted {evicted} Gemini cache entries")
+    except Exception as e:
+        log.warning(f"Gemini cache store failed: {e}")
+        with _cache_lock:
+            _cache_stats["errors"] += 1
+
+
+def get_cache_stats() -> dict:
+    with _cache_lock:
+        stats = dict(_cache_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def ask_gemini(prompt: str, use_cache: bool = True) -> str:
+    cache_key = _cache_key(prompt, None, None) if use_cache and GEMINI_CACHE_ENABLED else None
+    if cache_key:
+        found, cached = _cache_get(cache_key)
+        if found:
+            return cached
     try:
         if _model_obj is not None:
             resp = _model_obj.models.generate_content(contents=prompt, model=_genai)
-            return (getattr(resp, "text", "") or "").strip()
-        return _rest_call(prompt)
+            answer = (getattr(resp, "text", "") or "").strip()
+        else:
+            answer = _rest_call(prompt)
     except Exception as e:
         log.exception("Gemini call failed")
         return f"(Gemini error: {e})"
+    if cache_key and answer:
+        _cache_put(cache_key, answer)
+    return answer
 
 def ask_gemini_structured(
     prompt: str,
     schema: dict | None = None,
     mime_type: str = "application/json",
     timeout: int = 20,
+    use_cache: bool = True,
 ) -> object:
+    cache_key = _cache_key(prompt, schema, mime_type) if use_cache and GEMINI_CACHE_ENABLED else None
+    if cache_key:
+        found, cached = _cache_get(cache_key)
+        if found:
+            return cached
+
     config: dict[str, object] = {}
     if mime_type:
         config["response_mime_type"] = mime_type
@@ -73,18 +150,23 @@ def ask_gemini_structured(
                 config=config or None,
             )
             text_payload = (getattr(response, "text", "") or "").strip()
+            result = text_payload
             if mime_type == "application/json":
                 try:
-                    return json.loads(text_payload) if text_payload else {}
+                    result = json.loads(text_payload) if text_payload else {}
                 except json.JSONDecodeError:
                     log.warning("Structured response was not valid JSON; returning raw text.")
-            return text_payload
-
-        return _rest_call_structured(prompt, schema, mime_type, timeout=timeout)
+        else:
+            result = _rest_call_structured(prompt, schema, mime_type, timeout=timeout)
     except Exception:
         log.exception("Gemini structured call failed")
         return None
 
+    # Only cache well-formed answers; raw text from a failed JSON parse is worth retrying
+    if cache_key and result and (mime_type != "application/json" or isinstance(result, (dict, list))):
+        _cache_put(cache_key, result)
+    return result
+
 
 def _rest_call_structured(
     prompt: str,
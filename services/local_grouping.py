@@ -0,0 +1,230 @@
+# --------------------------------------------------
+# File: services/local_grouping.py
+# Description: Gemini-free grouping engine. Vectorizes responses in-process
+# with a hashing TF-IDF vectorizer (NumPy) and clusters them with spherical
+# k-means, returning the same List[List[slack_id]] shape as the LLM path.
+# --------------------------------------------------
+
+import logging
+import re
+import zlib
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from config import (LOCAL_GROUPING_DIMENSIONS, LOCAL_GROUPING_TARGET_SIZE,
+                    LOCAL_GROUPING_MIN_SIMILARITY)
+
+log = logging.getLogger("local-grouping")
+
+# Same minimum the classification prompt enforces
+MIN_GROUP_SIZE = 2
+KMEANS_ITERATIONS = 25
+KMEANS_SEED = 598
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+a about am an and are as at be been but by can do for from have i i'm im in is it it's its
+just like me my of on or so that the this to too really very was we what with would you your
+""".split())
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w for w in _TOKEN_RE.findall((text or "").lower()) if w not in _STOPWORDS and len(w) > 1]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vectorize_text(text: str, dimensions: int = LOCAL_GROUPING_DIMENSIONS) -> np.ndarray:
+    """
+    Hash a response into a fixed-size float32 term-frequency vector.
+
+    Unigrams and bigrams are hashed with crc32 (stable across processes, so
+    vectors can be stored and compared later) using a sign bit to cancel
+    collisions, with sublinear (1 + log) term frequency. IDF weighting is
+    applied at clustering time, across the event's responses.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    counts = {}
+    for token in _tokens(text):
+        counts[token] = counts.get(token, 0) + 1
+    for token, count in counts.items():
+        h = zlib.crc32(token.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % dimensions] += sign * (1.0 + np.log(count))
+    return vector
+
+
+def _weight_and_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Apply IDF across the rows and L2-normalize each row (all-zero rows stay zero)."""
+    df = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1.0 + len(matrix)) / (1.0 + df)) + 1.0
+    weighted = matrix * idf.astype(np.float32)
+    norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+    return np.divide(weighted, norms, out=np.zeros_like(weighted), where=norms > 0)
+
+
+def _spherical_kmeans(x: np.ndarray, k: int) -> np.ndarray:
+    """Cosine k-means with k-means++ seeding. Returns each row's cluster label."""
+    rng = np.random.default_rng(KMEANS_SEED)
+    centroids = np.empty((k, x.shape[1]), dtype=np.float32)
+    centroids[0] = x[rng.integers(len(x))]
+    closest = 1.0 - x @ centroids[0]
+    for i in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        pick = rng.choice(len(x), p=weights / total) if total > 0 else rng.integers(len(x))
+        centroids[i] = x[pick]
+        closest = np.minimum(closest, 1.0 - x @ centroids[i])
+
+    labels = np.full(len(x), -1)
+    for _ in range(KMEANS_ITERATIONS):
+        sims = x @ centroids.T
+        new_labels = sims.argmax(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for i in range(k):
+            members = x[labels == i]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm > 0:
+                    centroids[i] = centroid / norm
+    return labels
+
+
+def _cluster_sums(x: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+    """Sum of member vectors per cluster (ungrouped rows, label -1, are ignored)."""
+    sums = np.zeros((k, x.shape[1]), dtype=np.float32)
+    grouped = labels >= 0
+    np.add.at(sums, labels[grouped], x[grouped])
+    return sums
+
+
+def _split_mixed(x: np.ndarray, labels: np.ndarray, k: int, min_similarity: float) -> Tuple[np.ndarray, int]:
+    """
+    Bisect clusters that hold dissimilar sub-groups, until none do. Returns (labels, k).
+
+    k comes from the target group size, so a small event gets k=1 and
+    unrelated topics would otherwise share a cluster (and, pair by pair,
+    pass the leave-one-out check). A cluster is split with 2-means when its
+    halves' centroids are less than min_similarity alike; a half too small
+    to be a group is left ungrouped instead (it may be reattached later).
+    """
+    labels = labels.copy()
+    pending = list(range(k))
+    while pending:
+        cluster = pending.pop()
+        members = np.where(labels == cluster)[0]
+        if len(members) <= MIN_GROUP_SIZE:
+            continue
+        halves = _spherical_kmeans(x[members], 2)
+        sizes = np.bincount(halves, minlength=2)
+        if sizes.min() == 0:
+            continue  # 2-means couldn't separate them (e.g. identical responses)
+        a = x[members[halves == 0]].sum(axis=0)
+        b = x[members[halves == 1]].sum(axis=0)
+        norms = np.linalg.norm(a) * np.linalg.norm(b)
+        if norms > 0 and a @ b / norms >= min_similarity:
+            continue
+        if sizes.min() < MIN_GROUP_SIZE:
+            labels[members[halves == sizes.argmin()]] = -1
+            pending.append(cluster)
+            continue
+        labels[members[halves == 1]] = k
+        pending += [cluster, k]
+        k += 1
+    return labels, k
+
+
+def _drop_unmatched(x: np.ndarray, labels: np.ndarray, k: int, min_similarity: float) -> np.ndarray:
+    """
+    Ungroup members whose similarity to the centroid of the *other* members of
+    their cluster (leave-one-out) is below min_similarity, until stable.
+
+    Comparing against a centroid that includes the member itself lets
+    unrelated responses pass when k is small (with k=1, three responses with
+    no shared terms each score ~0.58 against the shared centroid).
+    """
+    labels = labels.copy()
+    while True:
+        grouped = np.where(labels >= 0)[0]
+        if not len(grouped):
+            return labels
+        others = _cluster_sums(x, labels, k)[labels[grouped]] - x[grouped]
+        norms = np.linalg.norm(others, axis=1)
+        loo = np.divide(np.einsum("ij,ij->i", x[grouped], others), norms,
+                        out=np.zeros(len(grouped), dtype=np.float32), where=norms > 0)
+        unmatched = grouped[loo < min_similarity]
+        if not len(unmatched):
+            return labels
+        labels[unmatched] = -1
+
+
+def group_vectors(
+    slack_ids: Sequence[str],
+    vectors: Sequence[np.ndarray],
+    target_size: int = LOCAL_GROUPING_TARGET_SIZE,
+    min_similarity: float = LOCAL_GROUPING_MIN_SIMILARITY,
+) -> List[List[str]]:
+    """
+    Cluster pre-computed response vectors into groups of slack_ids.
+
+    Args:
+        slack_ids: One Slack user id per vector
+        vectors: Term-frequency vectors from vectorize_text
+        target_size: Average group size to aim for (sets k)
+        min_similarity: Members less similar than this to their group's centroid are left ungrouped
+
+    Returns:
+        List of groups (2+ members each); dissimilar users are left out
+    """
+    if len(slack_ids) < MIN_GROUP_SIZE:
+        return []
+
+    x = _weight_and_normalize(np.vstack(vectors).astype(np.float32))
+    has_terms = np.linalg.norm(x, axis=1) > 0
+    ids = [sid for sid, keep in zip(slack_ids, has_terms) if keep]
+    x = x[has_terms]
+    if len(ids) < MIN_GROUP_SIZE:
+        return []
+
+    k = max(1, min(len(ids) // MIN_GROUP_SIZE, round(len(ids) / max(target_size, MIN_GROUP_SIZE))))
+    labels = _spherical_kmeans(x, k)
+    labels, k = _split_mixed(x, labels, k, min_similarity)
+    labels = _drop_unmatched(x, labels, k, min_similarity)
+
+    # Ungrouped members and singletons join the cluster whose (other) members
+    # they match best, if any match well enough; otherwise they stay ungrouped
+    sums = _cluster_sums(x, labels, k)
+    sizes = np.bincount(labels[labels >= 0], minlength=k)
+    for i in range(len(ids)):
+        own = labels[i]
+        if own >= 0 and sizes[own] >= MIN_GROUP_SIZE:
+            continue
+        if own >= 0:
+            # Leave its singleton cluster before looking for a better one
+            sums[own] -= x[i]
+            sizes[own] -= 1
+        norms = np.linalg.norm(sums, axis=1)
+        sims = np.divide(sums @ x[i], norms, out=np.zeros(k, dtype=np.float32), where=norms > 0)
+        candidates = np.where(sizes >= MIN_GROUP_SIZE, sims, -np.inf)
+        best = int(candidates.argmax())
+        if candidates[best] >= min_similarity:
+            labels[i] = best
+            sums[best] += x[i]
+            sizes[best] += 1
+        else:
+            labels[i] = -1
+
+    groups = [[ids[i] for i in np.where(labels == c)[0]] for c in range(k)]
+    return [g for g in groups if len(g) >= MIN_GROUP_SIZE]
+
+
+def group_responses(responses: List[Tuple[str, str]]) -> Optional[List[List[str]]]:
+    """Group (slack_id, response_text) pairs without calling Gemini."""
+    if len(responses) < MIN_GROUP_SIZE:
+        return None
+    slack_ids = [slack_id for slack_id, _ in responses]
+    vectors = [vectorize_text(entry) for _, entry in responses]
+    groups = group_vectors(slack_ids, vectors)
+    log.info(f"Locally grouped {len(responses)} responses into {len(groups)} groups")
+    return groups
@@ -1,17 +1,26 @@
 # --------------------------------------------------
 # File: services/response_classifier.py
-# Description: Classify user responses into groups using Gemini
+# Description: Classify user responses into groups using Gemini (or the local engine)
 # --------------------------------------------------
 
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Tuple
+from config import (CLASSIFY_SHARD_SIZE, CLASSIFY_MERGE_LIMIT, CLASSIFY_WORKERS,
+                    GROUPING_ENGINE, GROUPING_GEMINI_TIMEOUT)
 from database.repos.responses import get_responses_with_users
 from services.gemini_client import ask_gemini_structured
-from prompts.event_prompts import get_classification_prompt
-from schemas.gemini_schemas import CLASSIFICATION_SCHEMA
+from services.local_grouping import group_vectors
+from services.response_embedder import get_event_vectors
+from prompts.event_prompts import get_classification_prompt, get_cluster_merge_prompt
+from schemas.gemini_schemas import CLASSIFICATION_SCHEMA, CLUSTER_MERGE_SCHEMA
 
 log = logging.getLogger("response-classifier")
 
+# Sample responses shown per cluster in a merge prompt, and max characters per sample
+MERGE_SAMPLES_PER_CLUSTER = 3
+MERGE_SAMPLE_CHARS = 150
+
 
 def classify_user_responses(event_id: int) -> Optional[List[List[str]]]:
     """
@@ -23,38 +32,187 @@ def classify_user_responses(event_id: int) -> Optional[List[List[str]]]:
     Returns:
         List of groups, each containing list of user slack_ids
         Example: [['U123', 'U456'], ['U789', 'U012']]
-        Returns None if classification fails or not enough responses
+        Returns [] if there are no groups to form (e.g. not enough responses)
+        and None if classification fails, so callers can retry
     """
     try:
+        if GROUPING_ENGINE == "local":
+            return _group_locally(event_id)
+
         # Get responses with user info from database
         responses = get_responses_with_users(event_id)
         
         if len(responses) < 2:
             log.info(f"Not enough responses for event {event_id} (found {len(responses)})")
-            return None
-        
+            return []
+
         log.info(f"Classifying {len(responses)} responses for event {event_id}")
+        groups = _classify_with_deadline(responses)
+        if groups is None:
+            log.warning(f"Gemini classification unavailable for event {event_id}, falling back to local grouping")
+            return _group_locally(event_id)
+        return groups
+    
+    except Exception as e:
+        log.error(f"Failed to classify responses for event {event_id}: {e}")
+        return None
+
+
+def _group_locally(event_id: int) -> List[List[str]]:
+    """Cluster the event's precomputed response vectors without calling Gemini."""
+    slack_ids, vectors = get_event_vectors(event_id)
+    if len(slack_ids) < 2:
+        log.info(f"Not enough responses for event {event_id} (found {len(slack_ids)})")
+        return []
+    log.info(f"Grouping {len(slack_ids)} responses for event {event_id} locally")
+    return group_vectors(slack_ids, vectors)
+
+
+def _classify_with_deadline(responses: List[Tuple[str, str]]) -> Optional[List[List[str]]]:
+    """Run the Gemini path, giving up (returning None) after GROUPING_GEMINI_TIMEOUT seconds."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(classify_responses, responses)
+    try:
+        return future.result(timeout=GROUPING_GEMINI_TIMEOUT)
+    except FutureTimeout:
+        log.warning(f"Gemini classification exceeded {GROUPING_GEMINI_TIMEOUT}s")
+        return None
+    except Exception as e:
+        log.error(f"Gemini classification failed: {e}")
+        return None
+    finally:
+        # Don't wait on a timed-out call; it finishes in the background
+        pool.shutdown(wait=False)
+
+
+def classify_responses(
+    responses: List[Tuple[str, str]],
+    shard_size: int = CLASSIFY_SHARD_SIZE,
+    merge_limit: int = CLASSIFY_MERGE_LIMIT,
+    max_workers: int = CLASSIFY_WORKERS,
+) -> Optional[List[List[str]]]:
+    """
+    Group (slack_id, response_text) pairs by similarity.
+    
+    Up to shard_size responses go to Gemini in one prompt. Larger sets are
+    split into shards that are classified in parallel (map), after which a
+    reduce pass asks Gemini which shard-level clusters share a theme and
+    merges them.
+    
+    Args:
+        responses: List of (slack_id, response_text) tuples
+        shard_size: Max responses per classification prompt
+        merge_limit: Max clusters per merge prompt
+        max_workers: Concurrent Gemini calls
         
-        # Generate prompt
-        prompt = get_classification_prompt(responses)
-        
-        # Call Gemini with structured output
-        groups = ask_gemini_structured(
-            prompt, 
-            schema=CLASSIFICATION_SCHEMA, 
-            mime_type="application/json"
-        )
-        
-        if not groups:
-            log.warning(f"Gemini returned empty groups for event {event_id}")
+    Returns:
+        List of groups of slack_ids (each with 2+ members), or None if every call failed
+    """
+    if len(responses) <= shard_size:
+        return _classify_shard(responses)
+
+    shard_count = -(-len(responses) // shard_size)
+    shards = [responses[i::shard_count] for i in range(shard_count)]
+    log.info(f"Classifying {len(responses)} responses in {shard_count} shards")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="classify-shard") as pool:
+        shard_groups = list(pool.map(_classify_shard, shards))
+
+        if all(groups is None for groups in shard_groups):
+            log.warning("Every classification shard failed")
             return None
-        
+
+        clusters = [group for groups in shard_groups if groups for group in groups]
+        responses_dict = dict(responses)
+        merged = _reduce_clusters(clusters, responses_dict, merge_limit, pool)
+
+    log.info(f"Merged {len(clusters)} shard clusters into {len(merged)} groups")
+    return merged
+
+
+def _clean_groups(groups: object, allowed_ids: set) -> List[List[str]]:
+    """Drop unknown ids and repeated members, then keep only groups of 2 or more."""
+    if not isinstance(groups, list):
+        return []
+    seen = set()
+    cleaned = []
+    for group in groups:
+        if not isinstance(group, list):
+            continue
+        members = []
+        for member in group:
+            if member in allowed_ids and member not in seen:
+                seen.add(member)
+                members.append(member)
         # Filter out groups with < 2 members (enforce minimum)
-        valid_groups = [g for g in groups if isinstance(g, list) and len(g) >= 2]
-        
-        log.info(f"Classified into {len(valid_groups)} valid groups (from {len(groups)} total)")
-        return valid_groups
+        if len(members) >= 2:
+            cleaned.append(members)
+    return cleaned
+
+
+def _classify_shard(responses: List[Tuple[str, str]]) -> Optional[List[List[str]]]:
+    """Classify one prompt's worth of responses. Returns None if Gemini gave nothing back."""
+    # Generate prompt
+    prompt = get_classification_prompt(responses)
     
-    except Exception as e:
-        log.error(f"Failed to classify responses for event {event_id}: {e}")
+    # Call Gemini with structured output
+    groups = ask_gemini_structured(
+        prompt, 
+        schema=CLASSIFICATION_SCHEMA, 
+        mime_type="application/json"
+    )
+    
+    if not groups:
+        log.warning(f"Gemini returned empty groups for {len(responses)} responses")
         return None
+    
+    valid_groups = _clean_groups(groups, {slack_id for slack_id, _ in responses})
+    
+    log.info(f"Classified into {len(valid_groups)} valid groups (from {len(groups)} total)")
+    return valid_groups
+
+
+def _merge_clusters(clusters: List[List[str]], responses_dict: Dict[str, str]) -> List[List[str]]:
+    """One reduce call: ask Gemini which clusters share a theme and union them."""
+    cluster_ids = [f"C{i}" for i in range(1, len(clusters) + 1)]
+    described = [
+        (cluster_id, [(responses_dict.get(slack_id) or "")[:MERGE_SAMPLE_CHARS]
+                      for slack_id in members[:MERGE_SAMPLES_PER_CLUSTER]])
+        for cluster_id, members in zip(cluster_ids, clusters)
+    ]
+
+    merge_groups = ask_gemini_structured(
+        get_cluster_merge_prompt(described),
+        schema=CLUSTER_MERGE_SCHEMA,
+        mime_type="application/json"
+    )
+    if not merge_groups:
+        log.warning(f"Cluster merge returned nothing for {len(clusters)} clusters; keeping them as-is")
+        return clusters
+
+    by_id = dict(zip(cluster_ids, clusters))
+    merged = []
+    for id_group in _clean_groups(merge_groups, set(cluster_ids)):
+        merged.append([member for cluster_id in id_group for member in by_id.pop(cluster_id)])
+    # Clusters Gemini didn't merge stay as they were
+    merged.extend(by_id.values())
+    return merged
+
+
+def _reduce_clusters(
+    clusters: List[List[str]],
+    responses_dict: Dict[str, str],
+    merge_limit: int,
+    pool: ThreadPoolExecutor,
+) -> List[List[str]]:
+    """Merge clusters, in parallel chunks of merge_limit while there are too many for one prompt."""
+    while len(clusters) > merge_limit:
+        chunks = [clusters[i:i + merge_limit] for i in range(0, len(clusters), merge_limit)]
+        reduced = [cluster for merged in pool.map(lambda c: _merge_clusters(c, responses_dict), chunks)
+                   for cluster in merged]
+        if len(reduced) >= len(clusters):
+            return reduced  # nothing left to merge
+        clusters = reduced
+    if len(clusters) < 2:
+        return clusters
+    return _merge_clusters(clusters, responses_dict)
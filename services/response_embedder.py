@@ -0,0 +1,83 @@
+# --------------------------------------------------
+# File: services/response_embedder.py
+# Description: Background stage that vectorizes each response as it is
+# submitted (or edited) and stores the vector on the responses row, so
+# local finalization only clusters vectors that already exist. With the
+# gemini engine nothing is embedded up front (see submit).
+# --------------------------------------------------
+
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import EMBEDDING_WORKERS, EMBEDDING_MAX_BACKLOG, LOCAL_GROUPING_DIMENSIONS, GROUPING_ENGINE
+from database.repos.responses import get_response_embeddings, save_response_embedding
+from services.event_queue import EventQueue
+from services.local_grouping import vectorize_text
+
+log = logging.getLogger("response-embedder")
+
+EMBEDDING_DTYPE = np.float32
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return vector.astype(EMBEDDING_DTYPE).tobytes()
+
+
+def from_bytes(data: Optional[bytes]) -> Optional[np.ndarray]:
+    """Decode a stored embedding; None if missing or computed with a different dimension."""
+    if not data:
+        return None
+    vector = np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+    return vector if vector.shape[0] == LOCAL_GROUPING_DIMENSIONS else None
+
+
+def _embed(job: Dict) -> None:
+    vector = vectorize_text(job["entry"])
+    if not save_response_embedding(job["slack_id"], job["event_id"], job["entry"], to_bytes(vector)):
+        # The response was edited again (a newer job will store that vector) or removed
+        log.debug(f"Skipped stale embedding for {job['slack_id']} on event {job['event_id']}")
+
+
+embedding_queue = EventQueue(_embed, workers=EMBEDDING_WORKERS, max_backlog=EMBEDDING_MAX_BACKLOG, name="embeddings")
+
+
+def submit(slack_id: str, event_id: int, entry: str) -> bool:
+    """
+    Queue a response for embedding. Never blocks; if the queue is full the
+    vector is simply computed at finalization time instead.
+
+    Skipped (returns False) unless GROUPING_ENGINE is "local": the gemini
+    engine sends raw text, and only needs vectors if it falls back.
+    """
+    if GROUPING_ENGINE != "local":
+        return False
+    return embedding_queue.submit({"slack_id": slack_id, "event_id": event_id, "entry": entry})
+
+
+def get_event_vectors(event_id: int) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    Load (slack_ids, vectors) for an event's responses.
+
+    Responses whose vector is missing (queue was full, worker restarted) or
+    stale (dimension changed) are embedded now and written back.
+    """
+    slack_ids, vectors = [], []
+    backfilled = 0
+    for slack_id, entry, embedding in get_response_embeddings(event_id):
+        vector = from_bytes(embedding)
+        if vector is None:
+            vector = vectorize_text(entry)
+            try:
+                save_response_embedding(slack_id, event_id, entry, to_bytes(vector))
+            except Exception as e:
+                log.warning(f"Could not store backfilled embedding for {slack_id}: {e}")
+            backfilled += 1
+        slack_ids.append(slack_id)
+        vectors.append(vector)
+    if backfilled:
+        log.info(f"Backfilled {backfilled}/{len(slack_ids)} embeddings for event {event_id}")
+    return slack_ids, vectors
+
+
+def get_embedding_stats() -> Dict[str, float]:
+    return embedding_queue.get_stats()
@@ -1,13 +1,19 @@
 import logging
 from typing import List, Dict
 from datetime import datetime
-from database.db import get_conn, put_conn
-from database.repos.users import get_user_by_slack_id, create_user
+from database.models import ThreadEngagement
+from database.repos.threads import record_intervention
+from services.engagement_tracker import record_activity, claim_intervention, release_intervention
 from services.gemini_client import ask_gemini_structured
 from utils.slack_api import open_im, chat_post_message, slack_api
 
 log = logging.getLogger("thread-monitor")
 
+# Engagement score added per message / reaction, and the score at which a participant counts as engaged
+MESSAGE_SCORE = 10
+REACTION_SCORE = 5
+ENGAGED_SCORE = 10
+
 def process_message_event(event: Dict):
     """Process a message event in a thread"""
     thread_ts = event.get("thread_ts")
@@ -15,39 +21,18 @@ def process_message_event(event: Dict):
     user_slack_id = event.get("user")
     message_text = event.get("text", "")
     message_ts = event.get("ts")
-    # Ensure user exists in DB
-    user = get_user_by_slack_id(user_slack_id)
-    if not user:
-        user = create_user(user_slack_id)
-    
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            # Upsert monitored_thread
-            cur.execute("""
-                INSERT INTO monitored_threads (thread_ts, channel_id, last_activity, message_count, original_message)
-                VALUES (%s, %s, NOW(), 1, %s)
-                ON CONFLICT (thread_ts) DO UPDATE
-                SET last_activity = NOW(),
-                    message_count = monitored_threads.message_count + 1
-            """, (thread_ts, channel_id, message_text if event.get("ts") == thread_ts else None))
-            
-            # Upsert thread participant
-            cur.execute("""
-                INSERT INTO thread_participants (thread_ts, user_id, slack_id, message_count, last_engaged, engagement_score)
-                VALUES (%s, %s, %s, 1, NOW(), 10)
-                ON CONFLICT (thread_ts, user_id) DO UPDATE
-                SET message_count = thread_participants.message_count + 1,
-                    last_engaged = NOW(),
-                    engagement_score = thread_participants.engagement_score + 10
-            """, (thread_ts, user.uuid, user_slack_id))
-            
-            conn.commit()
-            
-            # Check if intervention criteria met
-            check_and_intervene(thread_ts, channel_id)
-    finally:
-        put_conn(conn)
+
+    # Write through to the DB in one round trip; engaged participants come from memory
+    engagement = record_activity(
+        thread_ts, channel_id, user_slack_id,
+        original_message=message_text if message_ts == thread_ts else None,
+        messages=1,
+        score=MESSAGE_SCORE,
+        min_score=ENGAGED_SCORE,
+    )
+
+    # Check if intervention criteria met
+    check_and_intervene(engagement, channel_id)
 
 def process_reaction_event(event: Dict):
     """Process a reaction as engagement signal"""
@@ -55,89 +40,58 @@ def process_reaction_event(event: Dict):
     thread_ts = item.get("ts")  # Could be thread_ts or message ts
     channel_id = event.get("item", {}).get("channel")
     user_slack_id = event.get("user")
-    
-    # Ensure user exists
-    user = get_user_by_slack_id(user_slack_id)
-    if not user:
-        user = create_user(user_slack_id)
-    
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            # ENSURE THREAD EXISTS FIRST (same as in process_message_event)
-            cur.execute("""
-                INSERT INTO monitored_threads (thread_ts, channel_id, last_activity, message_count)
-                VALUES (%s, %s, NOW(), 0)
-                ON CONFLICT (thread_ts) DO UPDATE
-                SET last_activity = NOW()
-            """, (thread_ts, channel_id))
-            
-            # Update participant engagement
-            cur.execute("""
-                INSERT INTO thread_participants (thread_ts, user_id, slack_id, reaction_count, last_engaged, engagement_score)
-                VALUES (%s, %s, %s, 1, NOW(), 5)
-                ON CONFLICT (thread_ts, user_id) DO UPDATE
-                SET reaction_count = thread_participants.reaction_count + 1,
-                    last_engaged = NOW(),
-                    engagement_score = thread_participants.engagement_score + 5
-            """, (thread_ts, user.uuid, user_slack_id))
-            
-            conn.commit()
-            
-            check_and_intervene(thread_ts, channel_id)
-    finally:
-        put_conn(conn)
+
+    engagement = record_activity(
+        thread_ts, channel_id, user_slack_id,
+        reactions=1,
+        score=REACTION_SCORE,
+        min_score=ENGAGED_SCORE,
+    )
+
+    check_and_intervene(engagement, channel_id)
 
         
-def check_and_intervene(thread_ts: str, channel_id: str):
+def check_and_intervene(engagement: ThreadEngagement, channel_id: str):
     """Check if intervention criteria met and take action"""
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            # Get thread info
-            cur.execute("""
-                SELECT bot_intervened, intervention_type, message_count 
-                FROM monitored_threads 
-                WHERE thread_ts = %s
-            """, (thread_ts,))
-            thread_row = cur.fetchone()
-            
-            if not thread_row:
-                return
-            
-            bot_intervened = thread_row[0]
-            current_intervention = thread_row[1]
-            
-            # Get engaged participants (sorted by engagement score)
-            cur.execute("""
-                SELECT user_id, slack_id, engagement_score
-                FROM thread_participants
-                WHERE thread_ts = %s AND engagement_score >= 10
-                ORDER BY engagement_score DESC
-            """, (thread_ts,))
-            participants = cur.fetchall()
-            
-            num_engaged = len(participants)
-            
-            # PROGRESSIVE INTERVENTION LOGIC
-            # Allow escalation: dm_pair → ephemeral → create_channel
-            
-            if num_engaged >= 4 and current_intervention != 'create_channel':
-                # Upgrade to channel creation (highest intervention)
-                create_group_channel(thread_ts, channel_id, participants, cur, conn)
-            
-            elif num_engaged == 3 and current_intervention not in ['ephemeral', 'create_channel']:
-                # Upgrade to ephemeral (medium intervention)
-                create_group_channel(thread_ts, channel_id, participants, cur, conn)
-                            
-            elif num_engaged == 2 and not bot_intervened:
-                # Initial intervention: DM pair (lowest intervention)
-                send_dm_to_pair(thread_ts, channel_id, participants[:2], cur, conn)
-    
-    finally:
-        put_conn(conn)
+    thread_ts = engagement.thread_ts
+    bot_intervened = engagement.bot_intervened
+    current_intervention = engagement.intervention_type
+
+    # Engaged participants, sorted by engagement score
+    participants = engagement.participants
+    num_engaged = len(participants)
 
-def send_dm_to_pair(thread_ts: str, channel_id: str, participants: List, cur, conn):
+    # PROGRESSIVE INTERVENTION LOGIC
+    # Allow escalation: dm_pair → ephemeral → create_channel
+
+    if num_engaged >= 4 and current_intervention != 'create_channel':
+        # Upgrade to channel creation (highest intervention)
+        action = 'create_channel'
+
+    elif num_engaged == 3 and current_intervention not in ['ephemeral', 'create_channel']:
+        # Upgrade to ephemeral (medium intervention)
+        action = 'create_channel'
+
+    elif num_engaged == 2 and not bot_intervened:
+        # Initial intervention: DM pair (lowest intervention)
+        action = 'dm_pair'
+
+    else:
+        return
+
+    # Claim the level in the DB first so concurrent events (on any worker) don't intervene twice
+    if not claim_intervention(thread_ts, action):
+        return
+
+    if action == 'create_channel':
+        succeeded = create_group_channel(thread_ts, channel_id, participants)
+    else:
+        succeeded = send_dm_to_pair(thread_ts, channel_id, participants[:2])
+
+    if not succeeded:
+        release_intervention(thread_ts, action)
+
+def send_dm_to_pair(thread_ts: str, channel_id: str, participants: List) -> bool:
     """Send DM to 2 interested people suggesting they connect"""
     user1_slack_id = participants[0][1]
     user2_slack_id = participants[1][1]
@@ -157,25 +111,16 @@ def send_dm_to_pair(thread_ts: str, channel_id: str, participants: List, cur, co
             f"👋 I noticed you and <@{user1_slack_id}> are both engaged in a discussion. Want to connect and chat more?"
         )
         
-        # Log intervention
-        cur.execute("""
-            INSERT INTO bot_interventions (source_thread_ts, intervention_type, target_slack_ids, successful)
-            VALUES (%s, 'dm_pair', %s, TRUE)
-        """, (thread_ts, [user1_slack_id, user2_slack_id]))
-        
-        # Mark thread as intervened
-        cur.execute("""
-            UPDATE monitored_threads SET bot_intervened = TRUE, intervention_type = 'dm_pair'
-            WHERE thread_ts = %s
-        """, (thread_ts,))
-        
-        conn.commit()
+        # Log intervention and mark thread as intervened
+        record_intervention(thread_ts, 'dm_pair', [user1_slack_id, user2_slack_id])
         log.info(f"Sent DM pair intervention for thread {thread_ts}")
+        return True
     
     except Exception as e:
         log.error(f"Failed to send DM pair: {e}")
+        return False
 
-def create_group_channel(thread_ts: str, channel_id: str, participants: List, cur, conn):
+def create_group_channel(thread_ts: str, channel_id: str, participants: List) -> bool:
     """Create a new Slack channel for 4+ interested people"""
     slack_ids = [p[1] for p in participants[:8]]  # Limit to top 8 most engaged
     
@@ -207,25 +152,16 @@ def create_group_channel(thread_ts: str, channel_id: str, participants: List, cu
             f"This channel was created for you to continue the conversation!"
         )
         
-        # Log intervention
-        cur.execute("""
-            INSERT INTO bot_interventions (source_thread_ts, intervention_type, target_slack_ids, channel_id, successful)
-            VALUES (%s, 'create_channel', %s, %s, TRUE)
-        """, (thread_ts, slack_ids, new_channel_id))
-        
-        # Mark thread as intervened
-        cur.execute("""
-            UPDATE monitored_threads SET bot_intervened = TRUE, intervention_type = 'create_channel'
-            WHERE thread_ts = %s
-        """, (thread_ts,))
-        
-        conn.commit()
+        # Log intervention and mark thread as intervened
+        record_intervention(thread_ts, 'create_channel', slack_ids, channel_id=new_channel_id)
         log.info(f"Created channel {channel_name} for thread {thread_ts}")
+        return True
     
     except Exception as e:
         log.error(f"Failed to create channel: {e}")
+        return False
 
-def send_ephemeral_to_group(thread_ts: str, channel_id: str, participants: List, cur, conn):
+def send_ephemeral_to_group(thread_ts: str, channel_id: str, participants: List):
     """Send ephemeral message to 3 people in the original channel"""
     slack_ids = [p[1] for p in participants]
     
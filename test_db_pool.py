@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: test_db_pool.py
+# Description: Tests for the connection pool in database/db.py (timed
+# checkouts, stale-connection replacement, idle reuse and reaping).
+# Uses a fake connection factory, no database needed: python -m pytest test_db_pool.py
+# --------------------------------------------------
+
+import threading
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from database import db
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                if conn.broken:
+                    raise psycopg2.OperationalError("server closed the connection")
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Every connection the pool opens, in order."""
+    opened = []
+
+    def connect(*args, **kwargs):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    yield opened
+    db.close_pool()
+
+
+def test_checkout_times_out_when_pool_is_exhausted(connections):
+    db.init_pool(dsn="fake", minconn=1, maxconn=1, timeout=0.05)
+    conn = db.get_conn()
+    timeouts = db.get_pool_stats()["timeouts"]
+
+    with pytest.raises(db.PoolTimeout):
+        db.get_conn()
+    assert db.get_pool_stats()["timeouts"] == timeouts + 1
+
+    db.put_conn(conn)
+    assert db.get_conn() is conn
+
+
+def test_waiting_checkout_gets_the_returned_connection(connections):
+    db.init_pool(dsn="fake", minconn=1, maxconn=1, timeout=2)
+    conn = db.get_conn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(db.get_conn()))
+    waiter.start()
+
+    time.sleep(0.05)
+    assert not got
+    db.put_conn(conn)
+    waiter.join(1)
+    assert got == [conn]
+
+
+def test_stale_connection_is_replaced(connections, monkeypatch):
+    db.init_pool(dsn="fake", minconn=1, maxconn=2, timeout=1)
+    stale = db.get_conn()
+    db.put_conn(stale)
+    stale.broken = True
+    # Force the liveness ping even though the connection was just returned
+    monkeypatch.setattr(db, "VALIDATE_AFTER_SECONDS", 0)
+    discarded = db.get_pool_stats()["discarded"]
+
+    conn = db.get_conn()
+    assert conn is not stale
+    assert stale.closed
+    assert db.get_pool_stats()["discarded"] == discarded + 1
+    assert db.get_pool_stats()["in_use"] == 1
+
+
+def test_returned_connections_stay_open_up_to_maxconn(connections):
+    db.init_pool(dsn="fake", minconn=1, maxconn=4, timeout=1)
+    burst = [db.get_conn() for _ in range(4)]
+    for conn in burst:
+        db.put_conn(conn)
+    stats = db.get_pool_stats()
+    assert (stats["in_use"], stats["idle"]) == (0, 4)
+
+    # A second burst reuses them instead of reconnecting
+    opened = len(connections)
+    again = [db.get_conn() for _ in range(4)]
+    assert len(connections) == opened
+    assert not any(conn.closed for conn in again)
+    for conn in again:
+        db.put_conn(conn)
+
+
+def test_idle_connections_are_reaped_down_to_minconn(connections):
+    db.init_pool(dsn="fake", minconn=1, maxconn=3, timeout=1, idle_timeout=0.05)
+    burst = [db.get_conn() for _ in range(3)]
+    for conn in burst:
+        db.put_conn(conn)
+    assert db.get_pool_stats()["idle"] == 3
+
+    time.sleep(0.1)
+    db.put_conn(db.get_conn())
+    assert db.get_pool_stats()["idle"] == 1
+    assert sum(1 for conn in connections if not conn.closed) == 1
+
+
+def test_semaphore_slot_is_released_when_connect_fails(connections, monkeypatch):
+    db.init_pool(dsn="fake", minconn=0, maxconn=1, timeout=0.05)
+
+    def refuse(*args, **kwargs):
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(psycopg2, "connect", refuse)
+    with pytest.raises(psycopg2.OperationalError):
+        db.get_conn()
+
+    # The failed checkout must not leak its slot
+    monkeypatch.setattr(psycopg2, "connect", lambda *a, **k: FakeConnection())
+    db.put_conn(db.get_conn(timeout=0.05))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: test_event_dedup.py
+# Description: Tests for Slack event deduplication (services/event_dedup.py
+# and handle_event). processed_events is a stubbed cursor over an in-memory
+# set, so no database is needed: python -m pytest test_event_dedup.py
+# --------------------------------------------------
+
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# config.py requires this even though nothing talks to Slack
+os.environ.setdefault("SLACK_SIGNING_SECRET", "test")
+
+import psycopg2
+import pytest
+
+from database.repos import processed_events
+from routes import events
+from services import event_dedup
+
+
+class FakeCursor:
+    """Answers the processed_events queries from an in-memory set of event ids."""
+
+    def __init__(self, table, fail=False):
+        self.table = table
+        self.fail = fail
+        self.connection = SimpleNamespace(commit=lambda: None)
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, query, params):
+        if self.fail:
+            raise psycopg2.OperationalError("connection refused")
+        if query.startswith("INSERT INTO processed_events"):
+            event_id = params[0]
+            self._row = None if event_id in self.table else (event_id,)
+            self.table.add(event_id)
+        elif query.startswith("DELETE FROM processed_events"):
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self._row
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """The stubbed processed_events table (a set of claimed event ids)."""
+    claimed = set()
+    state = {"fail": False}
+
+    @contextmanager
+    def get_db_cursor():
+        yield FakeCursor(claimed, fail=state["fail"])
+
+    monkeypatch.setattr(processed_events, "get_db_cursor", get_db_cursor)
+    monkeypatch.setattr(event_dedup, "_seen", {})
+    monkeypatch.setattr(event_dedup, "_next_sweep", 0.0)
+    monkeypatch.setattr(event_dedup, "_stats", dict.fromkeys(event_dedup._stats, 0))
+    return SimpleNamespace(ids=claimed, state=state)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(event_dedup, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_seen_recently_marks_until_ttl_expires(table, clock, monkeypatch):
+    monkeypatch.setattr(event_dedup, "EVENT_DEDUP_TTL_SECONDS", 60)
+    assert not event_dedup.seen_recently("Ev1")
+    assert event_dedup.seen_recently("Ev1", retry_num="1")
+
+    clock.value += 61
+    assert not event_dedup.seen_recently("Ev1")
+    stats = event_dedup.get_dedup_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["retries_received"] == 1
+
+
+def test_expired_ids_are_swept_from_memory(table, clock, monkeypatch):
+    monkeypatch.setattr(event_dedup, "EVENT_DEDUP_TTL_SECONDS", 60)
+    event_dedup.seen_recently("Ev1")
+    clock.value += 120
+    event_dedup.seen_recently("Ev2")
+    assert set(event_dedup._seen) == {"Ev2"}
+
+
+def test_forget_lets_a_retry_through(table, clock):
+    assert not event_dedup.seen_recently("Ev1")
+    event_dedup.forget("Ev1")
+    assert not event_dedup.seen_recently("Ev1")
+
+
+def test_claim_rejects_an_event_id_already_in_processed_events(table):
+    assert event_dedup.claim("Ev1")
+    assert not event_dedup.claim("Ev1")
+    assert table.ids == {"Ev1"}
+    assert event_dedup.get_dedup_stats()["db_hits"] == 1
+
+
+def test_claim_fails_open_when_the_db_is_down(table):
+    table.state["fail"] = True
+    assert event_dedup.claim("Ev1")
+    assert event_dedup.claim("Ev1")
+    assert event_dedup.get_dedup_stats()["db_errors"] == 2
+
+
+def test_handle_event_drops_a_redelivered_event(table, monkeypatch):
+    handled = []
+    monkeypatch.setattr(events, "process_dm_message", handled.append)
+    payload = {
+        "event_id": "Ev1",
+        "event": {"type": "message", "channel": "D123", "channel_type": "im", "user": "U1", "text": "hi"},
+    }
+
+    # e.g. Slack's retry landed on the other worker, so only processed_events knows it
+    events.handle_event(payload)
+    events.handle_event(dict(payload))
+    assert len(handled) == 1
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: test_finalization_resume.py
+# Description: Tests that rerunning finalize_event resumes from its
+# checkpoints. The finalization repo is an in-memory fake and Slack /
+# Gemini calls are mocked, so no database or network is needed:
+# python -m pytest test_finalization_resume.py
+# --------------------------------------------------
+
+import os
+from contextlib import contextmanager
+
+# config.py requires this even though Slack is mocked
+os.environ.setdefault("SLACK_SIGNING_SECRET", "test")
+
+import pytest
+
+from config import FINALIZE_MAX_STEP_ATTEMPTS
+from database.models import FinalizationStep
+from services import event_finalizer, event_scheduler
+
+EVENT_ID = 7
+GROUPS = [["U1", "U2"], ["U3", "U4"]]
+
+
+class FakeFinalizationRepo:
+    """Stands in for database/repos/finalization.py, keeping jobs and steps in memory."""
+
+    def __init__(self):
+        self.groups = None
+        self.status = None
+        self.classify_attempts = 0
+        self.steps = {}
+
+    def get_job_groups(self, event_id):
+        return self.groups
+
+    def create_job(self, event_id, groups):
+        if self.groups is None:
+            self.groups = groups
+        return self.groups
+
+    def record_classify_failure(self, event_id, error):
+        self.classify_attempts += 1
+        return self.classify_attempts
+
+    def set_job_status(self, event_id, status):
+        self.status = status
+
+    def get_steps(self, event_id):
+        return dict(self.steps)
+
+    def start_step(self, event_id, group_index, step, payload):
+        prior = self.steps.get((group_index, step))
+        state = FinalizationStep(event_id, group_index, step, "started", payload,
+                                 prior.attempts if prior else 0, prior.last_error if prior else None)
+        self.steps[(group_index, step)] = state
+        return state
+
+    def record_step(self, event_id, group_index, step, status, payload=None, error=None):
+        prior = self.steps.get((group_index, step))
+        state = FinalizationStep(
+            event_id, group_index, step, status,
+            payload if payload is not None else (prior.payload if prior else None),
+            (prior.attempts if prior else 0) + 1, error)
+        self.steps[(group_index, step)] = state
+        return state
+
+
+class FakeSlack:
+    def __init__(self):
+        self.created = []
+        self.invited = []
+        self.posted = []
+        self.invite_failures = 0
+
+    def create_channel(self, name, is_private=False):
+        channel_id = f"C{len(self.created) + 1}"
+        self.created.append((channel_id, name))
+        return {"id": channel_id, "name": name}
+
+    def invite_users_to_channel(self, channel_id, slack_ids):
+        self.invited.append(channel_id)
+        if self.invite_failures:
+            self.invite_failures -= 1
+            raise RuntimeError("Slack API error: ratelimited")
+
+    def chat_post_message(self, channel, text):
+        self.posted.append(channel)
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    fake = FakeFinalizationRepo()
+    for name in ("get_job_groups", "create_job", "record_classify_failure", "set_job_status",
+                 "get_steps", "start_step", "record_step"):
+        monkeypatch.setattr(event_finalizer.finalization, name, getattr(fake, name))
+
+    @contextmanager
+    def advisory_lock(*keys):
+        yield True
+
+    monkeypatch.setattr(event_finalizer.db, "advisory_lock", advisory_lock)
+    monkeypatch.setattr(event_finalizer, "classify_user_responses", lambda event_id: GROUPS)
+    monkeypatch.setattr(event_finalizer, "get_responses_with_users", lambda event_id: [
+        (slack_id, f"answer from {slack_id}") for group in GROUPS for slack_id in group])
+    monkeypatch.setattr(event_finalizer, "generate_channel_metadata_batch", lambda batches, **kwargs: [
+        {"channel_name": f"topic-{i}", "initial_message": "hi", "call_to_action": "chat"}
+        for i, _ in enumerate(batches)])
+    return fake
+
+
+@pytest.fixture
+def slack(monkeypatch):
+    fake = FakeSlack()
+    monkeypatch.setattr(event_finalizer, "create_channel", fake.create_channel)
+    monkeypatch.setattr(event_finalizer, "invite_users_to_channel", fake.invite_users_to_channel)
+    monkeypatch.setattr(event_finalizer, "chat_post_message", fake.chat_post_message)
+    monkeypatch.setattr(event_finalizer, "find_channel_by_name", lambda name, is_private=False: None)
+    return fake
+
+
+def test_rerun_skips_done_steps_and_reuses_channel_ids(repo, slack):
+    # Two invites fail (one per group), so the first run ends incomplete
+    slack.invite_failures = 2
+    first = event_finalizer.finalize_event(EVENT_ID)
+    assert not first["complete"]
+    assert len(slack.created) == 2
+    assert slack.posted == []
+
+    second = event_finalizer.finalize_event(EVENT_ID)
+    assert second["complete"]
+    assert repo.status == "done"
+    # No new channels: the rerun invited into the ones stored by the first run
+    assert len(slack.created) == 2
+    assert sorted(c["id"] for c in second["channels_created"]) == ["C1", "C2"]
+    assert sorted(slack.invited[2:]) == ["C1", "C2"]
+    assert repo.steps[(0, "metadata")].attempts == 1
+    assert repo.steps[(0, "create")].attempts == 1
+    assert repo.steps[(0, "invite")].attempts == 2
+
+
+def test_failing_step_stops_at_the_attempt_cap(repo, slack):
+    slack.invite_failures = 1000
+    for _ in range(FINALIZE_MAX_STEP_ATTEMPTS - 1):
+        assert not event_finalizer.finalize_event(EVENT_ID)["complete"]
+
+    last = event_finalizer.finalize_event(EVENT_ID)
+    assert last["complete"]
+    assert repo.steps[(0, "invite")].attempts == FINALIZE_MAX_STEP_ATTEMPTS
+    invites = len(slack.invited)
+
+    # A settled job does no more Slack work
+    event_finalizer.finalize_event(EVENT_ID)
+    assert len(slack.invited) == invites
+    assert len(slack.created) == 2
+
+
+def test_retry_backoff_is_bounded(monkeypatch):
+    monkeypatch.setattr(event_scheduler, "FINALIZE_RETRY_SECONDS", 60)
+    monkeypatch.setattr(event_scheduler, "FINALIZE_RETRY_MAX_SECONDS", 600)
+    assert [event_scheduler._retry_delay(n) for n in range(1, 7)] == [60, 120, 240, 480, 600, 600]
+
+    scheduled = []
+
+    class FakeScheduler:
+        def add_job(self, func, trigger, **kwargs):
+            scheduled.append(kwargs["kwargs"]["retry"])
+
+    monkeypatch.setattr(event_scheduler, "scheduler", FakeScheduler())
+    monkeypatch.setattr(event_scheduler, "FINALIZE_MAX_RETRIES", 3)
+    for retry in range(1, 6):
+        event_scheduler._schedule_retry(EVENT_ID, retry)
+    assert scheduled == [1, 2, 3]
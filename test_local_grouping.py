@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: test_local_grouping.py
+# Description: Regression tests for the local (Gemini-free) grouping engine.
+# Pure NumPy, no database or Slack needed: python -m pytest test_local_grouping.py
+# --------------------------------------------------
+
+import os
+
+# config.py requires this even though grouping never talks to Slack
+os.environ.setdefault("SLACK_SIGNING_SECRET", "test")
+
+from services.local_grouping import group_responses
+
+
+def test_small_event_keeps_topics_apart():
+    # Six responses give k=1 at the default target size; the two topics
+    # must still come out as separate groups, and the loners ungrouped
+    groups = group_responses([
+        ("U1", "hiking in the mountains"),
+        ("U2", "mountain hiking trips"),
+        ("U3", "cooking pasta at home"),
+        ("U4", "cooking homemade pasta"),
+        ("U5", "jazz records"),
+        ("U6", "ok"),
+    ])
+    assert sorted(sorted(group) for group in groups) == [["U1", "U2"], ["U3", "U4"]]
+
+
+def test_unrelated_responses_stay_ungrouped():
+    assert group_responses([("U1", "cats"), ("U2", "dogs"), ("U3", "fish")]) == []
+
+
+if __name__ == "__main__":
+    test_small_event_keeps_topics_apart()
+    test_unrelated_responses_stay_ungrouped()
+    print("✅ Local grouping tests passed")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# --------------------------------------------------
+# File: test_scheduler_leadership.py
+# Description: Tests for the scheduler leader handoff in
+# services/event_scheduler.py. The shared job store is a throwaway SQLite
+# file and the repos are stubbed, so no Postgres is needed:
+# python -m pytest test_scheduler_leadership.py
+# --------------------------------------------------
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# config.py requires this even though nothing talks to Slack
+os.environ.setdefault("SLACK_SIGNING_SECRET", "test")
+
+import pytest
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING, STATE_STOPPED
+
+from services import event_scheduler
+
+# A scheduler thread dying (e.g. remove_job raising) is exactly what these guard against
+pytestmark = pytest.mark.filterwarnings("error::pytest.PytestUnhandledThreadExceptionWarning")
+
+
+class FakeElection:
+    def __init__(self):
+        self.leading = False
+
+    def is_leader(self):
+        return self.leading
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    """One worker's scheduler on a shared (SQLite) job store, with stubbed repos."""
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+
+    def new_shared_scheduler():
+        scheduler = BackgroundScheduler(jobstores={"default": SQLAlchemyJobStore(url=url)})
+        scheduler.start(paused=True)
+        return scheduler
+
+    runs = []
+
+    @contextmanager
+    def advisory_lock(*keys):
+        yield True
+
+    election = FakeElection()
+    monkeypatch.setattr(event_scheduler, "_new_shared_scheduler", new_shared_scheduler)
+    monkeypatch.setattr(event_scheduler, "_shared_store", True)
+    monkeypatch.setattr(event_scheduler, "_election", election)
+    monkeypatch.setattr(event_scheduler, "scheduler", new_shared_scheduler())
+    monkeypatch.setattr(event_scheduler.db, "advisory_lock", advisory_lock)
+    monkeypatch.setattr(event_scheduler.db, "notify", lambda channel, payload="": None)
+    monkeypatch.setattr(event_scheduler.finalization_runs, "start_run",
+                        lambda trigger, pid: runs.append({"trigger": trigger}) or len(runs))
+    monkeypatch.setattr(event_scheduler.finalization_runs, "finish_run",
+                        lambda run_id, status, **run: runs[run_id - 1].update(status=status, **run))
+    monkeypatch.setattr(event_scheduler, "get_pending_events", lambda: [])
+    monkeypatch.setattr(event_scheduler, "get_unfinalized_ended_events",
+                        lambda event_id=None: [SimpleNamespace(id=event_id)] if event_id else [])
+    # Too few responses: the run just marks the event finalized
+    monkeypatch.setattr(event_scheduler, "get_responses_with_users", lambda event_id: [])
+    monkeypatch.setattr(event_scheduler, "mark_event_finalized", lambda event_id: None)
+
+    yield SimpleNamespace(election=election, runs=runs)
+    event_scheduler.stop_scheduler()
+
+
+def ended_event(event_id):
+    return SimpleNamespace(id=event_id, ends_at=datetime.now() - timedelta(seconds=30))
+
+
+def triggers(runs):
+    return sorted(run["trigger"] for run in runs)
+
+
+def test_follower_adds_jobs_without_running_them(worker):
+    event_scheduler.schedule_event_finalization(ended_event(1))
+
+    assert event_scheduler.scheduler.state == STATE_PAUSED
+    assert event_scheduler.scheduler.get_job("finalize_event_1") is not None
+    time.sleep(0.3)
+    assert worker.runs == []
+
+    # Shutting the follower down (e.g. on exit) must leave the due job for the leader
+    event_scheduler._replace_scheduler()
+    assert event_scheduler.scheduler.get_job("finalize_event_1") is not None
+    assert worker.runs == []
+
+
+def test_promotion_runs_due_jobs_on_a_fresh_scheduler(worker):
+    follower = event_scheduler.scheduler
+    event_scheduler.schedule_event_finalization(ended_event(1))
+
+    worker.election.leading = True
+    event_scheduler._become_leader(check_interval_minutes=60)
+
+    assert event_scheduler.scheduler is not follower
+    assert follower.state == STATE_STOPPED
+    assert event_scheduler.scheduler.state == STATE_RUNNING
+    assert wait_for(lambda: len(worker.runs) == 2 and all("status" in run for run in worker.runs))
+    # One finalization_runs row per run: the end-time job and the startup check
+    assert triggers(worker.runs) == ["event_end:1", "startup"]
+    assert [run["events_processed"] for run in worker.runs if run["trigger"] == "event_end:1"] == [1]
+    assert all(run["status"] == "ok" for run in worker.runs)
+
+
+def test_step_down_stops_execution_but_keeps_a_paused_scheduler(worker):
+    worker.election.leading = True
+    event_scheduler._become_leader(check_interval_minutes=60)
+    assert wait_for(lambda: len(worker.runs) == 1)
+    leader = event_scheduler.scheduler
+
+    worker.election.leading = False
+    event_scheduler._step_down()
+    assert leader.state == STATE_STOPPED
+    assert event_scheduler.scheduler.state == STATE_PAUSED
+
+    # Jobs added after stepping down wait for the next leader
+    event_scheduler.schedule_event_finalization(ended_event(2))
+    time.sleep(0.3)
+    assert triggers(worker.runs) == ["startup"]
+
+
+def test_jobs_skip_once_the_leader_lock_is_gone(worker):
+    worker.election.leading = False
+    event_scheduler.finalize_ended_event(1)
+    event_scheduler.check_and_finalize_events(trigger="interval")
+    assert worker.runs == []
+
+    worker.election.leading = True
+    event_scheduler.finalize_ended_event(1)
+    assert triggers(worker.runs) == ["event_end:1"]
@@ -1,30 +1,245 @@
 # utils/slack_api.py
-import requests, logging, os
-from typing import Dict
+import requests, logging, os, socket, threading, time
+from collections import OrderedDict
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from config import (SLACK_HTTP_POOL_SIZE, SLACK_HTTP_KEEPALIVE, SLACK_HTTP_TIMEOUT, DM_CHANNEL_CACHE_SIZE,
+                    SLACK_CHAT_POST_PER_MINUTE, SLACK_MAX_RATE_LIMIT_RETRIES)
+from database.repos import dm_channels
 from utils.slack_tokens import get_bot_token
 
 log = logging.getLogger("slack-ask-bot")
 
 log = logging.getLogger("slack-api")
 
-def post_to_response_url(response_url: str, text: str) -> None:
-    """Post publicly to the invoking channel via response_url (no chat:write needed)."""
-    r = requests.post(response_url, json={"response_type": "in_channel", "text": text}, timeout=15)
+_session = None
+_session_lock = threading.Lock()
+
+
+class _SlackAdapter(HTTPAdapter):
+    """HTTPAdapter that turns on TCP keep-alive probes for pooled connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        if SLACK_HTTP_KEEPALIVE:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _get_session() -> requests.Session:
+    """
+    Return the process-wide Slack HTTP session, creating it on first use.
+
+    Each gunicorn worker imports this module after forking, so every worker
+    gets its own pool. requests.Session is safe to share between threads as
+    long as its configuration is not mutated after creation.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _SlackAdapter(
+                    pool_connections=4,
+                    pool_maxsize=SLACK_HTTP_POOL_SIZE,
+                    pool_block=True,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                if not SLACK_HTTP_KEEPALIVE:
+                    session.headers["Connection"] = "close"
+                _session = session
+                log.info("Slack HTTP session ready (pool size %s, keep-alive %s)",
+                         SLACK_HTTP_POOL_SIZE, SLACK_HTTP_KEEPALIVE)
+    return _session
+
+
+def get_http_stats() -> Dict[str, int]:
+    """Connection counters for the Slack HTTP session (new vs. reused connections)."""
+    stats = {"requests": 0, "new_connections": 0, "reused_connections": 0}
+    session = _session
+    if session is None:
+        return stats
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue  # evicted while we were iterating
+            stats["requests"] += pool.num_requests
+            stats["new_connections"] += pool.num_connections
+    stats["reused_connections"] = max(stats["requests"] - stats["new_connections"], 0)
+    return stats
+
+
+def post_to_response_url(response_url: str, text: str, response_type: str = "in_channel") -> None:
+    """Post to the invoking channel via response_url (no chat:write needed). Public by default."""
+    r = _get_session().post(response_url, json={"response_type": response_type, "text": text},
+                            timeout=SLACK_HTTP_TIMEOUT)
+    r.raise_for_status()
+
+# ---------- Rate limiting ----------
+# Slack Web API tiers, in requests per minute per workspace
+# https://api.slack.com/apis/rate-limits
+_TIER_PER_MINUTE = {1: 1, 2: 20, 3: 50, 4: 100}
+_METHOD_TIERS = {
+    "conversations.create": 2,
+    "conversations.list": 2,
+    "conversations.open": 3,
+    "conversations.invite": 3,
+    "conversations.replies": 3,
+    "chat.postEphemeral": 4,
+}
+_DEFAULT_TIER = 3
+# Per-channel buckets that have refilled are dropped once there are more than this many
+_MAX_CHANNEL_BUCKETS = 5000
+
+
+class _TokenBucket:
+    """
+    Token bucket that queues callers instead of rejecting them.
+
+    reserve() always hands out a token, letting the balance go negative, and
+    returns how long the caller must sleep before using it. Callers therefore
+    leave in arrival order at the bucket's rate.
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(delay, self.blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold every caller back for seconds (used when Slack answers 429)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            refilled = self.tokens + (now - self.updated) * self.rate
+            return refilled >= self.capacity and self.blocked_until <= now
+
+
+_buckets: Dict[str, _TokenBucket] = {}
+_channel_buckets: Dict[str, _TokenBucket] = {}
+_buckets_lock = threading.Lock()
+_limit_stats = {
+    "calls": 0,
+    "throttled_calls": 0,
+    "queue_depth": 0,
+    "max_queue_depth": 0,
+    "throttle_wait_seconds": 0.0,
+    "max_throttle_wait_seconds": 0.0,
+    "rate_limited_responses": 0,
+}
+
+
+def _method_bucket(method: str) -> _TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(method)
+        if bucket is None:
+            if method == "chat.postMessage":
+                per_minute = SLACK_CHAT_POST_PER_MINUTE
+            else:
+                per_minute = _TIER_PER_MINUTE[_METHOD_TIERS.get(method, _DEFAULT_TIER)]
+            bucket = _buckets[method] = _TokenBucket(per_minute, burst=max(1, int(per_minute) // 10))
+        return bucket
+
+
+def _channel_bucket(channel: str) -> _TokenBucket:
+    """chat.postMessage allows roughly one message per second per channel."""
+    with _buckets_lock:
+        bucket = _channel_buckets.get(channel)
+        if bucket is None:
+            if len(_channel_buckets) >= _MAX_CHANNEL_BUCKETS:
+                for key in [k for k, b in _channel_buckets.items() if b.is_idle()]:
+                    del _channel_buckets[key]
+            bucket = _channel_buckets[channel] = _TokenBucket(60, burst=1)
+        return bucket
+
+
+def _buckets_for(method: str, payload: Dict) -> list:
+    buckets = [_method_bucket(method)]
+    if method == "chat.postMessage" and payload.get("channel"):
+        buckets.append(_channel_bucket(payload["channel"]))
+    return buckets
+
+
+def _wait_for_slot(buckets: list) -> None:
+    """Reserve a token from every bucket and sleep until all of them allow the call."""
+    delay = max(b.reserve() for b in buckets)
+    with _buckets_lock:
+        _limit_stats["calls"] += 1
+        if delay <= 0:
+            return
+        _limit_stats["throttled_calls"] += 1
+        _limit_stats["queue_depth"] += 1
+        _limit_stats["max_queue_depth"] = max(_limit_stats["max_queue_depth"], _limit_stats["queue_depth"])
+    try:
+        time.sleep(delay)
+    finally:
+        with _buckets_lock:
+            _limit_stats["queue_depth"] -= 1
+            _limit_stats["throttle_wait_seconds"] += delay
+            _limit_stats["max_throttle_wait_seconds"] = max(_limit_stats["max_throttle_wait_seconds"], delay)
+
+
+def get_rate_limit_stats() -> Dict[str, float]:
+    """Counters for the Slack rate limiter: current/max queue depth and time spent throttled."""
+    with _buckets_lock:
+        stats = dict(_limit_stats)
+    stats["throttle_wait_seconds"] = round(stats["throttle_wait_seconds"], 3)
+    stats["max_throttle_wait_seconds"] = round(stats["max_throttle_wait_seconds"], 3)
+    return stats
+
+
+def _call_method(method: str, payload: Dict, token: str) -> Dict:
+    """POST one Web API method, pacing it through the rate limiter and honouring 429 Retry-After."""
+    buckets = _buckets_for(method, payload)
+    for attempt in range(SLACK_MAX_RATE_LIMIT_RETRIES + 1):
+        _wait_for_slot(buckets)
+        r = _get_session().post(
+            f"https://slack.com/api/{method}",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            json=payload,
+            timeout=SLACK_HTTP_TIMEOUT,
+        )
+        if r.status_code != 429 or attempt == SLACK_MAX_RATE_LIMIT_RETRIES:
+            break
+        retry_after = int(r.headers.get("Retry-After", 1))
+        log.warning("Slack rate limited %s; retrying in %ss", method, retry_after)
+        with _buckets_lock:
+            _limit_stats["rate_limited_responses"] += 1
+        # The limit is per method (and per channel for chat.postMessage), so pause
+        # everybody queued on the same buckets, not just this caller.
+        for bucket in buckets:
+            bucket.block_for(retry_after)
     r.raise_for_status()
+    return r.json()
+
 
 def slack_api(method: str, payload: Dict) -> Dict:
     token = os.environ.get("SLACK_BOT_TOKEN")
     if not token:
         raise RuntimeError("Missing SLACK_BOT_TOKEN for Slack Web API method")
     log.debug("Using Slack bot token from environment for Web API method: %s", method)
-    r = requests.post(
-        f"https://slack.com/api/{method}",
-        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-        json=payload,
-        timeout=15,
-    )
-    r.raise_for_status()
-    response_json = r.json()
+    response_json = _call_method(method, payload, token)
     if response_json.get("ok"):
         return response_json
     # Attempt one refresh on token errors if rotation is enabled
@@ -34,14 +249,7 @@ def slack_api(method: str, payload: Dict) -> Dict:
         refreshed = _try_refresh_bot_token()
         if refreshed:
             log.info("Slack access token refreshed. Retrying method: %s", method)
-            r2 = requests.post(
-                f"https://slack.com/api/{method}",
-                headers={"Authorization": f"Bearer {refreshed}", "Content-Type": "application/json"},
-                json=payload,
-                timeout=15,
-            )
-            r2.raise_for_status()
-            retry_json = r2.json()
+            retry_json = _call_method(method, payload, refreshed)
             if retry_json.get("ok"):
                 return retry_json
             log.error("Slack API retry after token refresh failed: %s", retry_json)
@@ -57,7 +265,7 @@ def _try_refresh_bot_token() -> str | None:
         log.debug("Skipping Slack token refresh: missing client credentials or refresh token.")
         return None
     log.info("Refreshing Slack access token via oauth.v2.access")
-    r = requests.post(
+    r = _get_session().post(
         "https://slack.com/api/oauth.v2.access",
         data={
             "grant_type": "refresh_token",
@@ -65,7 +273,7 @@ def _try_refresh_bot_token() -> str | None:
             "client_id": client_id,
             "client_secret": client_secret,
         },
-        timeout=15,
+        timeout=SLACK_HTTP_TIMEOUT,
     )
     r.raise_for_status()
     token_json = r.json()
@@ -80,9 +288,59 @@ def _try_refresh_bot_token() -> str | None:
         log.info("Slack access token updated in process environment.")
     return new_access
 
+# In-process LRU of user id -> DM channel id, in front of the dm_channels table
+_dm_cache = OrderedDict()
+_dm_cache_lock = threading.Lock()
+_dm_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+
+def _remember_im(user_id: str, channel_id: str) -> None:
+    with _dm_cache_lock:
+        _dm_cache[user_id] = channel_id
+        _dm_cache.move_to_end(user_id)
+        while len(_dm_cache) > DM_CHANNEL_CACHE_SIZE:
+            _dm_cache.popitem(last=False)
+
+
+def cached_im(user_id: str) -> Optional[str]:
+    """Return the DM channel id for a user from the memory or DB cache, without calling Slack."""
+    with _dm_cache_lock:
+        channel_id = _dm_cache.get(user_id)
+        if channel_id:
+            _dm_cache.move_to_end(user_id)
+            _dm_stats["memory_hits"] += 1
+            return channel_id
+    try:
+        channel_id = dm_channels.get_dm_channel(user_id)
+    except Exception as e:
+        log.warning("DM channel lookup failed for %s: %s", user_id, e)
+        return None
+    if channel_id:
+        with _dm_cache_lock:
+            _dm_stats["db_hits"] += 1
+        _remember_im(user_id, channel_id)
+    return channel_id
+
+
+def get_dm_cache_stats() -> Dict[str, int]:
+    with _dm_cache_lock:
+        return {**_dm_stats, "size": len(_dm_cache)}
+
+
 def open_im(user_id: str) -> str:
-    """Return DM channel id (Dxxxxx) for a user."""
-    return slack_api("conversations.open", {"users": user_id})["channel"]["id"]
+    """Return DM channel id (Dxxxxx) for a user, calling conversations.open only on a cache miss."""
+    channel_id = cached_im(user_id)
+    if channel_id:
+        return channel_id
+    channel_id = slack_api("conversations.open", {"users": user_id})["channel"]["id"]
+    with _dm_cache_lock:
+        _dm_stats["misses"] += 1
+    _remember_im(user_id, channel_id)
+    try:
+        dm_channels.save_dm_channel(user_id, channel_id)
+    except Exception as e:
+        log.warning("Failed to persist DM channel for %s: %s", user_id, e)
+    return channel_id
 
 def chat_post_message(channel: str, text: str) -> str:
     """Post as the bot (requires chat:write). Returns ts."""
@@ -105,6 +363,30 @@ def create_channel(name: str, is_private: bool = False) -> Dict:
     })
     return result["channel"]
 
+def find_channel_by_name(name: str, is_private: bool = False) -> Optional[Dict]:
+    """
+    Look up a non-archived channel by exact name (pages through conversations.list).
+
+    Returns:
+        Channel info dict, or None if no channel has that name
+    """
+    cursor = None
+    while True:
+        payload = {
+            "types": "private_channel" if is_private else "public_channel",
+            "exclude_archived": True,
+            "limit": 1000,
+        }
+        if cursor:
+            payload["cursor"] = cursor
+        result = slack_api("conversations.list", payload)
+        for channel in result.get("channels", []):
+            if channel.get("name") == name:
+                return channel
+        cursor = (result.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return None
+
 def invite_users_to_channel(channel_id: str, user_ids: list) -> Dict:
     """
     Invite multiple users to a channel.